@@ -0,0 +1,406 @@
+"""
+Benchmark Suite for "A Tale of Two Premiums" Paper Replication
+Synthetic COT reports and daily prices at 1x-1000x the paper's panel, in the
+schemas data_preprocessing and table_replication read, pushed through every
+pipeline stage and table; times, peak memory and row counts are saved as JSON
+and can be compared against a stored baseline. Runs offline.
+"""
+
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+import contextlib
+import tempfile
+import argparse
+import platform
+import shutil
+import json
+import sys
+import time
+import io
+import os
+
+from instrumentation import PeakRSS, n_rows
+
+BENCHMARK_DIR = 'output/benchmarks'
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# (tickers, years); the paper panel is 25 commodities × ~3 years of weekly reports
+SCALES = {
+    '1x': (25, 3),
+    '10x': (250, 3),
+    '100x': (2500, 3),
+    '1000x': (2500, 30),
+}
+DEFAULT_SCALES = ['1x', '10x']
+MISSING_RATE = 0.02
+START_DATE = '2000-01-04'  # a Tuesday
+
+# Calls of the per-event calculate_cumulative_returns (reference for the return tensor) timed at every scale
+CUMULATIVE_RETURN_CALLS = 2000
+
+# A stage is flagged when it is this much slower (or larger) than the baseline
+REGRESSION_THRESHOLD = 1.25
+# Stages faster than this are too noisy to flag
+MIN_FLAG_SECONDS = 0.05
+
+# ============================================================================
+# Reference implementation
+# ============================================================================
+# Per-event window return, as Tables V and VIII computed it before the return tensor
+def calculate_cumulative_returns(daily_prices, ticker, start_date, end_date):
+    """Calculate cumulative return from start_date to end_date for a ticker"""
+    if ticker not in daily_prices:
+        return np.nan
+    
+    price_data = daily_prices[ticker]
+    
+    # Get prices within date range
+    mask = (price_data.index >= start_date) & (price_data.index <= end_date)
+    prices = price_data.loc[mask, 'Close']
+    
+    if len(prices) < 2:
+        return np.nan
+    
+    # Cumulative return: (end_price - start_price) / start_price
+    cum_ret = (prices.iloc[-1] - prices.iloc[0]) / prices.iloc[0]
+    return cum_ret
+
+# ============================================================================
+# Synthetic inputs
+# ============================================================================
+def synthetic_tickers(n_tickers):
+    return [f'S{j:04d}' for j in range(n_tickers)]
+
+def synthetic_commodity_map(tickers):
+    """(name_map, code_map) like data_preprocessing.create_commodity_map, one code per ticker"""
+    name_map = {t: f'SYNTHETIC {t}' for t in tickers}
+    code_map = {t: f'{900000 + j:06d}' for j, t in enumerate(tickers)}
+    return name_map, code_map
+
+def synthetic_cot(tickers, years, missing_rate=MISSING_RATE, seed=0):
+    """
+    Weekly Legacy COT reports in the raw CFTC column names process_cftc_legacy maps
+
+    Open interest follows a log random walk; commercial and noncommercial
+    long / short shares follow persistent AR(1) processes, so HP, Q and PT
+    behave like the real series. A `missing_rate` share of reports is dropped.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(START_DATE, periods=int(years * 52), freq='W-TUE')
+    n_dates, n_tickers = len(dates), len(tickers)
+
+    oi = np.exp(np.log(rng.uniform(2e4, 5e5, n_tickers)) + np.cumsum(rng.normal(0, 0.03, (n_dates, n_tickers)), axis=0))
+    shares = []
+    for level in (0.45, 0.45, 0.2, 0.2):
+        x = np.empty((n_dates, n_tickers))
+        x[0] = level
+        shocks = rng.normal(0, 0.02, (n_dates, n_tickers))
+        for t in range(1, n_dates):
+            x[t] = level + 0.95 * (x[t - 1] - level) + shocks[t]
+        shares.append(np.clip(x, 0.01, 0.9))
+    comm_long, comm_short, noncomm_long, noncomm_short = [np.round(oi * s).astype(np.int64) for s in shares]
+
+    name_map, code_map = synthetic_commodity_map(tickers)
+    df = pd.DataFrame({
+        'Market and Exchange Names': np.tile([f'{name_map[t]} - BENCHMARK EXCHANGE' for t in tickers], n_dates),
+        'As of Date in Form YYYY-MM-DD': np.repeat(dates.strftime('%Y-%m-%d'), n_tickers),
+        'CFTC Contract Market Code': np.tile([code_map[t] for t in tickers], n_dates),
+        'Open Interest (All)': np.round(oi).astype(np.int64).ravel(),
+        'Noncommercial Positions-Long (All)': noncomm_long.ravel(),
+        'Noncommercial Positions-Short (All)': noncomm_short.ravel(),
+        'Commercial Positions-Long (All)': comm_long.ravel(),
+        'Commercial Positions-Short (All)': comm_short.ravel(),
+    })
+    return df[rng.random(len(df)) >= missing_rate].reset_index(drop=True)
+
+def synthetic_daily_prices(tickers, years, missing_rate=MISSING_RATE, seed=1):
+    """
+    Daily Close prices (geometric random walk on business days), covering the
+    COT weeks plus the event windows around them; `missing_rate` of days dropped
+
+    Returns: dict of {ticker: DataFrame indexed by Date with a 'Close' column}
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(START_DATE) - pd.Timedelta(days=30)
+    end = pd.Timestamp(START_DATE) + pd.Timedelta(weeks=int(years * 52) + 12)
+    days = pd.bdate_range(start, end)
+    log_price = np.log(rng.uniform(5, 500, len(tickers))) + np.cumsum(
+        rng.normal(0, 0.015, (len(days), len(tickers))), axis=0)
+    keep = rng.random(log_price.shape) >= missing_rate
+
+    return {t: pd.DataFrame({'Close': np.exp(log_price[keep[:, j], j])},
+                            index=pd.DatetimeIndex(days[keep[:, j]], name='Date'))
+            for j, t in enumerate(tickers)}
+
+def write_price_files(daily_prices, price_dir):
+    """Price CSVs in the yfinance layout of data/prices (Date, Close, ...)"""
+    os.makedirs(price_dir, exist_ok=True)
+    for ticker, daily in daily_prices.items():
+        out = daily.assign(Ticker=ticker)
+        out.index = out.index.strftime('%Y-%m-%d')
+        out.to_csv(os.path.join(price_dir, f'{ticker}_prices.csv'))
+
+# ============================================================================
+# Measurement
+# ============================================================================
+def run_stage(results, name, func, *args, rows_in=None):
+    """
+    Run one stage with its console output suppressed; record wall / CPU time,
+    peak RSS and rows in / out in `results`
+
+    Returns: the stage output (None if it failed)
+    """
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    output, error = None, None
+    with PeakRSS() as rss, contextlib.redirect_stdout(io.StringIO()):
+        try:
+            output = func(*args)
+        except Exception as e:
+            error = f'{type(e).__name__}: {str(e)[:200]}'
+    results[name] = {
+        'wall_s': time.perf_counter() - start_wall,
+        'cpu_s': time.process_time() - start_cpu,
+        'peak_rss_mb': rss.peak / 2 ** 20,
+        'rows_in': rows_in,
+        'rows_out': n_rows(output),
+        'status': 'ok' if error is None else 'failed',
+    }
+    if error is not None:
+        results[name]['error'] = error
+    return output
+
+# ============================================================================
+# One scale
+# ============================================================================
+def run_scale(n_tickers, years, missing_rate=MISSING_RATE, seed=0):
+    """
+    Generate one synthetic data set and run every pipeline stage and table on it,
+    in a scratch working directory (the repository's data and output are not touched)
+
+    Returns: dict of {stage: measurements}
+    """
+    # Offline: the S&P 500 download in calculate_additional_variables must not run
+    sys.modules['yfinance'] = None
+
+    import data_preprocessing as prep
+    import table_replication as tables
+    from rolling_regression import rolling_univariate_regression, ticker_positions, to_position_array
+    from return_tensor import build_return_tensor
+    from price_store import build_price_matrix
+    from panel_cache import to_panel_dtypes
+
+    tickers = synthetic_tickers(n_tickers)
+    stages = {}
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='benchmark-')
+    try:
+        os.chdir(workdir)
+        os.makedirs('output/tables', exist_ok=True)
+
+        cot_raw = run_stage(stages, 'synthetic_cot', synthetic_cot, tickers, years, missing_rate, seed)
+        daily = run_stage(stages, 'synthetic_prices', synthetic_daily_prices, tickers, years, missing_rate, seed + 1)
+        run_stage(stages, 'write_price_files', write_price_files, daily, 'data/prices', rows_in=n_rows(daily))
+
+        # Preprocessing stages (data_preprocessing.py)
+        cot = run_stage(stages, 'process_cftc_legacy', prep.process_cftc_legacy, cot_raw, rows_in=len(cot_raw))
+        price_dict = run_stage(stages, 'load_and_resample_prices', prep.load_and_resample_prices,
+                               rows_in=n_rows(daily))
+        merged = run_stage(stages, 'merge_cot_and_prices', prep.merge_cot_and_prices, cot, price_dict,
+                           synthetic_commodity_map(tickers), rows_in=len(cot))
+        processed = run_stage(stages, 'calculate_variables',
+                              lambda: {t: df.sort_index() for t, df in prep.calculate_variables_many(merged).items()},
+                              rows_in=n_rows(merged))
+        panel = run_stage(stages, 'build_panel', lambda: to_panel_dtypes(pd.concat(
+            [df.rename_axis('Report_Date').reset_index().assign(Ticker=t) for t, df in processed.items()],
+            ignore_index=True)), rows_in=n_rows(processed))
+
+        # Table inputs (table_replication.py)
+        df = run_stage(stages, 'calculate_additional_variables', tables.calculate_additional_variables,
+                       panel.copy(), rows_in=len(panel))
+
+        def v_t_regression():
+            # v_t with an S&P 500 series: the rolling-regression path
+            pos, codes, names = ticker_positions(panel)
+            ret = to_position_array(panel, 'Ret', pos, codes, len(names))
+            spx = np.random.default_rng(seed).normal(0, 0.02, ret.shape[0])[:, None] * np.ones_like(ret)
+            return rolling_univariate_regression(spx, ret, window=52, min_periods=26)[2][pos, codes]
+        run_stage(stages, 'v_t_regression', v_t_regression, rows_in=len(panel))
+
+        run_stage(stages, 'fama_macbeth_regression', tables.fama_macbeth_regression,
+                  df, 'Ret_Lead', ['Q_Comm', 'Basis', 'S_v', 'Ret'], rows_in=len(df))
+
+        prices = run_stage(stages, 'load_daily_prices', tables.load_daily_prices)
+        run_stage(stages, 'build_return_tensor', lambda: build_return_tensor(
+            build_price_matrix(prices), df['Report_Date'], dtype=np.float64)['cum_last'],
+            rows_in=len(df))
+
+        events = df.to_frame([])[['Ticker', 'Report_Date']].sample(min(CUMULATIVE_RETURN_CALLS, len(df)), random_state=seed)
+        run_stage(stages, 'calculate_cumulative_returns', lambda: np.array([
+            calculate_cumulative_returns(prices, t, d + pd.Timedelta(days=1), d + pd.Timedelta(days=40))
+            for t, d in zip(events['Ticker'].astype(str), events['Report_Date'])]), rows_in=len(events))
+
+        for name, func in tables.TABLE_JOBS:
+            run_stage(stages, name, func, df, rows_in=len(df))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return stages
+
+def _run_scale_job(args):
+    return run_scale(*args)
+
+def run_benchmarks(scales=DEFAULT_SCALES, missing_rate=MISSING_RATE, seed=0, tickers=None, years=None):
+    """
+    Run every scale in a fresh process (so peak memory of one scale does not carry over)
+
+    Parameters:
+    -----------
+    scales : names of SCALES to run
+    tickers, years : a custom scale instead (both required)
+
+    Returns: results dict (metadata + {scale: {stage: measurements}})
+    """
+    runs = {name: SCALES[name] for name in scales}
+    if tickers is not None and years is not None:
+        runs = {f'{tickers}x{years}y': (tickers, years)}
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'missing_rate': missing_rate,
+        'seed': seed,
+        'scales': {},
+    }
+    context = multiprocessing.get_context('spawn')
+    for name, (n_tickers, n_years) in runs.items():
+        print(f"\n▶ {name}: {n_tickers} tickers × {n_years} years")
+        try:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                stages = pool.submit(_run_scale_job, (n_tickers, n_years, missing_rate, seed)).result()
+        except Exception as e:
+            # e.g. the worker killed for running out of memory
+            print(f"✗ {name} aborted: {type(e).__name__}: {str(e)[:200]}")
+            results['scales'][name] = {'tickers': n_tickers, 'years': n_years, 'stages': {},
+                                       'error': f'{type(e).__name__}: {str(e)[:200]}'}
+            continue
+        results['scales'][name] = {'tickers': n_tickers, 'years': n_years, 'stages': stages}
+        print_scale(stages)
+    return results
+
+# ============================================================================
+# Reporting and baseline comparison
+# ============================================================================
+def print_scale(stages):
+    print(f"  {'stage':34} {'wall s':>9} {'cpu s':>9} {'peak MB':>9} {'rows in':>10} {'rows out':>10}")
+    for name, m in stages.items():
+        mark = '✓' if m['status'] == 'ok' else '✗'
+        rows_in = '' if m['rows_in'] is None else f"{m['rows_in']:,}"
+        rows_out = '' if m['rows_out'] is None else f"{m['rows_out']:,}"
+        print(f"{mark} {name:34} {m['wall_s']:9.3f} {m['cpu_s']:9.3f} {m['peak_rss_mb']:9.1f} "
+              f"{rows_in:>10} {rows_out:>10}")
+        if m['status'] != 'ok':
+            print(f"    {m['error']}")
+
+def compare_results(results, baseline, threshold=REGRESSION_THRESHOLD, min_seconds=MIN_FLAG_SECONDS):
+    """
+    Stages slower or larger than the baseline by more than `threshold`
+
+    Returns: DataFrame (Scale, Stage, Metric, Baseline, Current, Ratio, Flag)
+    """
+    rows = []
+    for scale, run in results['scales'].items():
+        base_run = baseline.get('scales', {}).get(scale)
+        if base_run is None:
+            continue
+        if 'error' in run and 'error' not in base_run:
+            rows.append({'Scale': scale, 'Stage': '(all)', 'Metric': 'status', 'Baseline': 'ok',
+                         'Current': 'aborted', 'Ratio': np.nan, 'Flag': 'FAILED'})
+            continue
+        for stage, m in run['stages'].items():
+            base = base_run['stages'].get(stage)
+            if base is None:
+                continue
+            if m['status'] != 'ok' or base['status'] != 'ok':
+                flag = 'FAILED' if m['status'] != 'ok' and base['status'] == 'ok' else ''
+                rows.append({'Scale': scale, 'Stage': stage, 'Metric': 'status', 'Baseline': base['status'],
+                             'Current': m['status'], 'Ratio': np.nan, 'Flag': flag})
+                continue
+            for metric in ('wall_s', 'peak_rss_mb'):
+                ratio = m[metric] / base[metric] if base[metric] > 0 else np.nan
+                noisy = metric == 'wall_s' and max(m[metric], base[metric]) < min_seconds
+                flag = ''
+                if not noisy and ratio > threshold:
+                    flag = 'REGRESSION'
+                elif not noisy and ratio < 1 / threshold:
+                    flag = 'faster' if metric == 'wall_s' else 'smaller'
+                rows.append({'Scale': scale, 'Stage': stage, 'Metric': metric, 'Baseline': base[metric],
+                             'Current': m[metric], 'Ratio': ratio, 'Flag': flag})
+    return pd.DataFrame(rows, columns=['Scale', 'Stage', 'Metric', 'Baseline', 'Current', 'Ratio', 'Flag'])
+
+def save_results(results, path=None):
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    path = path or os.path.join(BENCHMARK_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the pipeline on synthetic panels")
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=DEFAULT_SCALES,
+                        help="preset sizes (tickers × years): " +
+                             ', '.join(f'{k}={t}×{y}' for k, (t, y) in SCALES.items()))
+    parser.add_argument('--tickers', type=int, help="custom number of tickers (with --years)")
+    parser.add_argument('--years', type=float, help="custom number of years (with --tickers)")
+    parser.add_argument('--missing-rate', type=float, default=MISSING_RATE,
+                        help="share of COT reports and price days dropped")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', nargs='?', const=BASELINE_FILE, default=None,
+                        help=f"compare against a baseline JSON (default {BASELINE_FILE})")
+    parser.add_argument('--save-baseline', action='store_true', help=f"also store the results as {BASELINE_FILE}")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown / growth ratio flagged as a regression")
+    args = parser.parse_args()
+    if (args.tickers is None) != (args.years is None):
+        parser.error("--tickers and --years go together")
+
+    print("=" * 70)
+    print("PIPELINE BENCHMARK (synthetic data, offline)")
+    print("=" * 70)
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    results = run_benchmarks(args.scales, args.missing_rate, args.seed, args.tickers, args.years)
+    path = save_results(results)
+    print(f"\n✓ Results saved to {path}")
+    if args.save_baseline:
+        save_results(results, BASELINE_FILE)
+        print(f"✓ Baseline saved to {BASELINE_FILE}")
+
+    exit_code = 0
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"⚠ Baseline {args.compare} not found - nothing to compare")
+        else:
+            with open(args.compare) as f:
+                comparison = compare_results(results, json.load(f), args.threshold)
+            flagged = comparison[comparison['Flag'].isin(['REGRESSION', 'FAILED'])]
+            print("\n" + "=" * 70)
+            print(f"COMPARISON WITH {args.compare}")
+            print("=" * 70)
+            print(comparison[comparison['Flag'] != ''].to_string(index=False) if (comparison['Flag'] != '').any()
+                  else "No stage changed by more than the threshold")
+            if len(flagged):
+                print(f"\n✗ {len(flagged)} regression(s) above {args.threshold:.2f}x")
+                exit_code = 1
+            else:
+                print(f"\n✓ No regressions above {args.threshold:.2f}x")
+
+    print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    sys.exit(exit_code)
@@ -0,0 +1,188 @@
+"""
+Streaming CFTC Ingestion for "A Tale of Two Premiums" Paper Replication
+Reads yearly Legacy COT zips chunk by chunk, keeping only the replication's columns and contracts
+"""
+
+import pandas as pd
+import zipfile
+import os
+
+from cot_schema import LEGACY_REQUIRED_COLS, is_legacy_date_column, create_commodity_map
+from panel_cache import parquet_available
+
+COMPACT_LEGACY_PARQUET = 'data/cftc_legacy/legacy_cot_compact.parquet'
+COMPACT_LEGACY_CSV = 'data/cftc_legacy/legacy_cot_compact.csv'
+
+# Rows per chunk; peak memory is bounded by this, not by the 1994-2017 history
+CHUNK_ROWS = 50_000
+
+NUMERIC_COLS = ['Open_Interest_All', 'NonComm_Positions_Long_All', 'NonComm_Positions_Short_All',
+                'Comm_Positions_Long_All', 'Comm_Positions_Short_All']
+STRING_COLS = ['CFTC_Contract_Market_Code', 'Market_and_Exchange_Names']
+
+def compact_legacy_file():
+    """Compact store path: Parquet when pyarrow is installed, CSV otherwise"""
+    return COMPACT_LEGACY_PARQUET if parquet_available() else COMPACT_LEGACY_CSV
+
+def legacy_zip_member(names, year):
+    """Annual text file inside a Legacy COT yearly zip (annual.txt, c_year.txt, ...)"""
+    txt_files = [f for f in names if f.endswith('.txt')]
+    for txt_file in txt_files:
+        if 'annual' in txt_file.lower() or 'c_year' in txt_file.lower() or f'{year}' in txt_file:
+            return txt_file
+    # If no annual file found, try the first txt file
+    return txt_files[0] if txt_files else None
+
+def contract_filter():
+    """
+    CFTC codes of the replication's commodities, plus market names for
+    commodities without a code (merge_cot_and_prices falls back to names)
+    """
+    name_map, code_map = create_commodity_map()
+    codes = set(code_map.values())
+    names = [name for ticker, name in name_map.items() if ticker not in code_map]
+    return codes, names
+
+def _normalize_chunk(chunk, codes, names):
+    """Filter one raw chunk to the replication's contracts, with canonical names and types"""
+    # Filter for Futures Only (same rule as the full-file download)
+    if 'Market_and_Exchange_Names' in chunk.columns:
+        chunk = chunk[chunk['Market_and_Exchange_Names'].str.contains('FUTURES ONLY', case=False, na=False)]
+
+    column_map = {}
+    for target_col, possible_names in LEGACY_REQUIRED_COLS.items():
+        for col in chunk.columns:
+            if col in possible_names:
+                column_map[col] = target_col
+                break
+    date_col = next((col for col in chunk.columns if is_legacy_date_column(col)), None)
+    if date_col is None:
+        return None
+    column_map[date_col] = 'Report_Date'
+    chunk = chunk.rename(columns=column_map)
+
+    out = pd.DataFrame({'Report_Date': pd.to_datetime(chunk['Report_Date'], errors='coerce')})
+    for col in STRING_COLS:
+        out[col] = chunk[col].str.strip() if col in chunk.columns else None
+    for col in NUMERIC_COLS:
+        if col in chunk.columns:
+            out[col] = pd.to_numeric(chunk[col].str.strip(), errors='coerce').astype('float64')
+        else:
+            out[col] = float('nan')
+
+    keep = out['CFTC_Contract_Market_Code'].isin(codes)
+    for name in names:
+        keep |= out['Market_and_Exchange_Names'].str.contains(name, case=False, na=False)
+    return out[keep]
+
+def iter_legacy_zip(source, year, chunksize=CHUNK_ROWS):
+    """
+    Yield filtered, typed chunks from one Legacy COT yearly zip
+
+    Parameters:
+    -----------
+    source : path (or file object) of the zip
+    year : report year (used to pick the annual text file)
+    """
+    codes, names = contract_filter()
+    wanted = {name for possible in LEGACY_REQUIRED_COLS.values() for name in possible}
+
+    with zipfile.ZipFile(source) as z:
+        member = legacy_zip_member(z.namelist(), year)
+        if member is None:
+            return
+        with z.open(member) as f:
+            reader = pd.read_csv(f, dtype=str, chunksize=chunksize,
+                                 usecols=lambda c: c.strip() in wanted or is_legacy_date_column(c))
+            for chunk in reader:
+                chunk.columns = [c.strip() for c in chunk.columns]
+                chunk = _normalize_chunk(chunk, codes, names)
+                if chunk is not None and not chunk.empty:
+                    yield chunk
+
+def ingest_legacy_zips(zip_paths, output_file=None, chunksize=CHUNK_ROWS):
+    """
+    Stream yearly Legacy COT zips into one compact typed store
+
+    Parameters:
+    -----------
+    zip_paths : dict of {year: zip path}, ingested in year order
+    output_file : Parquet or CSV path (default: compact_legacy_file())
+
+    Returns:
+    --------
+    counts : dict of {year: rows kept}
+    """
+    output_file = output_file or compact_legacy_file()
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    tmp_file = f'{output_file}.tmp'
+    use_parquet = output_file.endswith('.parquet')
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    writer = None
+    counts = {}
+    try:
+        for year in sorted(zip_paths):
+            counts[year] = 0
+            for chunk in iter_legacy_zip(zip_paths[year], year, chunksize):
+                if use_parquet:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_file, table.schema)
+                    writer.write_table(table)
+                else:
+                    chunk.to_csv(tmp_file, mode='a', index=False, header=writer is None)
+                    writer = True
+                counts[year] += len(chunk)
+    finally:
+        if use_parquet and writer is not None:
+            writer.close()
+
+    if writer is None:
+        return counts
+    os.replace(tmp_file, output_file)
+    return counts
+
+def read_compact_legacy(path=None):
+    """Load the compact Legacy COT store (None if it does not exist)"""
+    path = path or compact_legacy_file()
+    if not os.path.exists(path):
+        return None
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, dtype={'CFTC_Contract_Market_Code': str}, parse_dates=['Report_Date'])
+    # Positions are whole contracts: int64 as in the full CSV, float64 only where values are missing
+    for col in NUMERIC_COLS:
+        if col in df.columns and df[col].notna().all() and (df[col] % 1 == 0).all():
+            df[col] = df[col].astype('int64')
+    return df
+
+def append_compact_legacy(chunks, path=None):
+    """
+    Append new report weeks to the compact Legacy COT store
+
+    Parameters:
+    -----------
+    chunks : list of filtered chunks (from iter_legacy_zip) with only new Report_Dates
+
+    Returns: number of rows appended
+    """
+    path = path or compact_legacy_file()
+    chunks = [chunk for chunk in chunks if not chunk.empty]
+    if not chunks:
+        return 0
+    new_rows = pd.concat(chunks, ignore_index=True)
+
+    if path.endswith('.parquet'):
+        # Parquet files cannot be appended in place; the compact store is small, rewrite it
+        combined = pd.concat([read_compact_legacy(path), new_rows], ignore_index=True)
+        tmp_file = f'{path}.tmp'
+        combined.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, path)
+    else:
+        new_rows.to_csv(path, mode='a', index=False, header=False)
+    return len(new_rows)
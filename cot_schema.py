@@ -0,0 +1,100 @@
+"""
+COT Schema for "A Tale of Two Premiums" Paper Replication
+Legacy COT column names and the mapping between the replication's
+commodities and their CFTC contracts, shared by preprocessing and streaming ingestion
+"""
+
+# Legacy COT columns used by the replication: {target name: possible source names}
+LEGACY_REQUIRED_COLS = {
+    'Open_Interest_All': ['Open Interest (All)', 'Open_Interest_All', 'OI_All'],
+    'NonComm_Positions_Long_All': ['Noncommercial Positions-Long (All)', 'NonComm_Positions_Long_All', 'Noncommercial Long'],
+    'NonComm_Positions_Short_All': ['Noncommercial Positions-Short (All)', 'NonComm_Positions_Short_All', 'Noncommercial Short'],
+    'Comm_Positions_Long_All': ['Commercial Positions-Long (All)', 'Comm_Positions_Long_All', 'Commercial Long'],
+    'Comm_Positions_Short_All': ['Commercial Positions-Short (All)', 'Comm_Positions_Short_All', 'Commercial Short'],
+    'CFTC_Contract_Market_Code': ['CFTC Contract Market Code', 'CFTC_Contract_Market_Code', 'CFTC Code'],
+    'Market_and_Exchange_Names': ['Market and Exchange Names', 'Market_and_Exchange_Names', 'Market']
+}
+
+def is_legacy_date_column(col):
+    """Report date column of the Legacy COT files (e.g. 'As of Date in Form YYYY-MM-DD')"""
+    return 'date' in col.lower() and ('yyyy-mm-dd' in col.lower() or 'report' in col.lower())
+
+def find_legacy_date_column(columns):
+    date_cols = [col for col in columns if is_legacy_date_column(col)]
+    return date_cols[0] if date_cols else None
+
+def create_commodity_map():
+    """
+    Create mapping between Yahoo Finance tickers and CFTC identifiers
+    Returns two mappings: one for names (general) and one for CFTC codes (specific)
+    """
+    # Name-based mapping (for most commodities)
+    name_map = {
+        'CL': 'CRUDE OIL',
+        'HO': 'HEATING OIL',
+        'NG': 'NATURAL GAS',
+        'RB': 'GASOLINE',
+        'GC': 'GOLD',
+        'SI': 'SILVER',
+        'HG': 'COPPER',
+        'PL': 'PLATINUM',
+        'PA': 'PALLADIUM',
+        'ZC': 'CORN',
+        'ZO': 'OATS',
+        'ZS': 'SOYBEANS',
+        'ZL': 'SOYBEAN OIL',
+        'ZM': 'SOYBEAN MEAL',
+        'RR': 'RICE',
+        'KC': 'COFFEE',
+        'SB': 'SUGAR',
+        'CC': 'COCOA',
+        'CT': 'COTTON',
+        'OJ': 'ORANGE JUICE',
+        'LB': 'LUMBER',
+        'LE': 'LIVE CATTLE',
+        'HE': 'LEAN HOGS',
+        'GF': 'FEEDER CATTLE'
+    }
+    
+    # CFTC Code-based mapping for all commodities
+    # Using explicit codes ensures accurate matching and avoids ambiguity
+    code_map = {
+        # Energy
+        'CL': '067651',  # Crude Oil WTI - NYMEX (not ICE Europe)
+        'HO': '022651',  # Heating Oil - NYMEX (main contract, not swaps)
+        'NG': '023651',  # Natural Gas - NYMEX (not ICE)
+        
+        # Precious Metals
+        'GC': '088691',  # Gold - COMEX (not CBOT)
+        'SI': '084691',  # Silver - COMEX (not CBOT)
+        'PL': '076651',  # Platinum - NYMEX
+        'PA': '075651',  # Palladium - NYMEX
+        
+        # Base Metals
+        'HG': '085692',  # Copper - COMEX
+        
+        # Grains 缺少 Minn Wheat
+        'ZW': '001602',  # Wheat SRW - CBOT Chicago
+        'KE': '001612',  # Wheat HRW - KCBT Kansas City
+        'ZC': '002602',  # Corn - CBOT
+        'ZO': '004603',  # Oats - CBOT
+        'ZS': '005602',  # Soybeans - CBOT
+        'ZL': '007601',  # Soybean Oil - CBOT
+        'ZM': '026603',  # Soybean Meal - CBOT
+        'RR': '039601',  # Rough Rice - CBOT
+        
+        # Softs
+        'KC': '083731',  # Coffee - ICE (formerly CSCE)
+        'SB': '080732',  # Sugar #11 - ICE (not #14)
+        'CC': '073732',  # Cocoa - ICE
+        'CT': '033661',  # Cotton #2 - ICE
+        'OJ': '040701',  # Orange Juice - ICE
+        
+        # Livestock
+        'LB': '058643',  # Lumber - CME
+        'LE': '057642',  # Live Cattle - CME
+        'HE': '054642',  # Lean Hogs - CME
+        'GF': '061641',  # Feeder Cattle - CME
+    }
+    
+    return name_map, code_map
@@ -4,13 +4,17 @@ Downloads CFTC position data, commodity futures prices, and macro data
 """
 
 import pandas as pd
-import requests
 import zipfile
 import io
+import argparse
 import os
 from datetime import datetime, timedelta
 import yfinance as yf
-import time
+from http_cache import fetch_all
+from cftc_stream import (legacy_zip_member, ingest_legacy_zips, compact_legacy_file,
+                         iter_legacy_zip, read_compact_legacy, append_compact_legacy)
+from instrumentation import instrumented
+import instrumentation
 
 # Create data directory
 os.makedirs('data', exist_ok=True)
@@ -18,61 +22,89 @@ os.makedirs('data/cftc_legacy', exist_ok=True)
 os.makedirs('data/cftc_disagg', exist_ok=True)
 os.makedirs('data/prices', exist_ok=True)
 
-def download_cftc_legacy(start_year=1994, end_year=2017):
+CFTC_BASE_URL = "https://www.cftc.gov/files/dea/history/"
+
+def _completed_years(years):
+    """Only the current year's file still changes; older yearly files are never revalidated"""
+    return {year: year >= datetime.now().year for year in years}
+
+def _read_legacy_zip(content, year):
+    """Read the annual text file of a Legacy COT yearly zip, Futures Only rows"""
+    z = zipfile.ZipFile(io.BytesIO(content))
+    
+    # Try different file name patterns (annual.txt, c_year.txt, ...)
+    txt_file = legacy_zip_member(z.namelist(), year)
+    if txt_file is None:
+        return None
+    
+    with z.open(txt_file) as f:
+        df = pd.read_csv(f, low_memory=False)
+    
+    # Filter for Futures Only
+    if 'Market_and_Exchange_Names' in df.columns:
+        df = df[df['Market_and_Exchange_Names'].str.contains('FUTURES ONLY', case=False, na=False)]
+    return df
+
+def _read_disagg_zip(content, year):
+    """Read the first text file of a Disaggregated COT yearly zip"""
+    z = zipfile.ZipFile(io.BytesIO(content))
+    
+    # Find txt files
+    txt_files = [f for f in z.namelist() if f.endswith('.txt')]
+    if not txt_files:
+        return None
+    
+    with z.open(txt_files[0]) as f:
+        return pd.read_csv(f, low_memory=False)
+
+def _download_yearly_zips(label, file_pattern, reader, start_year, end_year, base_url, max_workers):
+    """Fetch yearly CFTC zips concurrently (cached), then parse them in year order"""
+    years = list(range(start_year, end_year + 1))
+    urls = {year: f"{base_url}{file_pattern.format(year=year)}" for year in years}
+    revalidate = {urls[year]: flag for year, flag in _completed_years(years).items()}
+    
+    responses = fetch_all(list(urls.values()), max_workers=max_workers, revalidate=revalidate)
+    
+    all_data = []
+    for year in years:
+        result = responses[urls[year]]
+        print(f"Downloading {label} {year}... ", end='')
+        if result['status'] != 200:
+            print(f"✗ ({result['error'][:50]})")
+            continue
+        try:
+            df = reader(result['content'], year)
+        except Exception as e:
+            print(f"✗ (Error: {str(e)[:50]})")
+            continue
+        if df is None:
+            print("✗ (No txt file in zip)")
+            continue
+        all_data.append(df)
+        print(f"✓ ({len(df)} records{', cached' if result['from_cache'] else ''})")
+    
+    return all_data
+
+@instrumented
+def download_cftc_legacy(start_year=1994, end_year=2017, base_url=CFTC_BASE_URL, max_workers=4, stream=True):
     """
     Download CFTC Legacy (COT) Reports - Futures Only
+    Yearly files are fetched concurrently through the local HTTP cache (http_cache.py)
+    
+    stream=True (default) ingests the zips chunk by chunk into a compact store
+    with only the replication's columns and contracts (cftc_stream.py);
+    stream=False writes the full legacy_cot_data.csv as before
     """
     print("=" * 60)
     print("Downloading CFTC Legacy COT Data...")
     print("=" * 60)
     
-    base_url = "https://www.cftc.gov/files/dea/history/"
-    all_data = []
+    if stream:
+        return _stream_cftc_legacy(start_year, end_year, base_url, max_workers)
     
-    for year in range(start_year, end_year + 1):
-        try:
-            # Legacy format: deacotYYYY.zip containing annual.txt or c_year.txt
-            file_name = f"deacot{year}.zip"
-            url = f"{base_url}{file_name}"
-            
-            print(f"Downloading Legacy COT {year}... ", end='')
-            response = requests.get(url, timeout=30)
-            
-            if response.status_code == 200:
-                z = zipfile.ZipFile(io.BytesIO(response.content))
-                
-                # Try different file name patterns
-                txt_files = [f for f in z.namelist() if f.endswith('.txt')]
-                
-                for txt_file in txt_files:
-                    if 'annual' in txt_file.lower() or 'c_year' in txt_file.lower() or f'{year}' in txt_file:
-                        with z.open(txt_file) as f:
-                            df = pd.read_csv(f, low_memory=False)
-                            
-                            # Filter for Futures Only
-                            if 'Market_and_Exchange_Names' in df.columns:
-                                df = df[df['Market_and_Exchange_Names'].str.contains('FUTURES ONLY', case=False, na=False)]
-                            
-                            all_data.append(df)
-                            print(f"✓ ({len(df)} records)")
-                            break
-                else:
-                    # If no annual file found, try the first txt file
-                    if txt_files:
-                        with z.open(txt_files[0]) as f:
-                            df = pd.read_csv(f, low_memory=False)
-                            if 'Market_and_Exchange_Names' in df.columns:
-                                df = df[df['Market_and_Exchange_Names'].str.contains('FUTURES ONLY', case=False, na=False)]
-                            all_data.append(df)
-                            print(f"✓ ({len(df)} records)")
-            else:
-                print(f"✗ (HTTP {response.status_code})")
-                
-        except Exception as e:
-            print(f"✗ (Error: {str(e)[:50]})")
-            continue
-        
-        time.sleep(0.5)  # Be polite to the server
+    # Legacy format: deacotYYYY.zip containing annual.txt or c_year.txt
+    all_data = _download_yearly_zips('Legacy COT', 'deacot{year}.zip', _read_legacy_zip,
+                                     start_year, end_year, base_url, max_workers)
     
     if all_data:
         combined = pd.concat(all_data, ignore_index=True)
@@ -84,7 +116,41 @@ def download_cftc_legacy(start_year=1994, end_year=2017):
         print("\n✗ No Legacy COT data downloaded")
         return None
 
-def download_cftc_disaggregated(start_year=2006, end_year=2017):
+def _stream_cftc_legacy(start_year, end_year, base_url, max_workers):
+    """Cache the yearly zips on disk, then stream them into the compact Legacy COT store"""
+    years = list(range(start_year, end_year + 1))
+    urls = {year: f"{base_url}deacot{year}.zip" for year in years}
+    revalidate = {urls[year]: flag for year, flag in _completed_years(years).items()}
+    
+    responses = fetch_all(list(urls.values()), max_workers=max_workers, revalidate=revalidate, load_content=False)
+    
+    zip_paths = {}
+    for year in years:
+        result = responses[urls[year]]
+        if result['status'] == 200:
+            zip_paths[year] = result['path']
+        else:
+            print(f"Downloading Legacy COT {year}... ✗ ({result['error'][:50]})")
+    
+    output_file = compact_legacy_file()
+    try:
+        counts = ingest_legacy_zips(zip_paths, output_file)
+    except Exception as e:
+        print(f"✗ (Error: {str(e)[:50]})")
+        return None
+    
+    for year, n in counts.items():
+        cached = responses[urls[year]]['from_cache']
+        print(f"Downloading Legacy COT {year}... ✓ ({n} records kept{', cached' if cached else ''})")
+    
+    if sum(counts.values()) == 0:
+        print("\n✗ No Legacy COT data downloaded")
+        return None
+    print(f"\n✓ Compact Legacy COT data saved: {sum(counts.values())} records -> {output_file}")
+    return output_file
+
+@instrumented
+def download_cftc_disaggregated(start_year=2006, end_year=2017, base_url=CFTC_BASE_URL, max_workers=4):
     """
     Download CFTC Disaggregated (DCOT) Reports - Futures Only
     Note: Disaggregated data only available from 2006 onwards
@@ -93,38 +159,9 @@ def download_cftc_disaggregated(start_year=2006, end_year=2017):
     print("Downloading CFTC Disaggregated COT Data...")
     print("=" * 60)
     
-    base_url = "https://www.cftc.gov/files/dea/history/"
-    all_data = []
-    
-    for year in range(start_year, end_year + 1):
-        try:
-            # Disaggregated format: f_year.zip
-            file_name = f"fut_disagg_txt_{year}.zip"
-            url = f"{base_url}{file_name}"
-            
-            print(f"Downloading Disaggregated COT {year}... ", end='')
-            response = requests.get(url, timeout=30)
-            
-            if response.status_code == 200:
-                z = zipfile.ZipFile(io.BytesIO(response.content))
-                
-                # Find txt files
-                txt_files = [f for f in z.namelist() if f.endswith('.txt')]
-                
-                for txt_file in txt_files:
-                    with z.open(txt_file) as f:
-                        df = pd.read_csv(f, low_memory=False)
-                        all_data.append(df)
-                        print(f"✓ ({len(df)} records)")
-                        break
-            else:
-                print(f"✗ (HTTP {response.status_code})")
-                
-        except Exception as e:
-            print(f"✗ (Error: {str(e)[:50]})")
-            continue
-        
-        time.sleep(0.5)
+    # Disaggregated format: fut_disagg_txt_YYYY.zip
+    all_data = _download_yearly_zips('Disaggregated COT', 'fut_disagg_txt_{year}.zip', _read_disagg_zip,
+                                     start_year, end_year, base_url, max_workers)
     
     if all_data:
         combined = pd.concat(all_data, ignore_index=True)
@@ -136,86 +173,130 @@ def download_cftc_disaggregated(start_year=2006, end_year=2017):
         print("\n✗ No Disaggregated COT data downloaded")
         return None
 
-def download_commodity_prices(start_date='1994-01-01', end_date='2017-12-31'):
+# Ticker mapping for Yahoo Finance
+PRICE_TICKERS = {
+    # Energy
+    'CL': 'CL=F',  # Crude Oil
+    'HO': 'HO=F',  # Heating Oil
+    'NG': 'NG=F',  # Natural Gas
+
+    # Metals
+    'PL': 'PL=F',  # Platinum
+    'PA': 'PA=F',  # Palladium
+    'SI': 'SI=F',  # Silver
+    'HG': 'HG=F',  # Copper
+    'GC': 'GC=F',  # Gold
+
+    # Grains
+    'ZW': 'ZW=F',  # Wheat (Chicago)
+    'KE': 'KE=F',  # KC Wheat (Kansas City)
+    'ZC': 'ZC=F',  # Corn
+    'ZO': 'ZO=F',  # Oats
+    'ZS': 'ZS=F',  # Soybean
+    'ZL': 'ZL=F',  # Soybean Oil
+    'ZM': 'ZM=F',  # Soybean Meal
+    'RR': 'ZR=F',  # Rough Rice (use ZR=F instead of RR=F)
+
+    # Softs
+    'CT': 'CT=F',  # Cotton
+    'OJ': 'OJ=F',  # Orange Juice
+    'LB': 'LBS=F',  # Lumber (use LBS=F instead of LB=F)
+    'CC': 'CC=F',  # Cocoa
+    'SB': 'SB=F',  # Sugar
+    'KC': 'KC=F',  # Coffee
+
+    # Livestock
+    'HE': 'HE=F',  # Lean Hogs
+    'LE': 'LE=F',  # Live Cattle
+    'GF': 'GF=F',  # Feeder Cattle
+}
+
+def _price_file_complete(path, end_date, tolerance_days=7):
+    """A saved price file already reaches end_date (within a week of holidays)"""
+    if not os.path.exists(path):
+        return False
+    try:
+        dates = pd.to_datetime(pd.read_csv(path, usecols=['Date'])['Date'], errors='coerce')
+    except Exception:
+        return False
+    return dates.max() >= pd.Timestamp(end_date) - pd.Timedelta(days=tolerance_days)
+
+def _download_batch(tickers, **kwargs):
+    """
+    Download several tickers in one yf.download call and split the result per ticker
+    (yf.download keeps its results in shared module-level dicts, so calls must not run concurrently;
+    threads=True lets yfinance fetch the tickers in parallel itself)
+
+    Returns: dict of {ticker: DataFrame laid out as a single-ticker yf.download}
+    """
+    if not tickers:
+        return {}
+    data = yf.download(list(tickers), group_by='ticker', threads=True, progress=False, **kwargs)
+    frames = {}
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex) and ticker in data.columns.get_level_values(0):
+            df = data[ticker].dropna(how='all')
+            # Aligning tickers on one date index turns Volume into float
+            if 'Volume' in df.columns and df['Volume'].notna().all():
+                df = df.astype({'Volume': 'int64'})
+        else:
+            df = pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+        # (Price, Ticker) columns, as saved by the single-ticker download
+        df.columns = pd.MultiIndex.from_product([list(df.columns), [ticker]], names=['Price', 'Ticker'])
+        frames[ticker] = df
+    return frames
+
+@instrumented
+def download_commodity_prices(start_date='1994-01-01', end_date='2017-12-31', refresh=False):
     """
     Download commodity futures prices from Yahoo Finance
+    All tickers are fetched in one batched request; tickers whose saved file
+    already covers end_date are skipped unless refresh=True
     """
     print("\n" + "=" * 60)
     print("Downloading Commodity Futures Prices...")
     print("=" * 60)
     
-    # Ticker mapping for Yahoo Finance
-    tickers = {
-        # Energy
-        'CL': 'CL=F',  # Crude Oil
-        'HO': 'HO=F',  # Heating Oil
-        'NG': 'NG=F',  # Natural Gas
-
-        # Metals
-        'PL': 'PL=F',  # Platinum
-        'PA': 'PA=F',  # Palladium
-        'SI': 'SI=F',  # Silver
-        'HG': 'HG=F',  # Copper
-        'GC': 'GC=F',  # Gold
-
-        # Grains
-        'ZW': 'ZW=F',  # Wheat (Chicago)
-        'KE': 'KE=F',  # KC Wheat (Kansas City)
-        'ZC': 'ZC=F',  # Corn
-        'ZO': 'ZO=F',  # Oats
-        'ZS': 'ZS=F',  # Soybean
-        'ZL': 'ZL=F',  # Soybean Oil
-        'ZM': 'ZM=F',  # Soybean Meal
-        'RR': 'ZR=F',  # Rough Rice (use ZR=F instead of RR=F)
-
-        # Softs
-        'CT': 'CT=F',  # Cotton
-        'OJ': 'OJ=F',  # Orange Juice
-        'LB': 'LBS=F',  # Lumber (use LBS=F instead of LB=F)
-        'CC': 'CC=F',  # Cocoa
-        'SB': 'SB=F',  # Sugar
-        'KC': 'KC=F',  # Coffee
-
-        # Livestock
-        'HE': 'HE=F',  # Lean Hogs
-        'LE': 'LE=F',  # Live Cattle
-        'GF': 'GF=F',  # Feeder Cattle
-    }
+    pending = {name: ticker for name, ticker in PRICE_TICKERS.items()
+               if refresh or not _price_file_complete(f'data/prices/{name}_prices.csv', end_date)}
+    try:
+        frames = _download_batch(list(pending.values()), start=start_date, end=end_date, auto_adjust=False)
+        error = None
+    except Exception as e:
+        frames, error = {}, str(e)[:40]
     
     price_data = {}
-    
-    for name, ticker in tickers.items():
-        try:
-            print(f"Downloading {name:12} ({ticker:8})... ", end='')
-            df = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=False)
-            
-            if not df.empty:
-                # Reset index to have Date as column
-                df = df.reset_index()
-                # Select only needed columns
-                if 'Date' in df.columns and 'Close' in df.columns:
-                    df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
-                    df['Ticker'] = name
-                    price_data[name] = df
-                    print(f"✓ ({len(df)} days)")
-                else:
-                    print("✗ (Missing columns)")
-            else:
-                print("✗ (No data)")
-                
-        except Exception as e:
-            print(f"✗ (Error: {str(e)[:40]})")
+    for name, ticker in PRICE_TICKERS.items():
+        print(f"Downloading {name:12} ({ticker:8})... ", end='')
+        if name not in pending:
+            print("✓ (up to date, skipped)")
+            continue
+        if error is not None:
+            print(f"✗ (Error: {error})")
             continue
         
-        time.sleep(0.3)
-    
-    # Save individual commodity files
-    for name, df in price_data.items():
-        df.to_csv(f'data/prices/{name}_prices.csv', index=False)
+        df = frames.get(ticker)
+        if df is None or df.empty:
+            print("✗ (No data)")
+            continue
+        
+        # Reset index to have Date as column
+        df = df.reset_index()
+        # Select only needed columns
+        if 'Date' in df.columns and 'Close' in df.columns:
+            df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+            df['Ticker'] = name
+            # Saved right away, so an interrupted run resumes
+            df.to_csv(f'data/prices/{name}_prices.csv', index=False)
+            price_data[name] = df
+            print(f"✓ ({len(df)} days)")
+        else:
+            print("✗ (Missing columns)")
     
     print(f"\n✓ Downloaded prices for {len(price_data)} commodities")
     return price_data
 
+@instrumented
 def download_macro_data(start_date='1994-01-01', end_date='2017-12-31'):
     """
     Download macro data: VIX and S&P 500
@@ -250,27 +331,173 @@ def download_macro_data(start_date='1994-01-01', end_date='2017-12-31'):
     print(f"\n✓ Downloaded {len(macro_data)} macro datasets")
     return macro_data
 
-if __name__ == "__main__":
+# ============================================================================
+# Weekly update (--update): only report weeks and trading days after the last stored date
+# ============================================================================
+def _last_saved_date(path):
+    """Latest date in the first column of a saved CSV (None if missing)"""
+    if not os.path.exists(path):
+        return None
+    dates = pd.to_datetime(pd.read_csv(path, usecols=[0]).iloc[:, 0], format='%Y-%m-%d', errors='coerce')
+    return dates.max() if dates.notna().any() else None
+
+@instrumented
+def update_cftc_legacy(base_url=CFTC_BASE_URL):
+    """
+    Append Legacy COT report weeks newer than the compact store
+    Only the yearly file(s) from the last stored report year onwards are fetched
+    (normally just the current year's, revalidated through the HTTP cache)
+    """
+    print("=" * 60)
+    print("Updating CFTC Legacy COT Data...")
+    print("=" * 60)
+    
+    existing = read_compact_legacy()
+    if existing is None or existing.empty:
+        print("✗ Compact Legacy COT store not found - run a full download first")
+        return 0
+    last_date = existing['Report_Date'].max()
+    print(f"Last stored report: {last_date.date()}")
+    
+    years = list(range(last_date.year, datetime.now().year + 1))
+    urls = {year: f"{base_url}deacot{year}.zip" for year in years}
+    responses = fetch_all(list(urls.values()), revalidate=True, load_content=False)
+    
+    new_chunks = []
+    for year in years:
+        result = responses[urls[year]]
+        print(f"Checking Legacy COT {year}... ", end='')
+        if result['status'] != 200:
+            print(f"✗ ({result['error'][:50]})")
+            continue
+        chunks = [chunk[chunk['Report_Date'] > last_date] for chunk in iter_legacy_zip(result['path'], year)]
+        n_new = sum(len(chunk) for chunk in chunks)
+        new_chunks.extend(chunks)
+        print(f"✓ ({n_new} new records)")
+    
+    appended = append_compact_legacy(new_chunks)
+    print(f"\n✓ Appended {appended} records -> {compact_legacy_file()}")
+    return appended
+
+def _download_new_rows(ticker, last_date, end_date, **kwargs):
+    """yfinance rows strictly after last_date (empty DataFrame if none)"""
+    start = (last_date + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    df = yf.download(ticker, start=start, end=end_date, progress=False, **kwargs)
+    if df.empty:
+        return df
+    return df[df.index > last_date]
+
+@instrumented
+def update_commodity_prices(end_date=None):
+    """
+    Append trading days after the last saved date to each commodity price file
+    All tickers are fetched in one batched request from the earliest last saved date
+    """
     print("\n" + "=" * 60)
-    print("DATA ACQUISITION FOR TWO PREMIUMS PAPER REPLICATION")
+    print("Updating Commodity Futures Prices...")
     print("=" * 60)
-    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
-    # 1. Download CFTC Legacy COT data
-    legacy_data = download_cftc_legacy(start_year=1994, end_year=2017)
+    # yfinance's end date is exclusive
+    end_date = end_date or (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    last_dates = {name: _last_saved_date(f'data/prices/{name}_prices.csv') for name in PRICE_TICKERS}
+    saved = [d for d in last_dates.values() if d is not None]
+    try:
+        start = (min(saved) + pd.Timedelta(days=1)).strftime('%Y-%m-%d') if saved else None
+        frames = _download_batch([PRICE_TICKERS[n] for n, d in last_dates.items() if d is not None],
+                                 start=start, end=end_date, auto_adjust=False)
+        error = None
+    except Exception as e:
+        frames, error = {}, str(e)[:40]
+    
+    total = 0
+    for name, ticker in PRICE_TICKERS.items():
+        print(f"Updating {name:12} ({ticker:8})... ", end='')
+        last_date = last_dates[name]
+        if last_date is None:
+            print("✗ (no saved file - run a full download first)")
+            continue
+        if error is not None:
+            print(f"✗ (Error: {error})")
+            continue
+        
+        df = frames[ticker]
+        df = df[df.index > last_date]
+        if df.empty:
+            print("✓ (up to date)")
+            continue
+        
+        # Same layout as download_commodity_prices
+        df = df.reset_index()
+        df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+        df['Ticker'] = name
+        df.to_csv(f'data/prices/{name}_prices.csv', mode='a', index=False, header=False)
+        total += len(df)
+        print(f"✓ ({len(df)} new days)")
+    
+    print(f"\n✓ Appended {total} daily prices")
+    return total
+
+@instrumented
+def update_macro_data(end_date=None):
+    """
+    Append trading days after the last saved date to the VIX and S&P 500 files
+    """
+    print("\n" + "=" * 60)
+    print("Updating Macro Data...")
+    print("=" * 60)
     
-    # 2. Download CFTC Disaggregated COT data (from 2006)
-    disagg_data = download_cftc_disaggregated(start_year=2006, end_year=2017)
+    end_date = end_date or (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    for name, ticker in {'VIX': '^VIX', 'SPX': '^GSPC'}.items():
+        output_file = f'data/{name}_data.csv'
+        print(f"Updating {name}... ", end='')
+        last_date = _last_saved_date(output_file)
+        if last_date is None:
+            print("✗ (no saved file - run a full download first)")
+            continue
+        try:
+            df = _download_new_rows(ticker, last_date, end_date)
+        except Exception as e:
+            print(f"✗ (Error: {str(e)[:40]})")
+            continue
+        # Same layout as download_macro_data (date index, yfinance column order)
+        df.to_csv(output_file, mode='a', header=False)
+        print(f"✓ ({len(df)} new days)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download CFTC, price and macro data")
+    parser.add_argument('--update', action='store_true',
+                        help="append only report weeks and trading days after the last stored date")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.start_run(args)
     
-    # 3. Download commodity futures prices
-    price_data = download_commodity_prices(start_date='1994-01-01', end_date='2017-12-31')
+    print("\n" + "=" * 60)
+    print("DATA ACQUISITION FOR TWO PREMIUMS PAPER REPLICATION")
+    print("=" * 60)
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
-    # 4. Download macro data
-    macro_data = download_macro_data(start_date='1994-01-01', end_date='2017-12-31')
+    if args.update:
+        # Weekly job: latest COT report(s), then new daily prices
+        update_cftc_legacy()
+        update_commodity_prices()
+        update_macro_data()
+    else:
+        # 1. Download CFTC Legacy COT data
+        legacy_data = download_cftc_legacy(start_year=1994, end_year=2017)
+        
+        # 2. Download CFTC Disaggregated COT data (from 2006)
+        disagg_data = download_cftc_disaggregated(start_year=2006, end_year=2017)
+        
+        # 3. Download commodity futures prices
+        price_data = download_commodity_prices(start_date='1994-01-01', end_date='2017-12-31')
+        
+        # 4. Download macro data
+        macro_data = download_macro_data(start_date='1994-01-01', end_date='2017-12-31')
     
     print("\n" + "=" * 60)
     print("DATA ACQUISITION COMPLETED")
     print("=" * 60)
     print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("\nData saved in ./data/ directory")
-    print("Next step: Run data_preprocessing.py")
+    print(f"Next step: Run data_preprocessing.py{' --update' if args.update else ''}")
+    instrumentation.finish_run('data_acquisition')
@@ -7,8 +7,16 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import datetime, timedelta
-import glob
+import argparse
+from panel_cache import write_processed_panel
+from price_store import load_price_frames, load_weekly_prices, price_file_ticker
+from cot_schema import LEGACY_REQUIRED_COLS, find_legacy_date_column, create_commodity_map
+from cftc_stream import compact_legacy_file, read_compact_legacy
+from trader_kernel import TRADER_CATEGORIES, DCOT_CATEGORIES, trader_columns, trader_kernel, position_tensor
+from instrumentation import instrumented
+import instrumentation
 
+@instrumented
 def load_cftc_data():
     """
     Load and preprocess CFTC data
@@ -17,9 +25,13 @@ def load_cftc_data():
     print("Loading CFTC Data...")
     print("=" * 60)
     
-    # Load Legacy COT data
+    # Load Legacy COT data: compact streamed store first (see cftc_stream.py), full CSV otherwise
     legacy_file = 'data/cftc_legacy/legacy_cot_data.csv'
-    if os.path.exists(legacy_file):
+    if os.path.exists(compact_legacy_file()):
+        print(f"Loading compact Legacy COT data... ", end='')
+        legacy_df = read_compact_legacy()
+        print(f"✓ ({len(legacy_df)} records)")
+    elif os.path.exists(legacy_file):
         print(f"Loading Legacy COT data... ", end='')
         legacy_df = pd.read_csv(legacy_file, low_memory=False)
         print(f"✓ ({len(legacy_df)} records)")
@@ -39,6 +51,7 @@ def load_cftc_data():
     
     return legacy_df, disagg_df
 
+@instrumented
 def process_cftc_legacy(df):
     """
     Process Legacy COT data and extract relevant columns
@@ -49,9 +62,8 @@ def process_cftc_legacy(df):
     print("\nProcessing Legacy COT data...")
     
     # Parse date column - try different column names
-    date_cols = [col for col in df.columns if 'date' in col.lower() and ('yyyy-mm-dd' in col.lower() or 'report' in col.lower())]
-    if date_cols:
-        date_col = date_cols[0]
+    date_col = find_legacy_date_column(df.columns)
+    if date_col is not None:
         df['Report_Date'] = pd.to_datetime(df[date_col], errors='coerce')
     else:
         print("✗ Could not find report date column")
@@ -59,15 +71,7 @@ def process_cftc_legacy(df):
         return None
     
     # Extract relevant columns
-    required_cols = {
-        'Open_Interest_All': ['Open Interest (All)', 'Open_Interest_All', 'OI_All'],
-        'NonComm_Positions_Long_All': ['Noncommercial Positions-Long (All)', 'NonComm_Positions_Long_All', 'Noncommercial Long'],
-        'NonComm_Positions_Short_All': ['Noncommercial Positions-Short (All)', 'NonComm_Positions_Short_All', 'Noncommercial Short'],
-        'Comm_Positions_Long_All': ['Commercial Positions-Long (All)', 'Comm_Positions_Long_All', 'Commercial Long'],
-        'Comm_Positions_Short_All': ['Commercial Positions-Short (All)', 'Comm_Positions_Short_All', 'Commercial Short'],
-        'CFTC_Contract_Market_Code': ['CFTC Contract Market Code', 'CFTC_Contract_Market_Code', 'CFTC Code'],
-        'Market_and_Exchange_Names': ['Market and Exchange Names', 'Market_and_Exchange_Names', 'Market']
-    }
+    required_cols = LEGACY_REQUIRED_COLS
     
     # Map columns
     column_map = {}
@@ -97,6 +101,7 @@ def process_cftc_legacy(df):
     print(f"✓ Processed {len(df_processed)} records")
     return df_processed
 
+@instrumented
 def process_cftc_disaggregated(df):
     """
     Process Disaggregated COT data
@@ -149,60 +154,138 @@ def process_cftc_disaggregated(df):
         if col in df_processed.columns:
             df_processed[col] = pd.to_numeric(df_processed[col], errors='coerce')
     
+    # Zero-padded codes as in the legacy report (the yearly files may store them as integers)
+    if 'CFTC_Contract_Market_Code' in df_processed.columns:
+        df_processed['CFTC_Contract_Market_Code'] = (df_processed['CFTC_Contract_Market_Code']
+                                                     .astype(str).str.strip().str.zfill(6))
+    
     # Remove rows with missing critical data
     df_processed = df_processed.dropna(subset=['Report_Date', 'Open_Interest_All'])
     
     print(f"✓ Processed {len(df_processed)} records")
     return df_processed
 
+def resample_price_file(file):
+    """
+    Weekly (Tuesday) prices of one commodity price file, from the shared price store
+    
+    Returns: DataFrame with a single '{ticker}_Close' column, or None if unusable
+    """
+    ticker = price_file_ticker(file)
+    frames = load_price_frames([file])
+    if ticker not in frames:
+        return None
+    daily, weekly = frames[ticker]
+    return weekly[['Close']].rename(columns={'Close': f'{ticker}_Close'})
+
+@instrumented
 def load_and_resample_prices():
     """
     Load commodity price data and resample to weekly (Tuesday)
+    Each file is parsed once and cached (see price_store.py)
     """
     print("\n" + "=" * 60)
     print("Loading and Resampling Price Data...")
     print("=" * 60)
     
-    price_files = glob.glob('data/prices/*_prices.csv')
     price_dict = {}
-    
-    for file in price_files:
-        ticker = os.path.basename(file).replace('_prices.csv', '')
-        try:
-            # Read price file
-            df = pd.read_csv(file)
-            
-            # Parse date column
-            if 'Date' in df.columns:
-                df['Date'] = pd.to_datetime(df['Date'])
-                df = df.set_index('Date')
-            else:
-                continue
-            
-            # Ensure Close column is numeric
-            if 'Close' in df.columns:
-                df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
-            else:
-                continue
-            
-            # Drop rows with NaN in Close
-            df = df.dropna(subset=['Close'])
-            
-            # Resample to weekly, using Tuesday as anchor
-            # COT reports show positions as of Tuesday close
-            df_weekly = df.resample('W-TUE').last()
-            
-            # Keep only Close price and rename
-            if 'Close' in df_weekly.columns:
-                price_dict[ticker] = df_weekly[['Close']].rename(columns={'Close': f'{ticker}_Close'})
-                print(f"✓ {ticker:12} - {len(df_weekly)} weekly observations")
-            
-        except Exception as e:
-            print(f"✗ {ticker:12} - Error: {str(e)[:40]}")
-            continue
+    for ticker, weekly in load_weekly_prices().items():
+        price_dict[ticker] = weekly[['Close']].rename(columns={'Close': f'{ticker}_Close'})
+        print(f"✓ {ticker:12} - {len(weekly)} weekly observations")
     
     return price_dict
 
+# Disaggregated columns joined onto the legacy rows (open interest renamed to keep the legacy one)
+DISAGG_COLUMNS = {'Open_Interest_All': 'Disagg_Open_Interest_All'}
+DISAGG_COLUMNS.update({col: col for category in DCOT_CATEGORIES for col in TRADER_CATEGORIES[category][:2]})
+
+# Smoothed HP window; also the number of stored rows an update recomputes from
+HP_SMOOTH_WINDOW = 52
+HP_SMOOTH_MIN_PERIODS = 26
+
+def trailing_mean(values, window, min_periods):
+    """
+    Trailing rolling mean whose value depends only on the window's contents
+    
+    Each window is summed left to right, so a row's mean is the same whether the
+    series starts at the beginning of the sample or `window - 1` rows earlier
+    (an incremental update reproduces a full rebuild bit for bit).
+    A 2-D array is averaged along axis 0, each column on its own.
+    """
+    values = np.asarray(values, dtype=float)
+    padded = np.concatenate([np.full((window - 1,) + values.shape[1:], np.nan), values])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+    
+    sums = np.zeros(values.shape)
+    counts = np.zeros(values.shape, dtype=int)
+    for j in range(window):
+        column = windows[..., j]
+        valid = ~np.isnan(column)
+        sums = sums + np.where(valid, column, 0.0)
+        counts += valid
+    
+    return np.where(counts >= min_periods, sums / np.maximum(counts, 1), np.nan)
+
+def variables_many(frames):
+    """
+    Variables of equations (1)-(4) for many commodities in one pass
+    
+    Positions and prices of all commodities are stacked into (week × commodity)
+    arrays; HP, NetLong, Q and PT of every trader category come from one
+    trader_kernel call, returns and the smoothed HP from one array operation each.
+    
+    Parameters:
+    -----------
+    frames : list of per-commodity DataFrames (rows in date order)
+    
+    Returns:
+    --------
+    variables : list of DataFrames (one per frame, on its index) with
+        HP*, NetLong_*, Q_*, PT_* (categories the frame has), Ret, Ret_Lead, HP_Smooth_52w
+    """
+    long, short, oi, present, available = position_tensor(frames)
+    trader = trader_kernel(long, short, oi)
+    
+    # Equation (4): Excess Return R_{t+1} = (F_{t+1} - F_t) / F_t, and next week's return
+    price_cols = [next((col for col in f.columns if 'Close' in col), None) for f in frames]
+    prices = np.full(long.shape[:2], np.nan)
+    for i, (frame, col) in enumerate(zip(frames, price_cols)):
+        if col is not None:
+            prices[:len(frame), i] = frame[col].to_numpy(dtype=float)
+    ret = prices / np.vstack([np.full((1, len(frames)), np.nan), prices[:-1]]) - 1
+    
+    # Smoothed HP: 52-week trailing average of the commercial HP
+    hp_smooth = None
+    if 'Comm' in present:
+        hp_smooth = trailing_mean(trader['HP'][:, :, present.index('Comm')], HP_SMOOTH_WINDOW, HP_SMOOTH_MIN_PERIODS)
+    
+    variables = []
+    for i, (frame, col) in enumerate(zip(frames, price_cols)):
+        n = len(frame)
+        categories = [(j, c) for j, c in enumerate(present) if available[i, j]]
+        # Column order: every HP, then NetLong and Q per category, then every PT
+        columns = {trader_columns(c)['HP']: trader['HP'][:n, i, j] for j, c in categories}
+        for j, category in categories:
+            long_col, short_col, _ = TRADER_CATEGORIES[category]
+            # Integer positions give integer net longs, as in the per-column arithmetic
+            dtype = np.result_type(frame[long_col].dtype, frame[short_col].dtype)
+            net = trader['NetLong'][:n, i, j]
+            columns[trader_columns(category)['NetLong']] = net.astype(dtype) if dtype.kind in 'iu' else net
+            columns[trader_columns(category)['Q']] = trader['Q'][:n, i, j]
+        columns.update({trader_columns(c)['PT']: trader['PT'][:n, i, j] for j, c in categories})
+        if col is not None:
+            columns['Ret'] = ret[:n, i]
+            columns['Ret_Lead'] = np.r_[ret[1:n, i], np.nan] if n else ret[:0, i]
+        if 'HP' in columns:
+            columns['HP_Smooth_52w'] = hp_smooth[:n, i]
+        variables.append(pd.DataFrame(columns, index=frame.index))
+    return variables
+
+def _with_variables(df, variables):
+    """df with the variables columns appended (existing columns of the same name are replaced)"""
+    return pd.concat([df.drop(columns=[c for c in variables.columns if c in df.columns]), variables], axis=1)
+
+@instrumented
 def calculate_variables(df):
     """
     Calculate variables according to paper equations (1)-(4)
@@ -211,80 +294,66 @@ def calculate_variables(df):
     -----------
     df : DataFrame with columns:
         - Open_Interest_All (OI)
-        - Comm_Positions_Long_All, Comm_Positions_Short_All
-        - NonComm_Positions_Long_All, NonComm_Positions_Short_All
+        - long / short positions of the TRADER_CATEGORIES (legacy and, if merged, disaggregated)
         - Close price
     
     Returns:
     --------
     df : DataFrame with additional columns:
-        - HP: Hedging Pressure
-        - Q_Comm, Q_NonComm: Net Trading
+        - HP, HP_{category}: Hedging Pressure
+        - NetLong_{category}, Q_{category}: Net Trading
+        - PT_{category}: Propensity to Trade
         - Ret: Excess Return
     """
     print("\n" + "=" * 60)
     print("Calculating Variables...")
     print("=" * 60)
     
-    # Equation (1): Hedging Pressure (HP)
-    # HP = (Comm_Short - Comm_Long) / OI
-    if 'Comm_Positions_Short_All' in df.columns and 'Comm_Positions_Long_All' in df.columns:
-        df['HP'] = (df['Comm_Positions_Short_All'] - df['Comm_Positions_Long_All']) / df['Open_Interest_All']
-        print("✓ Calculated Hedging Pressure (HP)")
-    
-    # Equation (2): Net Trading (Q)
-    # Q = (NetLong_t - NetLong_{t-1}) / OI_{t-1} * 100  (in percentage)
-    # NOTE: Do NOT use absolute value - Q can be positive or negative
-    # Positive Q = increasing net long position
-    # Negative Q = decreasing net long position
-    
-    # For Commercial (Hedgers)
-    if 'Comm_Positions_Long_All' in df.columns and 'Comm_Positions_Short_All' in df.columns:
-        df['NetLong_Comm'] = df['Comm_Positions_Long_All'] - df['Comm_Positions_Short_All']
-        df['Q_Comm'] = df['NetLong_Comm'].diff() / df['Open_Interest_All'].shift(1) * 100
-        print("✓ Calculated Net Trading for Commercial (Q_Comm) in percentage (without abs)")
-    
-    # For Non-Commercial (Speculators)
-    if 'NonComm_Positions_Long_All' in df.columns and 'NonComm_Positions_Short_All' in df.columns:
-        df['NetLong_NonComm'] = df['NonComm_Positions_Long_All'] - df['NonComm_Positions_Short_All']
-        df['Q_NonComm'] = df['NetLong_NonComm'].diff() / df['Open_Interest_All'].shift(1) * 100
-        print("✓ Calculated Net Trading for Non-Commercial (Q_NonComm) in percentage (without abs)")
-    
-    # Equation (3): Propensity to Trade (PT)
-    # PT = (|ΔLong| + |ΔShort|) / (Long + Short)
-    
-    if 'Comm_Positions_Long_All' in df.columns and 'Comm_Positions_Short_All' in df.columns:
-        delta_long_comm = df['Comm_Positions_Long_All'].diff().abs()
-        delta_short_comm = df['Comm_Positions_Short_All'].diff().abs()
-        total_comm = df['Comm_Positions_Long_All'] + df['Comm_Positions_Short_All']
-        df['PT_Comm'] = (delta_long_comm + delta_short_comm) / total_comm
-        print("✓ Calculated Propensity to Trade for Commercial (PT_Comm)")
-    
-    if 'NonComm_Positions_Long_All' in df.columns and 'NonComm_Positions_Short_All' in df.columns:
-        delta_long_noncomm = df['NonComm_Positions_Long_All'].diff().abs()
-        delta_short_noncomm = df['NonComm_Positions_Short_All'].diff().abs()
-        total_noncomm = df['NonComm_Positions_Long_All'] + df['NonComm_Positions_Short_All']
-        df['PT_NonComm'] = (delta_long_noncomm + delta_short_noncomm) / total_noncomm
-        print("✓ Calculated Propensity to Trade for Non-Commercial (PT_NonComm)")
-    
-    # Equation (4): Excess Return (R)
-    # R_{t+1} = (F_{t+1} - F_t) / F_t
-    price_col = [col for col in df.columns if 'Close' in col]
-    if price_col:
-        price_col = price_col[0]
-        df['Ret'] = df[price_col].pct_change()
-        # Lead return by 1 period (next week's return)
-        df['Ret_Lead'] = df['Ret'].shift(-1)
-        print(f"✓ Calculated Returns using {price_col}")
-    
-    # Smoothed HP: 52-week rolling average
-    if 'HP' in df.columns:
-        df['HP_Smooth_52w'] = df['HP'].rolling(window=52, min_periods=26).mean()
+    variables = variables_many([df])[0]
+    for category in TRADER_CATEGORIES:
+        if trader_columns(category)['Q'] in variables.columns:
+            print(f"✓ Calculated HP, Q and PT for {category}")
+    if 'Ret' in variables.columns:
+        print(f"✓ Calculated Returns using {next(col for col in df.columns if 'Close' in col)}")
+    if 'HP_Smooth_52w' in variables.columns:
         print("✓ Calculated 52-week smoothed HP")
     
-    return df
+    return _with_variables(df, variables)
 
-def merge_cot_and_prices(cot_df, price_dict, commodity_map):
+@instrumented
+def calculate_variables_many(merged_dict):
+    """
+    calculate_variables for every commodity at once (one kernel pass over all of them)
+    
+    Parameters:
+    -----------
+    merged_dict : dict of {ticker: merged_df} from merge_cot_and_prices
+    
+    Returns:
+    --------
+    processed : dict of {ticker: DataFrame with the variables added}
+    """
+    print("\n" + "=" * 60)
+    print(f"Calculating Variables for {len(merged_dict)} commodities...")
+    print("=" * 60)
+    
+    frames = list(merged_dict.values())
+    processed = {ticker: _with_variables(df, variables)
+                 for (ticker, df), variables in zip(merged_dict.items(), variables_many(frames))}
+    print(f"✓ Calculated HP, Q, PT, returns and smoothed HP ({sum(len(df) for df in frames):,} rows)")
+    return processed
+
+def _match_cot(cot_df, ticker, name_map, code_map):
+    """Rows of one commodity in a COT report: by CFTC code if mapped, by market name otherwise"""
+    if ticker in code_map:
+        cftc_code = code_map[ticker]
+        return cot_df[cot_df['CFTC_Contract_Market_Code'] == cftc_code], f"CFTC Code {cftc_code}"
+    commodity_name = name_map.get(ticker, ticker)
+    return (cot_df[cot_df['Market_and_Exchange_Names'].str.contains(commodity_name, case=False, na=False)],
+            f"Name '{commodity_name}'")
+
+@instrumented
+def merge_cot_and_prices(cot_df, price_dict, commodity_map, disagg_df=None):
     """
     Merge COT data with price data based on commodity matching
     
@@ -293,6 +362,8 @@ def merge_cot_and_prices(cot_df, price_dict, commodity_map):
     cot_df : DataFrame with COT data
     price_dict : dict of {ticker: price_df}
     commodity_map : tuple of (name_map, code_map)
+    disagg_df : processed Disaggregated COT data (optional); its trader positions
+        are joined onto the legacy weeks (NaN before the DCOT sample starts)
     
     Returns:
     --------
@@ -306,17 +377,8 @@ def merge_cot_and_prices(cot_df, price_dict, commodity_map):
     merged_dict = {}
     
     for ticker, price_df in price_dict.items():
-        # Try code-based matching first (more precise)
-        if ticker in code_map:
-            cftc_code = code_map[ticker]
-            cot_subset = cot_df[cot_df['CFTC_Contract_Market_Code'] == cftc_code]
-            match_method = f"CFTC Code {cftc_code}"
-        else:
-            # Fall back to name-based matching
-            commodity_name = name_map.get(ticker, ticker)
-            cot_subset = cot_df[cot_df['Market_and_Exchange_Names'].str.contains(
-                commodity_name, case=False, na=False)]
-            match_method = f"Name '{commodity_name}'"
+        # Code-based matching first (more precise), name-based otherwise
+        cot_subset, match_method = _match_cot(cot_df, ticker, name_map, code_map)
         
         if not cot_subset.empty:
             # Set Report_Date as index
@@ -328,6 +390,8 @@ def merge_cot_and_prices(cot_df, price_dict, commodity_map):
             if not merged.empty:
                 # Sort by date in ascending order
                 merged = merged.sort_index()
+                if disagg_df is not None:
+                    merged = merged.join(disaggregated_positions(disagg_df, ticker, commodity_map), how='left')
                 merged_dict[ticker] = merged
                 print(f"✓ {ticker:12} - {len(merged):4} obs via {match_method}")
             else:
@@ -337,83 +401,87 @@ def merge_cot_and_prices(cot_df, price_dict, commodity_map):
     
     return merged_dict
 
-def create_commodity_map():
+def disaggregated_positions(disagg_df, ticker, commodity_map):
     """
-    Create mapping between Yahoo Finance tickers and CFTC identifiers
-    Returns two mappings: one for names (general) and one for CFTC codes (specific)
+    Disaggregated trader positions of one commodity, indexed by report date
+    
+    Returns: DataFrame with the DISAGG_COLUMNS present in disagg_df (one row per report week)
     """
-    # Name-based mapping (for most commodities)
-    name_map = {
-        'CL': 'CRUDE OIL',
-        'HO': 'HEATING OIL',
-        'NG': 'NATURAL GAS',
-        'RB': 'GASOLINE',
-        'GC': 'GOLD',
-        'SI': 'SILVER',
-        'HG': 'COPPER',
-        'PL': 'PLATINUM',
-        'PA': 'PALLADIUM',
-        'ZC': 'CORN',
-        'ZO': 'OATS',
-        'ZS': 'SOYBEANS',
-        'ZL': 'SOYBEAN OIL',
-        'ZM': 'SOYBEAN MEAL',
-        'RR': 'RICE',
-        'KC': 'COFFEE',
-        'SB': 'SUGAR',
-        'CC': 'COCOA',
-        'CT': 'COTTON',
-        'OJ': 'ORANGE JUICE',
-        'LB': 'LUMBER',
-        'LE': 'LIVE CATTLE',
-        'HE': 'LEAN HOGS',
-        'GF': 'FEEDER CATTLE'
-    }
+    name_map, code_map = commodity_map
+    subset, _ = _match_cot(disagg_df, ticker, name_map, code_map)
+    columns = {src: dst for src, dst in DISAGG_COLUMNS.items() if src in subset.columns}
+    positions = subset.set_index('Report_Date')[list(columns)].rename(columns=columns)
+    return positions[~positions.index.duplicated(keep='last')].sort_index()
+
+def read_processed_file(path):
+    """Read a processed CSV back exactly as it was written (round-trip float parsing)"""
+    return pd.read_csv(path, index_col=0, parse_dates=True, float_precision='round_trip',
+                       dtype={'CFTC_Contract_Market_Code': str})
+
+@instrumented
+def update_processed_data(merged_dict, processed_dir='data/processed'):
+    """
+    Append report weeks newer than each processed file
     
-    # CFTC Code-based mapping for all commodities
-    # Using explicit codes ensures accurate matching and avoids ambiguity
-    code_map = {
-        # Energy
-        'CL': '067651',  # Crude Oil WTI - NYMEX (not ICE Europe)
-        'HO': '022651',  # Heating Oil - NYMEX (main contract, not swaps)
-        'NG': '023651',  # Natural Gas - NYMEX (not ICE)
-        
-        # Precious Metals
-        'GC': '088691',  # Gold - COMEX (not CBOT)
-        'SI': '084691',  # Silver - COMEX (not CBOT)
-        'PL': '076651',  # Platinum - NYMEX
-        'PA': '075651',  # Palladium - NYMEX
-        
-        # Base Metals
-        'HG': '085692',  # Copper - COMEX
-        
-        # Grains 缺少 Minn Wheat
-        'ZW': '001602',  # Wheat SRW - CBOT Chicago
-        'KE': '001612',  # Wheat HRW - KCBT Kansas City
-        'ZC': '002602',  # Corn - CBOT
-        'ZO': '004603',  # Oats - CBOT
-        'ZS': '005602',  # Soybeans - CBOT
-        'ZL': '007601',  # Soybean Oil - CBOT
-        'ZM': '026603',  # Soybean Meal - CBOT
-        'RR': '039601',  # Rough Rice - CBOT
+    Only the last HP_SMOOTH_WINDOW stored rows are recomputed together with the
+    new weeks: enough history for the 52-week smoothed HP and for Q, PT and Ret
+    (one lag), and the last stored row gets its Ret_Lead. Every other stored row
+    is kept as written, so the result equals a full rebuild.
+    
+    Parameters:
+    -----------
+    merged_dict : dict of {ticker: merged_df} from merge_cot_and_prices
+    
+    Returns:
+    --------
+    processed : dict of {ticker: processed df} for every ticker (updated or not)
+    """
+    print("\n" + "=" * 60)
+    print("Updating Processed Data...")
+    print("=" * 60)
+    
+    processed = {}
+    for ticker, merged in merged_dict.items():
+        output_file = os.path.join(processed_dir, f'{ticker}_processed.csv')
+        existing = read_processed_file(output_file) if os.path.exists(output_file) else None
         
-        # Softs
-        'KC': '083731',  # Coffee - ICE (formerly CSCE)
-        'SB': '080732',  # Sugar #11 - ICE (not #14)
-        'CC': '073732',  # Cocoa - ICE
-        'CT': '033661',  # Cotton #2 - ICE
-        'OJ': '040701',  # Orange Juice - ICE
+        if existing is not None and not existing.empty:
+            last_date = existing.index.max()
+            n_new = int((merged.index > last_date).sum())
+            if n_new == 0:
+                processed[ticker] = existing
+                print(f"✓ {ticker:12} - up to date ({last_date.date()})")
+                continue
+            
+            context_start = existing.index[-HP_SMOOTH_WINDOW:][0]
+            tail = calculate_variables(merged.loc[context_start:].copy()).sort_index().loc[last_date:]
+            # Stored rows must be the same report weeks with the same columns, otherwise rebuild
+            same_history = merged.index[merged.index <= last_date].equals(existing.index)
+            if same_history and list(tail.columns) == list(existing.columns):
+                df = pd.concat([existing.loc[existing.index < last_date], tail])
+                message = f"+{n_new} weeks (recomputed {len(tail)} rows)"
+            else:
+                df = calculate_variables(merged.copy()).sort_index()
+                message = f"⚠ history changed - rebuilt in full ({len(df)} rows)"
+        else:
+            df = calculate_variables(merged.copy()).sort_index()
+            message = f"new ticker ({len(df)} rows)"
         
-        # Livestock
-        'LB': '058643',  # Lumber - CME
-        'LE': '057642',  # Live Cattle - CME
-        'HE': '054642',  # Lean Hogs - CME
-        'GF': '061641',  # Feeder Cattle - CME
-    }
+        os.makedirs(processed_dir, exist_ok=True)
+        df.to_csv(output_file)
+        processed[ticker] = df
+        print(f"✓ {ticker:12} - {message}")
     
-    return name_map, code_map
+    return processed
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge COT and price data and compute the paper's variables")
+    parser.add_argument('--update', action='store_true',
+                        help="append only report weeks newer than the processed files")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.start_run(args)
+    
     print("\n" + "=" * 60)
     print("DATA PREPROCESSING FOR TWO PREMIUMS PAPER REPLICATION")
     print("=" * 60)
@@ -441,21 +509,35 @@ if __name__ == "__main__":
     
     # 5. Merge data and calculate variables
     if legacy_processed is not None and price_dict:
-        merged_dict = merge_cot_and_prices(legacy_processed, price_dict, commodity_map)
+        merged_dict = merge_cot_and_prices(legacy_processed, price_dict, commodity_map, disagg_processed)
         
         # Calculate variables for each commodity
         os.makedirs('data/processed', exist_ok=True)
         
-        for ticker, df in merged_dict.items():
-            df_with_vars = calculate_variables(df)
-            # Ensure data is sorted by date before saving
-            df_with_vars = df_with_vars.sort_index()
-            output_file = f'data/processed/{ticker}_processed.csv'
-            df_with_vars.to_csv(output_file)
-            print(f"\n✓ Saved processed data: {output_file}")
+        if args.update:
+            # Weekly job: only the tail of each processed file is recomputed
+            processed = update_processed_data(merged_dict)
+        else:
+            # Every commodity in one kernel pass
+            processed = {}
+            for ticker, df_with_vars in calculate_variables_many(merged_dict).items():
+                # Ensure data is sorted by date before saving
+                df_with_vars = df_with_vars.sort_index()
+                output_file = f'data/processed/{ticker}_processed.csv'
+                df_with_vars.to_csv(output_file)
+                print(f"\n✓ Saved processed data: {output_file}")
+                processed[ticker] = df_with_vars
+        
+        panel_frames = [df.rename_axis('Report_Date').reset_index().assign(Ticker=ticker)
+                        for ticker, df in processed.items()]
+        
+        # One typed columnar file with all commodities for fast loading
+        if panel_frames:
+            write_processed_panel(pd.concat(panel_frames, ignore_index=True))
     
     print("\n" + "=" * 60)
     print("DATA PREPROCESSING COMPLETED")
     print("=" * 60)
     print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("\nProcessed data saved in ./data/processed/ directory")
+    instrumentation.finish_run('data_preprocessing')
@@ -6,6 +6,8 @@ import pandas as pd
 import glob
 import os
 from datetime import datetime
+from panel_cache import PANEL_FILE, read_processed_panel
+from cftc_stream import read_compact_legacy
 
 def summarize_data():
     print("=" * 70)
@@ -16,7 +18,16 @@ def summarize_data():
     # 1. CFTC Legacy COT Data
     print("1. CFTC LEGACY COT DATA")
     print("-" * 70)
-    if os.path.exists('data/cftc_legacy/legacy_cot_data.csv'):
+    compact = read_compact_legacy()
+    if compact is not None:
+        # Compact streamed store (see cftc_stream.py), written by data_acquisition.py by default
+        print(f"   Total Records: {len(compact):,}")
+        print(f"   Date Range: {compact['Report_Date'].min():%Y-%m-%d} to {compact['Report_Date'].max():%Y-%m-%d}")
+        print(f"   Unique Commodities: {compact['Market_and_Exchange_Names'].nunique()}")
+        print(f"   Sample Commodities:")
+        for comm in compact['Market_and_Exchange_Names'].unique()[:5]:
+            print(f"      - {comm.strip()}")
+    elif os.path.exists('data/cftc_legacy/legacy_cot_data.csv'):
         df = pd.read_csv('data/cftc_legacy/legacy_cot_data.csv')
         print(f"   Total Records: {len(df):,}")
         print(f"   Date Range: {df['As of Date in Form YYYY-MM-DD'].min()} to {df['As of Date in Form YYYY-MM-DD'].max()}")
@@ -71,29 +82,42 @@ def summarize_data():
     # 5. Processed Data
     print("\n5. PROCESSED DATA (COT + PRICES + CALCULATED VARIABLES)")
     print("-" * 70)
-    processed_files = glob.glob('data/processed/*_processed.csv')
-    print(f"   Number of Commodities: {len(processed_files)}")
-    print(f"\n   {'Ticker':<8} {'Observations':<15} {'Date Range':<30} {'Variables':<10}")
-    print("   " + "-" * 65)
+    key_vars = ['HP', 'Q_Comm', 'Q_NonComm', 'PT_Comm', 'PT_NonComm', 'Ret', 'HP_Smooth_52w']
+    panel = read_processed_panel()
     
-    for file in sorted(processed_files):
-        ticker = os.path.basename(file).replace('_processed.csv', '')
-        df = pd.read_csv(file)
-        
-        # Get date range
-        if 'Report_Date' in df.columns:
-            date_col = 'Report_Date'
-        else:
-            date_col = df.columns[0]
-        
-        df[date_col] = pd.to_datetime(df[date_col])
-        date_range = f"{df[date_col].min():%Y-%m-%d} to {df[date_col].max():%Y-%m-%d}"
+    if panel is not None:
+        # Columnar panel: one read, summarized per ticker
+        print(f"   Number of Commodities: {panel['Ticker'].nunique()} (from {PANEL_FILE})")
+        print(f"\n   {'Ticker':<8} {'Observations':<15} {'Date Range':<30} {'Variables':<10}")
+        print("   " + "-" * 65)
         
-        # Count variables
-        key_vars = ['HP', 'Q_Comm', 'Q_NonComm', 'PT_Comm', 'PT_NonComm', 'Ret', 'HP_Smooth_52w']
-        has_vars = sum(1 for v in key_vars if v in df.columns)
+        has_vars = sum(1 for v in key_vars if v in panel.columns)
+        for ticker, df in panel.groupby('Ticker', observed=True):
+            date_range = f"{df['Report_Date'].min():%Y-%m-%d} to {df['Report_Date'].max():%Y-%m-%d}"
+            print(f"   {ticker:<8} {len(df):<15} {date_range:<30} {has_vars}/{len(key_vars)}")
+    else:
+        processed_files = glob.glob('data/processed/*_processed.csv')
+        print(f"   Number of Commodities: {len(processed_files)}")
+        print(f"\n   {'Ticker':<8} {'Observations':<15} {'Date Range':<30} {'Variables':<10}")
+        print("   " + "-" * 65)
         
-        print(f"   {ticker:<8} {len(df):<15} {date_range:<30} {has_vars}/{len(key_vars)}")
+        for file in sorted(processed_files):
+            ticker = os.path.basename(file).replace('_processed.csv', '')
+            df = pd.read_csv(file)
+            
+            # Get date range
+            if 'Report_Date' in df.columns:
+                date_col = 'Report_Date'
+            else:
+                date_col = df.columns[0]
+            
+            df[date_col] = pd.to_datetime(df[date_col])
+            date_range = f"{df[date_col].min():%Y-%m-%d} to {df[date_col].max():%Y-%m-%d}"
+            
+            # Count variables
+            has_vars = sum(1 for v in key_vars if v in df.columns)
+            
+            print(f"   {ticker:<8} {len(df):<15} {date_range:<30} {has_vars}/{len(key_vars)}")
     
     # 6. Variable Definitions
     print("\n6. CALCULATED VARIABLES (According to Paper)")
@@ -0,0 +1,216 @@
+"""
+Batched Fama-MacBeth Engine for "A Tale of Two Premiums" Paper Replication
+Solves every cross-sectional regression of a panel in one stacked NumPy solve
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+from scipy import stats
+
+from hac import check_se_type, newey_west_frame_se
+from panel import panel_slots, stack_panel
+
+# Minimum number of commodities in a cross-section (same rule as the paper tables)
+MIN_CROSS_SECTION = 10
+
+def stack_cross_sections(df, dependent_var, independent_vars, date_col='Report_Date'):
+    """
+    Group the long panel once into dense cross-section arrays
+
+    Parameters:
+    -----------
+    df : long DataFrame with one row per (date, commodity)
+    dependent_var : name of the dependent variable
+    independent_vars : list of regressor names (constant is added here)
+
+    Returns:
+    --------
+    dates : array of unique dates (sorted)
+    y : (dates × slots) array of the dependent variable, 0 where unused
+    X : (dates × slots × 1+regressors) design array with 'const' first, 0 where unused
+    obs : (dates × slots) boolean array of used observations
+    """
+    columns = [date_col, dependent_var] + list(independent_vars)
+    df_clean = df[columns + (['Ticker'] if 'Ticker' in df.columns else [])].dropna(subset=columns)
+
+    # One slot per ticker (wide layout, see panel.panel_slots)
+    dates, date_codes, slot, n_slots, tickers = panel_slots(df_clean, date_col)
+    n_dates = len(dates)
+
+    y = np.zeros((n_dates, n_slots))
+    X = np.zeros((n_dates, n_slots, len(independent_vars) + 1))
+    obs = np.zeros((n_dates, n_slots), dtype=bool)
+
+    y[date_codes, slot] = df_clean[dependent_var].to_numpy(dtype=float)
+    X[date_codes, slot, 0] = 1.0
+    X[date_codes, slot, 1:] = df_clean[independent_vars].to_numpy(dtype=float)
+    obs[date_codes, slot] = True
+
+    return np.asarray(dates), y, X, obs
+
+def batched_ols(y, X):
+    """
+    Least-squares coefficients for a stack of regressions
+
+    Unused rows must be zero in both y and X: zero rows do not change the
+    (minimum-norm) least-squares solution, so every cross-section is solved
+    in one batched pseudo-inverse, the same estimator statsmodels OLS uses.
+    """
+    return np.matmul(np.linalg.pinv(X), y[..., None])[..., 0]
+
+def cross_section_filter(X, obs, min_obs=MIN_CROSS_SECTION):
+    """
+    Dates to keep and dates whose constant statsmodels would drop
+
+    statsmodels' add_constant skips the constant when a regressor is already
+    a non-zero constant within the cross-section; this mirrors that rule per date.
+
+    Returns: keep (dates with min_obs observations), skip_const (per date)
+    """
+    keep = obs.sum(axis=1) >= min_obs
+    if X.shape[1] == 0:
+        return keep, np.zeros(len(X), dtype=bool)
+
+    regs = X[:, :, 1:]
+    masked = np.where(obs[..., None], regs, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        is_const = (np.nanmax(masked, axis=1) == np.nanmin(masked, axis=1))
+    is_const &= np.all((regs != 0) | ~obs[..., None], axis=1)
+    skip_const = is_const.any(axis=1)
+
+    return keep, skip_const
+
+def prepare_cross_sections(df, dependent_var, independent_vars, date_col='Report_Date',
+                           min_obs=MIN_CROSS_SECTION):
+    """
+    Stacked cross-sections with enough observations, ready for batched_ols
+
+    Returns:
+    --------
+    (dates, y, X, obs, skip_const) for the kept dates, or None if no date has min_obs
+    observations; skip_const marks dates whose constant is dropped (X[..., 0] = 0)
+    """
+    dates, y, X, obs = stack_cross_sections(df, dependent_var, independent_vars, date_col)
+
+    keep, skip_const = cross_section_filter(X, obs, min_obs)
+    if not keep.any():
+        return None
+    y, X, obs, skip_const = y[keep], X[keep], obs[keep], skip_const[keep]
+    X[skip_const, :, 0] = 0.0
+
+    return dates[keep], y, X, obs, skip_const
+
+def cross_sectional_coefficients(df, dependent_var, independent_vars, date_col='Report_Date',
+                                 min_obs=MIN_CROSS_SECTION):
+    """
+    Estimate the first-pass cross-sectional regression for every date
+
+    Returns: DataFrame (dates × ['const'] + independent_vars) of coefficients
+    """
+    prepared = prepare_cross_sections(df, dependent_var, independent_vars, date_col, min_obs)
+    if prepared is None:
+        return pd.DataFrame()
+    dates, y, X, obs, skip_const = prepared
+
+    coeffs = batched_ols(y, X)
+    coeffs[skip_const, 0] = np.nan
+
+    return pd.DataFrame(coeffs, index=dates, columns=['const'] + list(independent_vars))
+
+def cross_sectional_coefficients_many(df, pairs, date_col='Report_Date', min_obs=MIN_CROSS_SECTION):
+    """
+    Per-date cross-sectional coefficients for many (dependent, regressors) pairs
+
+    The panel is stacked once; the NaN mask of each distinct column set is built
+    once, and pairs with the same regressors and the same mask share one batched
+    pseudo-inverse (one solve for all their dependents).
+
+    Returns: dict of {(dependent, regressors): DataFrame (dates × ['const'] + regressors)}
+    """
+    columns = sorted({col for dep, regs in pairs for col in (dep,) + tuple(regs)})
+    dates, arrays, obs = stack_panel(df, columns, date_col)
+    valid = {col: ~np.isnan(arrays[col]) for col in columns}
+
+    masks = {}
+    solves = {}
+    for dep, regs in pairs:
+        col_set = frozenset((dep,) + tuple(regs))
+        if col_set not in masks:
+            mask = obs.copy()
+            for col in col_set:
+                mask &= valid[col]
+            masks[col_set] = (mask, mask.tobytes())
+        mask, mask_key = masks[col_set]
+        solves.setdefault((mask_key, tuple(regs)), (mask, []))[1].append(dep)
+
+    coeffs = {}
+    for (mask_key, regs), (mask, deps) in solves.items():
+        X = np.zeros(mask.shape + (len(regs) + 1,))
+        X[..., 0] = mask
+        for k, col in enumerate(regs):
+            X[..., k + 1] = np.where(mask, arrays[col], 0.0)
+        Y = np.stack([np.where(mask, arrays[dep], 0.0) for dep in deps], axis=-1)
+
+        keep, skip_const = cross_section_filter(X, mask, min_obs)
+        X, Y, skip_const = X[keep], Y[keep], skip_const[keep]
+        X[skip_const, :, 0] = 0.0
+
+        # (dates × regressors+1 × slots) @ (dates × slots × dependents)
+        solved = np.matmul(np.linalg.pinv(X), Y)
+        solved[skip_const, 0, :] = np.nan
+        for j, dep in enumerate(deps):
+            coeffs[(dep, regs)] = pd.DataFrame(solved[:, :, j], index=dates[keep],
+                                               columns=['const'] + list(regs))
+    return coeffs
+
+def summarize_fama_macbeth(coeffs_df, std_errors=None):
+    """
+    Second-pass Fama-MacBeth statistics from the per-date coefficients
+
+    Parameters:
+    -----------
+    coeffs_df : per-date coefficients (cross_sectional_coefficients output)
+    std_errors : optional Series of standard errors by variable (e.g. Newey-West);
+                 default is the iid std / sqrt(T)
+
+    Returns: DataFrame with coefficients, t-stats, and p-values
+    """
+    n = len(coeffs_df)
+    if std_errors is None:
+        std_errors = coeffs_df.std() / np.sqrt(n)
+    results = pd.DataFrame({
+        'Variable': coeffs_df.columns,
+        'Coefficient': coeffs_df.mean(),
+        'Std_Error': std_errors,
+        't_stat': coeffs_df.mean() / std_errors,
+        'N_months': n
+    })
+
+    results['p_value'] = 2 * (1 - stats.t.cdf(np.abs(results['t_stat']), n - 1))
+
+    return results
+
+def summarize_many(coeff_frames, se='iid', lags=None):
+    """
+    Second-pass statistics for many regressions at once
+
+    With se='newey_west' the HAC standard errors of every coefficient series of
+    every regression come from one stacked newey_west_se call (see hac.py).
+
+    Parameters:
+    -----------
+    coeff_frames : dict of {name: per-date coefficients}
+    se : 'iid' or 'newey_west'
+    lags : Newey-West lags (default: rule of thumb per series)
+
+    Returns: dict of {name: summarize_fama_macbeth output}
+    """
+    check_se_type(se)
+    std_errors = dict.fromkeys(coeff_frames)
+    if se == 'newey_west':
+        names = [name for name, frame in coeff_frames.items() if not frame.empty]
+        if names:
+            std_errors.update(zip(names, newey_west_frame_se([coeff_frames[name] for name in names], lags)))
+    return {name: summarize_fama_macbeth(frame, std_errors[name]) for name, frame in coeff_frames.items()}
@@ -0,0 +1,329 @@
+"""
+Futures Contract Store for "A Tale of Two Premiums" Paper Replication
+Contract-level settlement prices keyed by (root, expiry, date), loaded from
+local files, and a roll engine that builds front-month and second-month
+excess returns and the annualized log basis for every root in one vectorized pass
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import argparse
+import glob
+import os
+
+from price_store import _file_stamp, _load_disk_cache
+
+CONTRACT_DIR = 'data/contracts'
+CONTRACT_CACHE_FILE = 'data/cache/contracts.pkl'
+ROLL_SERIES_FILE = 'data/processed/futures_roll_series.csv'
+
+# Delivery month codes of contract symbols such as 'CLZ15' or 'CLZ2015'
+MONTH_CODES = 'FGHJKMNQUVXZ'
+
+# Roll rules: 'days' holds the nearest contract until roll_days calendar days
+# before its expiry; 'volume' / 'open_interest' hold the most traded (held)
+# contract and never roll back to an earlier expiry
+ROLL_RULES = ['days', 'volume', 'open_interest']
+DEFAULT_ROLL_DAYS = 5
+
+# {path: (stamp, contracts)}
+_parsed = {}
+
+# ============================================================================
+# Parsing and caching
+# ============================================================================
+def contract_file_root(path):
+    return os.path.basename(path).replace('_contracts.csv', '')
+
+def contract_expiry(symbols):
+    """
+    Expiry proxy from contract symbols: the first day of the delivery month
+
+    'CLZ15' / 'CLZ2015' -> 2015-12-01; two-digit years below 50 are 20xx
+    """
+    # Each symbol repeats on every day it trades: parse the distinct ones only
+    codes, symbol_idx = np.unique(np.asarray(symbols, dtype=str), return_inverse=True)
+    parts = pd.Series(codes).str.extract(r'([FGHJKMNQUVXZ])(\d{4}|\d{2})$')
+    month = parts[0].map({code: i + 1 for i, code in enumerate(MONTH_CODES)})
+    year = pd.to_numeric(parts[1], errors='coerce')
+    year = year.where(year >= 100, np.where(year < 50, 2000 + year, 1900 + year))
+    expiry = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': 1}), errors='coerce')
+    return pd.Series(expiry.to_numpy()[symbol_idx.ravel()])
+
+def read_contract_file(path):
+    """
+    Parse one root's contract file
+
+    Columns: Date, Expiry (or a Contract symbol with the delivery month),
+    Settle (or Close), and optionally Volume and Open_Interest.
+
+    Returns: DataFrame with Date, Expiry, Price, Volume, Open_Interest
+             (one row per contract and day), or None without the required columns
+    """
+    df = pd.read_csv(path)
+    price_col = next((c for c in ('Settle', 'Close') if c in df.columns), None)
+    if 'Date' not in df.columns or price_col is None or not {'Expiry', 'Contract'} & set(df.columns):
+        return None
+
+    out = pd.DataFrame({
+        'Date': pd.to_datetime(df['Date'], errors='coerce'),
+        'Expiry': (pd.to_datetime(df['Expiry'], errors='coerce') if 'Expiry' in df.columns
+                   else contract_expiry(df['Contract'])),
+        'Price': pd.to_numeric(df[price_col], errors='coerce'),
+    })
+    for col in ('Volume', 'Open_Interest'):
+        out[col] = pd.to_numeric(df[col], errors='coerce') if col in df.columns else np.nan
+    out = out.dropna(subset=['Date', 'Expiry', 'Price'])
+    return out[out['Price'] > 0].reset_index(drop=True)
+
+def load_contract_frames(files=None, cache_file=CONTRACT_CACHE_FILE):
+    """
+    Parsed contract files, parsing only files that are new or changed
+    (kept in process and pickled to cache_file, as in price_store.load_price_frames)
+
+    Returns: dict of {root: contracts DataFrame}
+    """
+    files = sorted(glob.glob(os.path.join(CONTRACT_DIR, '*_contracts.csv'))) if files is None else files
+
+    stale = [f for f in files if f not in _parsed or _parsed[f][0] != _file_stamp(f)]
+    if stale:
+        disk = _load_disk_cache(cache_file)
+        parsed_any = False
+        for path in stale:
+            stamp = _file_stamp(path)
+            if path in disk and disk[path][0] == stamp:
+                _parsed[path] = disk[path]
+                continue
+            try:
+                _parsed[path] = (stamp, read_contract_file(path))
+                parsed_any = True
+            except Exception as e:
+                print(f"  ⚠ Could not load {contract_file_root(path)}: {str(e)[:50]}")
+
+        if parsed_any and cache_file:
+            disk.update({f: _parsed[f] for f in stale if f in _parsed})
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f'{cache_file}.tmp'
+            pd.to_pickle(disk, tmp_file)
+            os.replace(tmp_file, cache_file)
+
+    return {contract_file_root(f): _parsed[f][1] for f in files
+            if f in _parsed and _parsed[f][1] is not None}
+
+# ============================================================================
+# Store
+# ============================================================================
+def _days(values):
+    """Datetimes as integer days since 1970-01-01"""
+    return pd.to_datetime(values).to_numpy('datetime64[D]').astype(np.int64)
+
+def build_contract_store(frames):
+    """
+    All contracts of all roots as sorted flat arrays
+
+    Rows are sorted by (root, date, expiry), so each (root, date) group lists the
+    contracts quoted that day from the nearest expiry on; a second ordering by
+    (root, expiry, date) looks up any contract's price on any date with one searchsorted.
+
+    Parameters:
+    -----------
+    frames : dict of {root: contracts DataFrame} from load_contract_frames
+
+    Returns:
+    --------
+    store : dict with roots, per-row root / date / expiry (days) / price / volume /
+        open_interest arrays, group_starts of the (root, date) groups, and the lookup keys
+    """
+    roots = np.asarray(sorted(frames), dtype=object)
+    root = np.concatenate([np.full(len(frames[r]), i, dtype=np.int64) for i, r in enumerate(roots)] or [np.zeros(0, np.int64)])
+    data = pd.concat([frames[r] for r in roots], ignore_index=True) if len(roots) else None
+    date = _days(data['Date']) if data is not None else np.zeros(0, np.int64)
+    expiry = _days(data['Expiry']) if data is not None else np.zeros(0, np.int64)
+
+    order = np.lexsort((expiry, date, root))
+    store = {
+        'roots': roots,
+        'root': root[order],
+        'date': date[order],
+        'expiry': expiry[order],
+    }
+    for col, name in (('Price', 'price'), ('Volume', 'volume'), ('Open_Interest', 'open_interest')):
+        store[name] = data[col].to_numpy(dtype=float)[order] if data is not None else np.zeros(0)
+
+    new_group = np.r_[True, (np.diff(store['root']) != 0) | (np.diff(store['date']) != 0)] if len(order) else np.zeros(0, bool)
+    store['group_starts'] = np.flatnonzero(new_group)
+    store['group'] = np.cumsum(new_group) - 1
+
+    # (root, expiry, date) packed into one sortable key; duplicates keep the last row
+    store['keys'] = _pack(store['root'], store['expiry'], store['date'])
+    store['key_order'] = np.argsort(store['keys'], kind='stable')
+    return store
+
+def _pack(root, expiry, date):
+    # Days since 1970 stay below 2^20 until the year 4840
+    return (root << 40) | ((expiry + (1 << 19)) << 20) | (date + (1 << 19))
+
+def lookup_prices(store, root, expiry, date):
+    """Price of contract (root, expiry) on date, NaN where it is not quoted"""
+    keys = _pack(np.asarray(root, dtype=np.int64), np.asarray(expiry, dtype=np.int64),
+                 np.asarray(date, dtype=np.int64))
+    sorted_keys = store['keys'][store['key_order']]
+    pos = np.searchsorted(sorted_keys, keys, side='right') - 1
+    found = (pos >= 0) & (sorted_keys[np.maximum(pos, 0)] == keys)
+    return np.where(found, store['price'][store['key_order'][np.maximum(pos, 0)]], np.nan)
+
+def load_contract_store(files=None):
+    """Contract store of every file in CONTRACT_DIR (None if there are none)"""
+    frames = load_contract_frames(files)
+    return build_contract_store(frames) if frames else None
+
+# ============================================================================
+# Roll engine
+# ============================================================================
+def _first_row(mask, starts, n):
+    """Index of the first True row of every group (-1 if none)"""
+    if not len(starts):
+        return np.zeros(0, dtype=np.int64)
+    first = np.minimum.reduceat(np.where(mask, np.arange(n), n), starts)
+    return np.where(first < n, first, -1)
+
+def roll_schedule(store, rule='days', roll_days=DEFAULT_ROLL_DAYS):
+    """
+    Front and second contract of every root on every date
+
+    Parameters:
+    -----------
+    store : contract store from build_contract_store
+    rule : 'days' (nearest contract more than roll_days days from expiry),
+        'volume' or 'open_interest' (contract with the largest volume / open
+        interest among those more than roll_days days from expiry; the front
+        expiry never moves back)
+    roll_days : calendar days before expiry by which a position is rolled
+
+    Returns:
+    --------
+    schedule : dict of per-(root, date) arrays: root, date, front and second
+        (row indices into the store, -1 if none)
+    """
+    if rule not in ROLL_RULES:
+        raise ValueError(f"Unknown roll rule {rule!r} (choose from {ROLL_RULES})")
+    n, starts, group = len(store['date']), store['group_starts'], store['group']
+    eligible = store['expiry'] - store['date'] > roll_days
+
+    if rule == 'days':
+        front = _first_row(eligible, starts, n)
+    else:
+        measure = np.where(eligible, store[rule], np.nan)
+        measure = np.where(np.isnan(measure), -np.inf, measure)
+        best = np.maximum.reduceat(measure, starts) if len(starts) else np.zeros(0)
+        # Most traded contract (nearest on ties, nearest eligible without any volume / OI)
+        candidate = _first_row(eligible & (measure == best[group]), starts, n)
+        candidate = np.where(candidate >= 0, candidate, _first_row(eligible, starts, n))
+        # No rolling back: hold the latest front expiry until a later contract takes over
+        group_root = store['root'][starts]
+        span = 1 << 24
+        exp = np.where(candidate >= 0, store['expiry'][np.maximum(candidate, 0)], -(1 << 22))
+        held = np.maximum.accumulate(group_root * span + exp + (1 << 22)) - group_root * span - (1 << 22)
+        front = _first_row(eligible & (store['expiry'] >= held[group]), starts, n)
+
+    # Second contract: next expiry quoted the same day
+    nxt = front + 1
+    ok = (front >= 0) & (nxt < n)
+    ok[ok] = store['group'][nxt[ok]] == store['group'][front[ok]]
+    second = np.where(ok, nxt, -1)
+    return {'root': store['root'][starts], 'date': store['date'][starts], 'front': front, 'second': second}
+
+def _held_returns(store, schedule, leg):
+    """Return of holding the contract chosen at the previous date of the same root"""
+    rows = schedule[leg]
+    prev = np.r_[-1, rows[:-1]]
+    same_root = np.r_[False, schedule['root'][1:] == schedule['root'][:-1]]
+    valid = same_root & (prev >= 0)
+    prev_row = np.maximum(prev, 0)
+    today = lookup_prices(store, schedule['root'], store['expiry'][prev_row], schedule['date'])
+    return np.where(valid, today / store['price'][prev_row] - 1, np.nan)
+
+def roll_series(store, rule='days', roll_days=DEFAULT_ROLL_DAYS):
+    """
+    Daily front / second-month series of every root
+
+    Front_Ret / Second_Ret: excess return of holding the contract that was the
+    front (second) contract at the previous date, so a roll takes effect after
+    the close on which it is decided.
+    Basis: annualized log basis (ln F1 - ln F2) / ((T2 - T1) / 365), positive
+    in backwardation.
+
+    Returns: DataFrame with Date, Ticker, Front_Expiry, Second_Expiry, Front_Price,
+             Second_Price, Front_Ret, Second_Ret, Basis
+    """
+    schedule = roll_schedule(store, rule, roll_days)
+    front, second = schedule['front'], schedule['second']
+    pick = lambda values, rows: np.where(rows >= 0, values[np.maximum(rows, 0)], np.nan)
+
+    f_price, s_price = pick(store['price'], front), pick(store['price'], second)
+    f_exp, s_exp = pick(store['expiry'], front), pick(store['expiry'], second)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        basis = (np.log(f_price) - np.log(s_price)) / ((s_exp - f_exp) / 365)
+
+    as_date = lambda days: pd.to_datetime(np.where(np.isnan(days), np.datetime64('NaT'),
+                                                   np.nan_to_num(days).astype('datetime64[D]')))
+    return pd.DataFrame({
+        'Date': schedule['date'].astype('datetime64[D]').astype('datetime64[ns]'),
+        'Ticker': store['roots'][schedule['root']],
+        'Front_Expiry': as_date(f_exp),
+        'Second_Expiry': as_date(s_exp),
+        'Front_Price': f_price,
+        'Second_Price': s_price,
+        'Front_Ret': _held_returns(store, schedule, 'front'),
+        'Second_Ret': _held_returns(store, schedule, 'second'),
+        'Basis': basis,
+    })
+
+def weekly_roll_series(daily):
+    """
+    Weekly (W-TUE, as price_store.weekly_close) series: compounded daily returns
+    within the week and the basis of the week's last date
+
+    Returns: DataFrame with Report_Date, Ticker, Front_Ret, Second_Ret, Basis
+    """
+    week = daily['Date'] + pd.to_timedelta((1 - daily['Date'].dt.dayofweek) % 7, unit='D')
+    logs = pd.DataFrame({'Ticker': daily['Ticker'], 'Report_Date': week,
+                         'Front_Ret': np.log1p(daily['Front_Ret']), 'Second_Ret': np.log1p(daily['Second_Ret']),
+                         'Basis': daily['Basis']})
+    grouped = logs.groupby(['Ticker', 'Report_Date'], sort=True)
+    weekly = grouped[['Front_Ret', 'Second_Ret']].sum(min_count=1).apply(np.expm1)
+    weekly['Basis'] = grouped['Basis'].last()
+    return weekly.reset_index()[['Report_Date', 'Ticker', 'Front_Ret', 'Second_Ret', 'Basis']]
+
+def load_weekly_roll_series(rule='days', roll_days=DEFAULT_ROLL_DAYS, files=None):
+    """Weekly front / second-month returns and basis of every contract file (None without contract files)"""
+    store = load_contract_store(files)
+    if store is None:
+        return None
+    return weekly_roll_series(roll_series(store, rule, roll_days))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Front / second-month returns and basis from contract-level prices")
+    parser.add_argument('--rule', choices=ROLL_RULES, default='days', help="roll rule (default: days)")
+    parser.add_argument('--roll-days', type=int, default=DEFAULT_ROLL_DAYS,
+                        help=f"calendar days before expiry to roll by (default: {DEFAULT_ROLL_DAYS})")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("FUTURES ROLL SERIES")
+    print("=" * 70)
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+    store = load_contract_store()
+    if store is None:
+        print(f"✗ No contract files ({CONTRACT_DIR}/<root>_contracts.csv)")
+    else:
+        series = roll_series(store, args.rule, args.roll_days)
+        for ticker, rows in series.groupby('Ticker'):
+            print(f"✓ {ticker:6} {rows['Date'].min().date()} - {rows['Date'].max().date()}  "
+                  f"rolls: {rows['Front_Expiry'].nunique():4}  mean basis: {rows['Basis'].mean():8.4f}")
+        os.makedirs(os.path.dirname(ROLL_SERIES_FILE), exist_ok=True)
+        series.to_csv(ROLL_SERIES_FILE, index=False)
+        print(f"\n✓ {len(series):,} root-days saved to {ROLL_SERIES_FILE}")
+    print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -0,0 +1,108 @@
+"""
+Newey-West (HAC) Standard Errors for "A Tale of Two Premiums" Paper Replication
+Bartlett-kernel standard errors of the means of many time series in one stacked computation
+(Fama-MacBeth coefficient series, portfolio return series of overlapping windows)
+"""
+
+import pandas as pd
+import numpy as np
+
+SE_TYPES = ('iid', 'newey_west')
+
+def check_se_type(se):
+    if se not in SE_TYPES:
+        raise ValueError(f"se must be one of {SE_TYPES}, got {se!r}")
+
+def newey_west_lags(n_periods):
+    """Newey-West (1994) rule of thumb: floor(4 * (T/100)^(2/9))"""
+    return int(np.floor(4 * (n_periods / 100) ** (2 / 9)))
+
+def overlap_lags(start_day, end_day, n_periods):
+    """
+    Lags for weekly observations of a return window spanning start_day..end_day:
+    at least the number of weeks adjacent windows overlap, and at least the rule of thumb
+    """
+    window_weeks = int(np.ceil((end_day - start_day + 1) / 7))
+    return max(window_weeks - 1, newey_west_lags(n_periods))
+
+def pad_series(series_list):
+    """Stack 1-D series of different lengths into a (periods × series) array, NaN-padded at the end"""
+    length = max((len(s) for s in series_list), default=0)
+    out = np.full((length, len(series_list)), np.nan)
+    for j, s in enumerate(series_list):
+        out[:len(s), j] = np.asarray(s, dtype=float)
+    return out
+
+def newey_west_se(series, lags=None):
+    """
+    Newey-West standard error of the mean of every column
+
+    Missing values (NaN) are kept in place with zero deviation, so they add
+    no cross-products and the lag structure of the other periods is unchanged.
+
+    Parameters:
+    -----------
+    series : (periods × series) array or DataFrame (1-D for a single series), rows in time order
+    lags : int, per-column array of ints, or None (newey_west_lags of each column's length)
+
+    Returns:
+    --------
+    se : array with one standard error per column (scalar array for 1-D input)
+    """
+    values = np.asarray(series, dtype=float)
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[:, None]
+
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, values, 0.0).sum(axis=0) / n
+    dev = np.where(valid, values - mean, 0.0)
+
+    if lags is None:
+        lags = np.array([newey_west_lags(count) for count in n])
+    lags = np.broadcast_to(np.asarray(lags, dtype=int), n.shape)
+
+    # Bartlett kernel: gamma_0 + 2 * sum_j (1 - j/(L+1)) * gamma_j, every column at once
+    long_run = (dev * dev).sum(axis=0)
+    for j in range(1, min(int(lags.max(initial=0)), len(values) - 1) + 1):
+        weight = np.clip(1 - j / (lags + 1), 0, None)
+        long_run += 2 * weight * (dev[j:] * dev[:-j]).sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        se = np.sqrt(long_run) / n
+    se = np.where(n > 1, se, np.nan)
+    return se[0] if squeeze else se
+
+def newey_west_frame_se(frames, lags=None):
+    """
+    Newey-West standard errors for the columns of many date-indexed frames at once
+
+    The frames are aligned on the union of their dates (missing dates are NaN),
+    so all series of all regressions go through one newey_west_se call.
+
+    Returns: list of Series (one per frame) of standard errors indexed by column
+    """
+    stacked = pd.concat(frames, axis=1, keys=range(len(frames))).sort_index()
+    se = pd.Series(newey_west_se(stacked.to_numpy(), lags), index=stacked.columns)
+    return [se[i].reindex(frame.columns) for i, frame in enumerate(frames)]
+
+def window_series_se(series, windows, lags=None):
+    """
+    Newey-West standard errors of many weekly return series over event windows, in one batch
+
+    Parameters:
+    -----------
+    series : dict of {key: 1-D returns, one per report date}
+    windows : dict of {key: (start_day, end_day)} of each series' return window
+    lags : int, or None (overlap_lags of each window)
+
+    Returns: dict of {key: standard error}
+    """
+    keys = list(series)
+    if not keys:
+        return {}
+    if lags is None:
+        lags = [overlap_lags(*windows[key], len(series[key])) for key in keys]
+    return dict(zip(keys, newey_west_se(pad_series([series[key] for key in keys]), lags)))
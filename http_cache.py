@@ -0,0 +1,168 @@
+"""
+HTTP Download Layer for "A Tale of Two Premiums" Paper Replication
+Concurrent fetching with a shared session, per-host rate limiting, retry/backoff
+and an on-disk cache revalidated with ETag / Last-Modified
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import threading
+import hashlib
+import json
+import time
+import os
+
+CACHE_DIR = 'data/http_cache'
+
+# Statuses worth retrying (throttling and transient server errors)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least `min_interval` seconds apart (thread-safe)"""
+
+    def __init__(self, min_interval=0.5):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def make_session(max_workers=4):
+    """Shared requests.Session with a connection pool sized for the worker count"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _cache_paths(url, cache_dir):
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f'{key}.body'), os.path.join(cache_dir, f'{key}.json')
+
+def _write_atomic(path, chunks, mode='wb'):
+    """Write via a temp file so an interrupted run never leaves a truncated cache entry"""
+    tmp = f'{path}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp, mode) as f:
+            for chunk in chunks:
+                f.write(chunk)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+
+def _read_body(path, load_content):
+    if not load_content:
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+def cached_get(url, session=None, limiter=None, cache_dir=CACHE_DIR, revalidate=True,
+               retries=3, backoff=1.0, timeout=30, load_content=True):
+    """
+    GET a URL through the on-disk cache
+
+    Parameters:
+    -----------
+    revalidate : if False and the URL is cached, return the cached body without any request
+                 (used for completed years that no longer change)
+    retries : extra attempts on connection errors (also while streaming the body) and RETRY_STATUSES
+    backoff : base delay in seconds, doubled on every retry (Retry-After is honoured)
+    load_content : if False, the body is only streamed to the cache file (content is None)
+
+    Returns:
+    --------
+    dict with url, status (HTTP status or None on error), content (bytes or None),
+    from_cache (bool), error (str or None) and path (cached body file, on success)
+    """
+    session = session or make_session()
+    limiter = limiter or HostRateLimiter()
+    os.makedirs(cache_dir, exist_ok=True)
+    body_path, meta_path = _cache_paths(url, cache_dir)
+
+    meta = None
+    if os.path.exists(body_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if not revalidate:
+            return {'url': url, 'status': 200, 'content': _read_body(body_path, load_content),
+                    'from_cache': True, 'error': None, 'path': body_path}
+
+    headers = {}
+    if meta:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    host = urlparse(url).netloc
+    status, error = None, None
+    for attempt in range(retries + 1):
+        limiter.wait(host)
+        retry_after = None
+        try:
+            # The body is streamed inside the attempt: a connection dropped mid-body is retried too
+            with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                if response.status_code == 304 and meta:
+                    return {'url': url, 'status': 200, 'content': _read_body(body_path, load_content),
+                            'from_cache': True, 'error': None, 'path': body_path}
+
+                if response.status_code == 200:
+                    # Stream the body to disk in chunks; metadata last marks the entry complete
+                    _write_atomic(body_path, response.iter_content(chunk_size=1 << 20))
+                    _write_atomic(meta_path, [json.dumps({
+                        'url': url,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'fetched_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    })], mode='w')
+                    return {'url': url, 'status': 200, 'content': _read_body(body_path, load_content),
+                            'from_cache': False, 'error': None, 'path': body_path}
+
+                status, error = response.status_code, f'HTTP {response.status_code}'
+                if status not in RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get('Retry-After')
+        except requests.RequestException as e:
+            status, error = None, str(e)
+
+        if attempt < retries:
+            delay = backoff * 2 ** attempt
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            time.sleep(delay)
+
+    return {'url': url, 'status': status, 'content': None, 'from_cache': False, 'error': error, 'path': None}
+
+def fetch_all(urls, max_workers=4, revalidate=True, min_interval=0.5, cache_dir=CACHE_DIR, **kwargs):
+    """
+    Fetch many URLs concurrently through the cache
+
+    Parameters:
+    -----------
+    urls : list of URLs
+    revalidate : bool, or dict of {url: bool} to revalidate only some URLs
+    min_interval : minimum seconds between requests to the same host
+
+    Returns: dict of {url: result dict from cached_get}, in the order of `urls`
+    """
+    session = make_session(max_workers)
+    limiter = HostRateLimiter(min_interval)
+
+    def fetch(url):
+        flag = revalidate.get(url, True) if isinstance(revalidate, dict) else revalidate
+        return cached_get(url, session, limiter, cache_dir, revalidate=flag, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(fetch, urls))
+    session.close()
+
+    return dict(zip(urls, results))
@@ -0,0 +1,398 @@
+"""
+Resampling Inference for "A Tale of Two Premiums" Paper Replication
+Block-bootstrap and within-date placebo distributions for the Fama-MacBeth
+regressions (Table III) and portfolio sorts (Tables V and VIII)
+
+Every draw of a chunk is solved at once in batched NumPy; chunks run in a
+process pool and each chunk has its own child seed, so results are
+reproducible and do not depend on the number of workers.
+"""
+
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import os
+
+from fama_macbeth import prepare_cross_sections, cross_sectional_coefficients, summarize_fama_macbeth
+from panel import stack_panel
+from portfolio_sorts import portfolio_returns, sort_labels
+
+DEFAULT_DRAWS = 10_000
+DEFAULT_SEED = 20240601
+
+# Draws solved together in one batched call (bounds memory per worker)
+CHUNK_DRAWS = 200
+
+# ============================================================================
+# Chunked, reproducible draws
+# ============================================================================
+def _run_chunk(func, seed_seq, n_draws, args):
+    return func(np.random.default_rng(seed_seq), n_draws, *args)
+
+def run_in_chunks(func, n_draws, *args, seed=DEFAULT_SEED, chunk_draws=CHUNK_DRAWS, max_workers=1):
+    """
+    Evaluate func(rng, n, *args) for n_draws draws in fixed-size chunks
+
+    Chunk c always uses the c-th child of SeedSequence(seed), so the stacked
+    draws are identical for any max_workers.
+
+    Returns: array of the chunks' outputs concatenated along the first axis
+    """
+    sizes = [min(chunk_draws, n_draws - start) for start in range(0, n_draws, chunk_draws)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if max_workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(min(max_workers, len(sizes))) as pool:
+            parts = list(pool.map(_run_chunk, [func] * len(sizes), seeds, sizes, [args] * len(sizes)))
+    else:
+        parts = [_run_chunk(func, s, n, args) for s, n in zip(seeds, sizes)]
+    return np.concatenate(parts)
+
+# ============================================================================
+# Building blocks
+# ============================================================================
+def default_block_length(n_periods):
+    """Rule-of-thumb block length, T^(1/3)"""
+    return max(1, int(round(n_periods ** (1 / 3))))
+
+def block_bootstrap_indices(rng, n_draws, n_periods, block_length):
+    """
+    Moving-block bootstrap: (draws × periods) time indices built from randomly
+    started blocks of consecutive periods
+    """
+    block_length = min(block_length, n_periods)
+    n_blocks = -(-n_periods // block_length)
+    starts = rng.integers(0, n_periods - block_length + 1, size=(n_draws, n_blocks))
+    idx = starts[:, :, None] + np.arange(block_length)
+    return idx.reshape(n_draws, -1)[:, :n_periods]
+
+def within_strata_permutations(rng, n_draws, strata):
+    """
+    Random permutations of each date's slots that only exchange slots of the same stratum
+
+    Parameters:
+    -----------
+    strata : (dates × slots) int array; -1 marks unused slots (only exchanged among themselves)
+
+    Returns:
+    --------
+    perm : (draws × dates × slots) array; slot s takes its value from slot perm[..., s]
+    """
+    major = np.where(strata >= 0, strata, strata.max() + 1).astype(float)
+    # Slots grouped by stratum in original order, and in random order within the stratum
+    base = np.argsort(major, axis=1, kind='stable')
+    shuffled = np.argsort(major + rng.random((n_draws,) + strata.shape), axis=-1)
+
+    perm = np.empty_like(shuffled)
+    np.put_along_axis(perm, np.broadcast_to(base, shuffled.shape), shuffled, axis=-1)
+    return perm
+
+def mean_t_stats(series, axis=-1):
+    """NaN-aware mean, standard error (ddof=1) and t-stat along `axis`"""
+    valid = ~np.isnan(series)
+    n = valid.sum(axis=axis)
+    values = np.where(valid, series, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = values.sum(axis=axis) / n
+        dev = np.where(valid, series - np.expand_dims(mean, axis), 0.0)
+        se = np.sqrt((dev ** 2).sum(axis=axis) / (n - 1)) / np.sqrt(n)
+        return mean, se, mean / se
+
+# ============================================================================
+# Fama-MacBeth
+# ============================================================================
+def _bootstrap_mean_draws(rng, n_draws, series, block_length):
+    """Means of block-resampled (periods × K) series: (draws × K)"""
+    idx = block_bootstrap_indices(rng, n_draws, len(series), block_length)
+    mean, se, t = mean_t_stats(series[idx], axis=1)
+    return mean
+
+def block_bootstrap(series, n_draws=DEFAULT_DRAWS, block_length=None, seed=DEFAULT_SEED, max_workers=1):
+    """
+    Moving-block bootstrap of the mean of one or more time series
+
+    Parameters:
+    -----------
+    series : (periods × K) array or DataFrame, NaN allowed (e.g. FM coefficients by date)
+
+    Returns:
+    --------
+    DataFrame (one row per series) with Mean, Boot_Std_Error, Boot_t_stat,
+    Boot_p_value (two-sided, H0: mean = 0, from the centred draws), CI_2.5, CI_97.5
+    """
+    names = list(series.columns) if isinstance(series, pd.DataFrame) else None
+    values = np.asarray(series, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    block_length = block_length or default_block_length(len(values))
+
+    draws = run_in_chunks(_bootstrap_mean_draws, n_draws, values, block_length,
+                          seed=seed, max_workers=max_workers)
+    mean, se, t = mean_t_stats(values, axis=0)
+    boot_se = np.nanstd(draws, axis=0, ddof=1)
+    p_value = np.mean(np.abs(draws - mean) >= np.abs(mean), axis=0)
+    low, high = np.nanpercentile(draws, [2.5, 97.5], axis=0)
+
+    return pd.DataFrame({
+        'Variable': names if names is not None else range(values.shape[1]),
+        'Mean': mean,
+        'Boot_Std_Error': boot_se,
+        'Boot_t_stat': mean / boot_se,
+        'Boot_p_value': p_value,
+        'CI_2.5': low,
+        'CI_97.5': high,
+        'Block_Length': block_length,
+        'N_draws': n_draws,
+    })
+
+def _placebo_fm_draws(rng, n_draws, y, X, obs, skip_const, column):
+    """
+    FM t-stats of every coefficient with regressor `column` shuffled across
+    the observations of each date: (draws × coefficients)
+
+    Only the shuffled column's row/column of X'X and its entry of X'y change,
+    so each draw updates the per-date Gram matrices instead of re-stacking X
+    """
+    perm = within_strata_permutations(rng, n_draws, np.where(obs, 0, -1))
+    shuffled = np.take_along_axis(X[None, :, :, column], perm, axis=-1)
+
+    gram = np.einsum('tsk,tsl->tkl', X, X)
+    xty = np.einsum('tsk,ts->tk', X, y)
+    cross = np.einsum('rts,tsl->rtl', shuffled, X)
+
+    G = np.repeat(gram[None], n_draws, axis=0)
+    G[..., column, :] = cross
+    G[..., :, column] = cross
+    # x'x of the shuffled column is unchanged by the permutation
+    G[..., column, column] = gram[:, column, column]
+    b = np.repeat(xty[None], n_draws, axis=0)
+    b[..., column] = np.einsum('rts,ts->rt', shuffled, y)
+
+    # pinv(X'X) X'y is the same minimum-norm solution batched_ols computes
+    coeffs = np.matmul(np.linalg.pinv(G), b[..., None])[..., 0]
+    coeffs[:, skip_const, 0] = np.nan
+    mean, se, t = mean_t_stats(coeffs, axis=1)
+    return t
+
+def fm_placebo(df, dependent_var, independent_vars, shuffle_var, n_draws=DEFAULT_DRAWS,
+               seed=DEFAULT_SEED, max_workers=1, date_col='Report_Date'):
+    """
+    Placebo distribution of a Fama-MacBeth regression with `shuffle_var` shuffled
+    across commodities within each date (all other variables kept in place)
+
+    Returns: dict with the actual coefficient and t-stat of shuffle_var, the
+             placebo t-stat quantiles and the placebo p-value (share of |t| at least as large)
+    """
+    prepared = prepare_cross_sections(df, dependent_var, independent_vars, date_col)
+    if prepared is None:
+        return None
+    dates, y, X, obs, skip_const = prepared
+    column = 1 + list(independent_vars).index(shuffle_var)
+
+    placebo_t = run_in_chunks(_placebo_fm_draws, n_draws, y, X, obs, skip_const, column,
+                              seed=seed, max_workers=max_workers)[:, column]
+
+    actual = summarize_fama_macbeth(cross_sectional_coefficients(df, dependent_var, independent_vars, date_col))
+    actual = actual.set_index('Variable').loc[shuffle_var]
+    low, high = np.nanpercentile(placebo_t, [2.5, 97.5])
+
+    return {
+        'Coefficient': actual['Coefficient'],
+        't_stat': actual['t_stat'],
+        'Placebo_t_2.5': low,
+        'Placebo_t_97.5': high,
+        'Placebo_p_value': np.mean(np.abs(placebo_t) >= abs(actual['t_stat'])),
+    }
+
+def fm_inference(df, dependent_var, independent_vars, shuffle_var=None, n_draws=DEFAULT_DRAWS,
+                 block_length=None, seed=DEFAULT_SEED, max_workers=1, date_col='Report_Date'):
+    """
+    Block-bootstrap standard errors for every coefficient of a Fama-MacBeth
+    regression, plus the placebo p-value of `shuffle_var` (if given)
+
+    Returns: DataFrame like summarize_fama_macbeth with bootstrap / placebo columns
+    """
+    coeffs_df = cross_sectional_coefficients(df, dependent_var, independent_vars, date_col)
+    if coeffs_df.empty:
+        return pd.DataFrame()
+
+    results = summarize_fama_macbeth(coeffs_df).reset_index(drop=True)
+    boot = block_bootstrap(coeffs_df, n_draws, block_length, seed, max_workers)
+    results = results.join(boot.drop(columns=['Variable', 'Mean']))
+
+    results['Placebo_p_value'] = np.nan
+    if shuffle_var is not None:
+        placebo = fm_placebo(df, dependent_var, independent_vars, shuffle_var, n_draws,
+                             seed, max_workers, date_col)
+        results.loc[results['Variable'] == shuffle_var, 'Placebo_p_value'] = placebo['Placebo_p_value']
+    return results
+
+# ============================================================================
+# Portfolio sorts
+# ============================================================================
+def _spread_series(ports, spreads):
+    """(..., dates, portfolios) -> (..., dates, spreads) of long minus short returns"""
+    return np.stack([ports[..., long] - ports[..., short] for name, long, short in spreads], axis=-1)
+
+def _placebo_spread_draws(rng, n_draws, returns, labels, strata, n_portfolios, spreads):
+    """Mean and t-stat of every long-short spread with labels shuffled within strata: (draws × 2 × spreads)"""
+    perm = within_strata_permutations(rng, n_draws, strata)
+    shuffled = np.take_along_axis(np.broadcast_to(labels, perm.shape), perm, axis=-1)
+    series = _spread_series(portfolio_returns(returns[None], shuffled, n_portfolios), spreads)
+    mean, se, t = mean_t_stats(series, axis=1)
+    return np.stack([mean, t], axis=1)
+
+def sort_inference(returns, labels, strata, n_portfolios, spreads, n_draws=DEFAULT_DRAWS,
+                   block_length=None, seed=DEFAULT_SEED, max_workers=1):
+    """
+    Bootstrap and placebo inference for long-short spreads of a portfolio sort
+
+    The sort itself (labels) is computed once; the placebo permutes the labels
+    within each date's strata, which is the same as shuffling the sorting
+    variable across commodities and sorting again.
+
+    Parameters:
+    -----------
+    returns : (dates × slots) returns, NaN where missing
+    labels : (dates × slots) portfolio index of each slot, -1 if in no portfolio
+    strata : (dates × slots) groups the placebo shuffles within (0 everywhere = whole date),
+             -1 for unused slots
+    spreads : list of (name, long portfolio, short portfolio)
+
+    Returns:
+    --------
+    DataFrame, one row per spread: LS_Return, LS_tstat (date-aligned differences,
+    ddof=1), Boot_Std_Error, Boot_p_value, Placebo_p_value, N_obs
+    """
+    series = _spread_series(portfolio_returns(returns, labels, n_portfolios), spreads)
+    # Dates where a spread is undefined are dropped before resampling
+    rows = []
+    for i, spread in enumerate(spreads):
+        ls = series[:, i][~np.isnan(series[:, i])]
+        if len(ls) < 2:
+            continue
+        boot = block_bootstrap(ls, n_draws, block_length, seed, max_workers).iloc[0]
+        rows.append({'Spread': spread[0], 'LS_Return': boot['Mean'], 'Boot_Std_Error': boot['Boot_Std_Error'],
+                     'Boot_p_value': boot['Boot_p_value'], 'N_obs': len(ls)})
+    if not rows:
+        return pd.DataFrame()
+
+    mean, se, t = mean_t_stats(series, axis=0)
+    placebo = run_in_chunks(_placebo_spread_draws, n_draws, returns, labels, strata, n_portfolios, spreads,
+                            seed=seed, max_workers=max_workers)
+    placebo_p = np.mean(np.abs(placebo[:, 1]) >= np.abs(t), axis=0)
+
+    results = pd.DataFrame(rows)
+    index = [[name for name, long, short in spreads].index(name) for name in results['Spread']]
+    results.insert(2, 'LS_tstat', t[index])
+    results.insert(5, 'Placebo_p_value', placebo_p[index])
+    return results
+
+def quintile_labels(df, sort_var='Q_Comm', date_col='Report_Date'):
+    """
+    Table V sort: quintiles of sort_var within each date with at least 10 commodities
+
+    Returns: (dates × slots) labels 0..4 (-1 = unsorted), aligned with stack_panel(df, ...)
+    """
+    dates, labels, buckets, obs, sorted_dates = sort_labels(df, [(sort_var, 5)], ties='drop', date_col=date_col)
+    return labels
+
+def double_sort_labels(df, first_var='HP_Smooth_52w', second_var='Q_Comm', date_col='Report_Date'):
+    """
+    Table VIII sort: median split on first_var, then on second_var within each half
+
+    Returns: labels (0 LowHP_LowQ, 1 LowHP_HighQ, 2 HighHP_LowQ, 3 HighHP_HighQ, -1 none)
+             and the first-sort group of each slot (0 Low, 1 High, -1 unused) as placebo strata
+    """
+    dates, labels, buckets, obs, sorted_dates = sort_labels(
+        df, [(first_var, 2), (second_var, 2)], how='conditional', ties='keep', missing_low=[first_var],
+        date_col=date_col)
+    return labels, buckets[0]
+
+# ============================================================================
+# Replication tables
+# ============================================================================
+# (name, dependent variable, regressors, regressor shuffled by the placebo)
+FM_SPECS = [
+    ('R_t1_Q_Comm_Full', 'Ret_Lead', ['Q_Comm', 'Basis', 'S_v', 'Ret'], 'Q_Comm'),
+    ('R_t1_Q_NonComm_Full', 'Ret_Lead', ['Q_NonComm', 'Basis', 'S_v', 'Ret'], 'Q_NonComm'),
+    ('R_t2_Q_Comm_Full', 'Ret_Lead2', ['Q_Comm', 'Basis', 'S_v', 'Ret'], 'Q_Comm'),
+    ('R_t2_Q_NonComm_Full', 'Ret_Lead2', ['Q_NonComm', 'Basis', 'S_v', 'Ret'], 'Q_NonComm'),
+]
+
+def table_inference(df, n_draws=DEFAULT_DRAWS, block_length=None, seed=DEFAULT_SEED, max_workers=1):
+    """
+    Bootstrap / placebo inference for Table III (FM), Table V (Q5-Q1) and Table VIII (HighQ-LowQ)
+
+    Returns: (fm_results, sort_results) DataFrames, also saved to output/tables/
+    """
+    from table_replication import load_daily_prices, TABLE_V_PERIODS, TABLE_VIII_PERIODS
+    from price_store import build_price_matrix
+    from return_tensor import build_return_tensor, panel_window_returns
+
+    print("\n" + "=" * 70)
+    print(f"RESAMPLING INFERENCE ({n_draws:,} draws, seed {seed})")
+    print("=" * 70)
+
+    fm_frames = []
+    for name, dep, indep, shuffle_var in FM_SPECS:
+        res = fm_inference(df, dep, indep, shuffle_var, n_draws, block_length, seed, max_workers)
+        print(f"\n{name}: {dep} ~ {' + '.join(indep)}  (placebo: shuffle {shuffle_var})")
+        print(res.to_string(index=False))
+        fm_frames.append(res.assign(Regression=name))
+    fm_results = pd.concat(fm_frames, ignore_index=True)
+
+    # Event-window returns once, arranged like the sort labels
+    df = df.reset_index(drop=True)
+    periods = [(p[0], p[1], p[2]) for p in TABLE_VIII_PERIODS]
+    tensor = build_return_tensor(build_price_matrix(load_daily_prices()), df['Report_Date'], dtype=np.float64)
+    rets = pd.DataFrame(panel_window_returns(tensor, df['Ticker'], df['Report_Date'], [(s, e) for _, s, e in periods]),
+                        columns=[p[0] for p in periods])
+    dates, period_arrays, obs = stack_panel(pd.concat([df[['Report_Date', 'Ticker']], rets], axis=1), rets.columns)
+
+    v_labels = quintile_labels(df)
+    viii_labels, viii_groups = double_sort_labels(df)
+
+    sort_frames = []
+    for period_name, start_day, end_day in periods:
+        returns = period_arrays[period_name]
+        if period_name in [p[0] for p in TABLE_V_PERIODS]:
+            # Table V needs at least 5 valid returns on a date
+            enough = (~np.isnan(returns)).sum(axis=1) >= 5
+            res = sort_inference(np.where(enough[:, None], returns, np.nan), v_labels, np.where(obs, 0, -1),
+                                 5, [('Q5-Q1', 4, 0)], n_draws, block_length, seed, max_workers)
+            sort_frames.append(res.assign(Table='V', Period=period_name))
+        res = sort_inference(returns, viii_labels, viii_groups, 4,
+                             [('LowHP_HighQ-LowQ', 1, 0), ('HighHP_HighQ-LowQ', 3, 2)],
+                             n_draws, block_length, seed, max_workers)
+        sort_frames.append(res.assign(Table='VIII', Period=period_name))
+
+    sort_results = pd.concat(sort_frames, ignore_index=True)
+    sort_results = sort_results[['Table', 'Period', 'Spread'] +
+                                [c for c in sort_results.columns if c not in ('Table', 'Period', 'Spread')]]
+    print("\nPortfolio sorts:")
+    print(sort_results.to_string(index=False))
+
+    os.makedirs('output/tables', exist_ok=True)
+    fm_results.to_csv('output/tables/inference_fama_macbeth.csv', index=False)
+    sort_results.to_csv('output/tables/inference_portfolio_sorts.csv', index=False)
+    print("\n✓ Inference saved to output/tables/inference_*.csv")
+
+    return fm_results, sort_results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bootstrap and placebo inference for Tables III, V and VIII")
+    parser.add_argument('--draws', type=int, default=DEFAULT_DRAWS, help="replications per statistic")
+    parser.add_argument('--block-length', type=int, default=None, help="bootstrap block length in weeks (default T^(1/3))")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="processes for the draw chunks")
+    args = parser.parse_args()
+
+    from table_replication import load_all_processed_data, calculate_additional_variables
+
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    df = calculate_additional_variables(load_all_processed_data()).to_frame()
+    table_inference(df, args.draws, args.block_length, args.seed, args.workers)
+    print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
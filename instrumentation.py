@@ -0,0 +1,407 @@
+"""
+Run Instrumentation for "A Tale of Two Premiums" Paper Replication
+Wall time, CPU time, peak RSS and rows in / out of every instrumented function
+and stage, aggregated per call path into a run report (output/reports/*.json plus a
+text summary). Off by default: a disabled wrapper costs one flag check.
+Opt-in cProfile or tracemalloc for drilling into a single stage.
+"""
+
+import pandas as pd
+import numpy as np
+from contextlib import contextmanager
+from datetime import datetime
+import functools
+import threading
+import tracemalloc
+import resource
+import cProfile
+import pstats
+import json
+import sys
+import time
+import io
+import os
+
+from panel import Panel
+
+REPORT_DIR = 'output/reports'
+RSS_INTERVAL = 0.01  # seconds between RSS samples while a run is instrumented
+PROFILE_LINES = 25   # functions listed from a cProfile drill-down
+TRACE_LINES = 15     # allocation sites listed from a tracemalloc drill-down
+
+_state = {'enabled': False, 'profile': None, 'trace_memory': None, 'started': None}
+_stats = {}      # {call path: aggregated measurements}
+_open = []       # spans currently running, innermost last
+_profiles = {}   # {stage: cProfile.Profile}
+_traced = set()  # stages already traced with tracemalloc
+_lock = threading.Lock()
+_sampler = None
+
+# ============================================================================
+# Memory and row counts
+# ============================================================================
+def current_rss():
+    """Resident set size in bytes (Linux /proc; peak RSS elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+class PeakRSS:
+    """Highest RSS seen while the block runs, sampled by a background thread"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+        return False
+
+def n_rows(obj):
+    """Rows of a DataFrame / Series / array / Panel, or summed over a dict / list of them (None if not countable)"""
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray, Panel)):
+        return len(obj)
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, (list, tuple)) and obj and all(isinstance(o, (pd.DataFrame, pd.Series)) for o in obj):
+        return int(sum(len(o) for o in obj))
+    return None
+
+def _sample_rss(done):
+    while not done.wait(RSS_INTERVAL):
+        rss = current_rss()
+        with _lock:
+            for span in _open:
+                span['peak'] = max(span['peak'], rss)
+
+# ============================================================================
+# Switching on and off
+# ============================================================================
+def enable(profile=None, trace_memory=None):
+    """
+    Start recording
+
+    Parameters:
+    -----------
+    profile : stage name to run under cProfile (e.g. 'calculate_variables')
+    trace_memory : stage name whose first call is traced with tracemalloc
+    """
+    global _sampler
+    _state.update(enabled=True, profile=profile, trace_memory=trace_memory, started=time.time())
+    if _sampler is None:
+        done = threading.Event()
+        thread = threading.Thread(target=_sample_rss, args=(done,), daemon=True)
+        thread.start()
+        _sampler = (thread, done)
+
+def disable():
+    global _sampler
+    _state['enabled'] = False
+    if _sampler is not None:
+        thread, done = _sampler
+        done.set()
+        thread.join()
+        _sampler = None
+
+def is_enabled():
+    return _state['enabled']
+
+def worker_settings():
+    """enable() arguments that reproduce this process's settings in a worker (None if disabled)"""
+    if not _state['enabled']:
+        return None
+    return {'profile': _state['profile'], 'trace_memory': _state['trace_memory']}
+
+def reset():
+    """Drop everything recorded so far"""
+    _stats.clear()
+    _profiles.clear()
+    _traced.clear()
+
+# ============================================================================
+# Spans
+# ============================================================================
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Measure a block as stage `name`; set span['rows_out'] inside the block to record output rows
+
+    Nested stages are recorded under their caller's path ('table_V_portfolio_sorts/load_daily_prices'),
+    and the summary shows each stage's own (self) time next to its total.
+    """
+    if not _state['enabled']:
+        yield {}
+        return
+
+    rss = current_rss()
+    parent = _open[-1]['path'] if _open else None
+    span = {'name': name, 'path': f'{parent}/{name}' if parent else name, 'parent': parent,
+            'rows_in': rows_in, 'rows_out': None, 'peak': rss, 'start_rss': rss, 'children_wall': 0.0}
+    profiler = _start_profile(name)
+    tracing = _start_trace(name)
+    with _lock:
+        _open.append(span)
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    error = None
+    try:
+        yield span
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        with _lock:
+            _open.remove(span)
+            span['peak'] = max(span['peak'], current_rss())
+            if _open:
+                _open[-1]['children_wall'] += wall
+                _open[-1]['peak'] = max(_open[-1]['peak'], span['peak'])
+        if profiler is not None:
+            profiler.disable()
+        _record(span, wall, cpu, error, _stop_trace(name) if tracing else None)
+
+def instrumented(func=None, name=None):
+    """
+    Decorator: record every call of func as a stage (named after the function)
+
+    Rows in are counted from the first DataFrame-like argument, rows out from the result.
+    """
+    if func is None:
+        return functools.partial(instrumented, name=name)
+    stage_name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _state['enabled']:
+            return func(*args, **kwargs)
+        rows_in = next((n for n in map(n_rows, list(args) + list(kwargs.values())) if n is not None), None)
+        with stage(stage_name, rows_in) as span:
+            result = func(*args, **kwargs)
+            span['rows_out'] = n_rows(result)
+        return result
+    return wrapper
+
+def _record(span, wall, cpu, error, trace):
+    with _lock:
+        entry = _stats.setdefault(span['path'], {
+            'stage': span['name'], 'parent': span['parent'], 'calls': 0, 'wall_s': 0.0, 'self_wall_s': 0.0,
+            'cpu_s': 0.0, 'peak_rss_mb': 0.0, 'rss_growth_mb': 0.0, 'rows_in': None, 'rows_out': None,
+            'errors': 0, 'first_start': time.time() - wall,
+        })
+        entry['calls'] += 1
+        entry['wall_s'] += wall
+        entry['self_wall_s'] += max(wall - span['children_wall'], 0.0)
+        entry['cpu_s'] += cpu
+        entry['peak_rss_mb'] = max(entry['peak_rss_mb'], span['peak'] / 2 ** 20)
+        entry['rss_growth_mb'] = max(entry['rss_growth_mb'], (span['peak'] - span['start_rss']) / 2 ** 20)
+        for key in ('rows_in', 'rows_out'):
+            if span[key] is not None:
+                entry[key] = (entry[key] or 0) + span[key]
+        if error is not None:
+            entry['errors'] += 1
+        if trace is not None:
+            entry['tracemalloc'] = trace
+
+# ============================================================================
+# Drill-downs
+# ============================================================================
+def _start_profile(name):
+    if _state['profile'] != name:
+        return None
+    profiler = _profiles.setdefault(name, cProfile.Profile())
+    try:
+        profiler.enable()
+    except ValueError:
+        # A profiler is already active (recursive or nested call of the same stage)
+        return None
+    return profiler
+
+def _start_trace(name):
+    if _state['trace_memory'] != name or name in _traced or tracemalloc.is_tracing():
+        return False
+    _traced.add(name)
+    tracemalloc.start()
+    return True
+
+def _stop_trace(name):
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    top = snapshot.statistics('lineno')[:TRACE_LINES]
+    return {
+        'traced_peak_mb': peak / 2 ** 20,
+        'traced_current_mb': current / 2 ** 20,
+        'top_allocations': [{'site': str(s.traceback[0]), 'size_mb': s.size / 2 ** 20, 'count': s.count}
+                            for s in top],
+    }
+
+def profile_text(name):
+    """cProfile listing of a profiled stage (top functions by cumulative time)"""
+    if name not in _profiles:
+        return None
+    out = io.StringIO()
+    pstats.Stats(_profiles[name], stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+# ============================================================================
+# Collecting across processes
+# ============================================================================
+def collect():
+    """Aggregated measurements recorded so far, with the cProfile listing of a profiled stage: {path: dict}"""
+    with _lock:
+        stats = {path: dict(entry) for path, entry in _stats.items()}
+    for name in _profiles:
+        path = min((p for p in stats if stats[p]['stage'] == name), key=lambda p: stats[p]['first_start'], default=None)
+        if path is not None:
+            stats[path]['cprofile'] = profile_text(name)
+    return stats
+
+def merge(stats):
+    """Add measurements recorded in another process (e.g. a table worker)"""
+    with _lock:
+        for path, remote in stats.items():
+            entry = _stats.get(path)
+            if entry is None:
+                _stats[path] = dict(remote)
+                continue
+            entry['first_start'] = min(entry['first_start'], remote['first_start'])
+            for key in ('calls', 'wall_s', 'self_wall_s', 'cpu_s', 'errors'):
+                entry[key] += remote[key]
+            for key in ('peak_rss_mb', 'rss_growth_mb'):
+                entry[key] = max(entry[key], remote[key])
+            for key in ('rows_in', 'rows_out'):
+                if remote[key] is not None:
+                    entry[key] = (entry[key] or 0) + remote[key]
+            for key in ('tracemalloc', 'cprofile'):
+                if key in remote:
+                    entry.setdefault(key, remote[key])
+
+# ============================================================================
+# Report
+# ============================================================================
+def _ordered(stats):
+    """Call paths in order of first call, each followed by its callees"""
+    children = {}
+    for path, entry in stats.items():
+        parent = entry['parent'] if entry['parent'] in stats else None
+        children.setdefault(parent, []).append(path)
+    order = []
+
+    def visit(parent):
+        for path in sorted(children.get(parent, []), key=lambda p: stats[p]['first_start']):
+            order.append(path)
+            visit(path)
+    visit(None)
+    return order
+
+def summary_text(stats, title=''):
+    """Human-readable table of the measurements, nested stages indented under their parent"""
+    lines = [f"RUN REPORT{': ' + title if title else ''}",
+             f"{'stage':44} {'calls':>6} {'wall s':>9} {'self s':>9} {'cpu s':>9} "
+             f"{'peak MB':>9} {'rows in':>11} {'rows out':>11}"]
+    for path in _ordered(stats):
+        e = stats[path]
+        label = ('  ' * path.count('/') + e['stage'])[:44]
+        rows_in = '' if e['rows_in'] is None else f"{e['rows_in']:,}"
+        rows_out = '' if e['rows_out'] is None else f"{e['rows_out']:,}"
+        mark = ' ✗' if e['errors'] else ''
+        lines.append(f"{label:44} {e['calls']:>6} {e['wall_s']:9.3f} {e['self_wall_s']:9.3f} {e['cpu_s']:9.3f} "
+                     f"{e['peak_rss_mb']:9.1f} {rows_in:>11} {rows_out:>11}{mark}")
+
+    self_time = {}
+    for e in stats.values():
+        self_time[e['stage']] = self_time.get(e['stage'], 0.0) + e['self_wall_s']
+    top = sorted(self_time, key=self_time.get, reverse=True)[:5]
+    if top:
+        lines.append("\nMost self time: " + ', '.join(f"{n} ({self_time[n]:.2f}s)" for n in top))
+    for path in stats:
+        trace = stats[path].get('tracemalloc')
+        if trace:
+            lines.append(f"\ntracemalloc {path}: peak {trace['traced_peak_mb']:.1f} MB traced, "
+                         f"{trace['traced_current_mb']:.1f} MB still held at exit by:")
+            lines += [f"  {a['size_mb']:9.2f} MB {a['count']:>8} blocks  {a['site']}" for a in trace['top_allocations']]
+        if stats[path].get('cprofile'):
+            lines.append(f"\ncProfile {path}\n{stats[path]['cprofile'].rstrip()}")
+    return '\n'.join(lines)
+
+def write_report(script, directory=REPORT_DIR):
+    """
+    Write the run report as JSON plus a text summary (and the .prof of a profiled stage)
+
+    Returns: (json path, text path)
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    base = os.path.join(directory, f'{script}_{stamp}')
+    stats = collect()
+    started = _state['started'] or min((e['first_start'] for e in stats.values()), default=time.time())
+    stages = {path: dict({k: v for k, v in e.items() if k != 'first_start'}, first_start_s=e['first_start'] - started)
+              for path, e in stats.items()}
+
+    report = {
+        'script': script,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'argv': sys.argv,
+        'wall_s': time.time() - started,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10),
+        'profile_stage': _state['profile'],
+        'trace_memory_stage': _state['trace_memory'],
+        'stages': stages,
+    }
+    for name in _profiles:
+        # Full stats of a stage profiled in this process (worker profiles only ship their listing)
+        _profiles[name].dump_stats(f'{base}_{name}.prof')
+        report['profile_file'] = f'{base}_{name}.prof'
+    text = summary_text(stats, script)
+
+    with open(f'{base}.json', 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    with open(f'{base}.txt', 'w') as f:
+        f.write(text + '\n')
+    return f'{base}.json', f'{base}.txt'
+
+# ============================================================================
+# Command line
+# ============================================================================
+def add_arguments(parser):
+    """--report / --profile-stage / --trace-memory options shared by the pipeline scripts"""
+    parser.add_argument('--report', action='store_true',
+                        help=f"record per-stage time, memory and rows; write a run report to {REPORT_DIR}/")
+    parser.add_argument('--profile-stage', metavar='STAGE', default=None,
+                        help="run one stage (function name) under cProfile (implies --report)")
+    parser.add_argument('--trace-memory', metavar='STAGE', default=None,
+                        help="trace one stage's allocations with tracemalloc (implies --report)")
+
+def start_run(args):
+    """Enable instrumentation if the parsed arguments ask for it"""
+    if args.report or args.profile_stage or args.trace_memory:
+        enable(profile=args.profile_stage, trace_memory=args.trace_memory)
+
+def finish_run(script):
+    """Write the report of an instrumented run and print its summary"""
+    if not is_enabled():
+        return
+    json_path, text_path = write_report(script)
+    disable()
+    with open(text_path) as f:
+        print("\n" + "=" * 70)
+        print(f.read().rstrip())
+        print("=" * 70)
+    print(f"✓ Run report saved to {json_path} and {text_path}")
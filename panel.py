@@ -0,0 +1,398 @@
+"""
+Panel Layout for "A Tale of Two Premiums" Paper Replication
+The processed panel as a typed Panel sorted by (Report_Date, Ticker): compact
+column arrays, string metadata once per commodity, group offsets for slicing
+one date or one commodity, and derived columns computed on first read.
+Cross-sectional code works on the wide layout: each variable as an aligned
+(dates × tickers) array with a NaN mask.
+"""
+
+import pandas as pd
+import numpy as np
+
+# String columns that describe the commodity, not the observation
+META_COLS = ['CFTC_Contract_Market_Code', 'Market_and_Exchange_Names']
+
+# ============================================================================
+# Compact column types
+# ============================================================================
+def compact_array(values, float_dtype=np.float32):
+    """
+    Values in the smallest type that holds them exactly
+
+    Integers take the smallest integer type covering their min and max (signed
+    when negative); floats become float_dtype only when every value survives
+    the round trip (no rounding, no overflow to inf). Anything else, or a
+    cast that would not be smaller, keeps its type.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu' and len(values):
+        lo, hi = values.min(), values.max()
+        if lo >= 0:
+            dtype = np.min_scalar_type(hi)
+        else:
+            dtype = next(np.dtype(t) for t in (np.int8, np.int16, np.int32, np.int64)
+                         if np.iinfo(t).min <= lo and hi <= np.iinfo(t).max)
+    elif values.dtype.kind == 'f':
+        dtype = np.dtype(float_dtype)
+    else:
+        return values
+    if dtype.itemsize >= values.dtype.itemsize:
+        return values
+    with np.errstate(over='ignore'):
+        compact = values.astype(dtype)
+    if not np.array_equal(compact.astype(values.dtype), values, equal_nan=values.dtype.kind == 'f'):
+        return values
+    return compact
+
+# ============================================================================
+# Group-wise operations on rows grouped by commodity (shared by Panel and
+# panel_features.SortedPanel)
+# ============================================================================
+def group_shift(values, groups, periods=1):
+    """
+    Shift within groups: positive = lag, negative = lead
+
+    values : array with each group's rows contiguous and in order
+    groups : group code of every row
+    """
+    out = np.full(len(values), np.nan)
+    k = abs(periods)
+    if k == 0:
+        return values.copy()
+    if k >= len(values):
+        return out
+    if periods > 0:
+        same = groups[k:] == groups[:-k]
+        out[k:] = np.where(same, values[:-k], np.nan)
+    else:
+        same = groups[:-k] == groups[k:]
+        out[:-k] = np.where(same, values[k:], np.nan)
+    return out
+
+def group_rolling_mean(values, group_start, window, min_periods=None):
+    """
+    Trailing rolling mean within groups (NaN-aware, like pandas rolling().mean())
+
+    values : array with each group's rows contiguous and in order
+    group_start : index of the first row of every row's group
+    """
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(values)
+    csum = np.r_[0.0, np.cumsum(np.where(valid, values, 0.0))]
+    ccount = np.r_[0, np.cumsum(valid)]
+
+    idx = np.arange(len(values))
+    lo = np.maximum(idx - window + 1, group_start)
+    total = csum[idx + 1] - csum[lo]
+    count = ccount[idx + 1] - ccount[lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count >= min_periods, total / count, np.nan)
+
+# ============================================================================
+# Typed panel
+# ============================================================================
+class Panel:
+    """
+    Long panel sorted by (date, ticker)
+
+    Rows of a date are contiguous (date_offsets); rows of a ticker are
+    ticker_order[ticker_offsets[j]:ticker_offsets[j + 1]], in date order.
+    Columns are stored compactly (compact_array) and read as float64 by
+    panel[col]; panel['Report_Date'] and panel['Ticker'] give the row dates and
+    tickers. Derived columns are functions of the panel (same [] / shift / diff /
+    rolling_mean interface as panel_features.SortedPanel), evaluated once when
+    first read; pickling evaluates them. Per-ticker '{ticker}_Close' columns
+    become one Close column; other string columns are kept once per ticker
+    (meta, latest value).
+    """
+
+    def __init__(self, df, date_col='Report_Date', ticker_col='Ticker', float_dtype=np.float32):
+        date_codes, dates = pd.factorize(df[date_col], sort=True)
+        ticker_codes, tickers = pd.factorize(df[ticker_col].astype(str), sort=True)
+        order = np.lexsort((ticker_codes, date_codes))
+        date_codes, ticker_codes = date_codes[order], ticker_codes[order]
+        if len(order) > 1 and ((np.diff(date_codes) == 0) & (np.diff(ticker_codes) == 0)).any():
+            raise ValueError(f"Panel has duplicate ({date_col}, {ticker_col}) rows")
+
+        sorted_df = df.iloc[order]
+        latest = np.full(len(tickers), -1)
+        latest[ticker_codes] = np.arange(len(order))
+        meta_cols = [c for c in df.columns if c in META_COLS or (
+            c not in (date_col, ticker_col) and df[c].dtype.kind not in 'biufM')]
+        meta = pd.DataFrame({c: sorted_df[c].astype(str).to_numpy()[latest] for c in meta_cols},
+                            index=pd.Index(tickers, name=ticker_col))
+
+        data = {}
+        own_close = np.asarray([f'{t}_Close' for t in tickers])[ticker_codes]
+        closes = [c for c in df.columns if c.endswith('_Close') and c[:-6] in set(tickers)]
+        for col in df.columns:
+            if col in (date_col, ticker_col) or col in meta_cols or col in closes:
+                continue
+            data[col] = compact_array(sorted_df[col].to_numpy(), float_dtype)
+        # Each commodity's own '{ticker}_Close' column (NaN for every other commodity) as one column
+        if closes:
+            close = np.full(len(order), np.nan)
+            for c in closes:
+                rows = own_close == c
+                close[rows] = sorted_df[c].to_numpy(dtype=float)[rows]
+            data['Close'] = compact_array(close, float_dtype)
+
+        self._set_layout(date_col, ticker_col, dates, tickers, date_codes, ticker_codes, data, meta,
+                         dict(df.attrs), float_dtype)
+
+    def _set_layout(self, date_col, ticker_col, dates, tickers, date_codes, ticker_codes, data, meta,
+                    attrs, float_dtype):
+        self.date_col, self.ticker_col = date_col, ticker_col
+        self.dates, self.tickers = pd.Index(dates), pd.Index(tickers)
+        self.date_codes = compact_array(np.asarray(date_codes))
+        self.ticker_codes = compact_array(np.asarray(ticker_codes))
+        self.date_offsets = np.r_[0, np.cumsum(np.bincount(self.date_codes, minlength=len(self.dates)))]
+        self.ticker_order = np.argsort(self.ticker_codes, kind='stable')
+        self.ticker_offsets = np.r_[0, np.cumsum(np.bincount(self.ticker_codes, minlength=len(self.tickers)))]
+        self.data, self.meta, self.attrs = data, meta, attrs
+        self.float_dtype = float_dtype
+        self.derived = {}
+        self.cache = {}
+
+    @classmethod
+    def from_parts(cls, layout, data):
+        """Panel from parts() output (column arrays may be memory-mapped)"""
+        panel = cls.__new__(cls)
+        panel._set_layout(data=data, **layout)
+        return panel
+
+    def parts(self):
+        """Layout (codes, levels, metadata) and column arrays, with the derived columns evaluated"""
+        self.materialize()
+        layout = {'date_col': self.date_col, 'ticker_col': self.ticker_col, 'dates': self.dates,
+                  'tickers': self.tickers, 'date_codes': self.date_codes, 'ticker_codes': self.ticker_codes,
+                  'meta': self.meta, 'attrs': self.attrs, 'float_dtype': self.float_dtype}
+        return layout, self.data
+
+    def __len__(self):
+        return len(self.date_codes)
+
+    def __getstate__(self):
+        # Derived columns are functions (not picklable): keep their values instead
+        state = self.__dict__.copy()
+        state['data'] = {**self.data, **{col: self[col] for col in self.derived if col not in self.data}}
+        state['derived'], state['cache'] = {}, {}
+        return state
+
+    @property
+    def columns(self):
+        return list(self.data) + [c for c in self.derived if c not in self.data]
+
+    @property
+    def index(self):
+        """(date, ticker) MultiIndex, built from the codes"""
+        return pd.MultiIndex(levels=[self.dates, self.tickers], codes=[self.date_codes, self.ticker_codes],
+                             names=[self.date_col, self.ticker_col], verify_integrity=False)
+
+    def nbytes(self):
+        """Memory held by the codes, offsets, stored columns and cached derived columns"""
+        arrays = [self.date_codes, self.ticker_codes, self.date_offsets, self.ticker_order, self.ticker_offsets]
+        return (sum(a.nbytes for a in arrays) + sum(a.nbytes for a in self.data.values())
+                + sum(a.nbytes for a in self.cache.values()) + int(self.meta.memory_usage(deep=True).sum()))
+
+    # ------------------------------------------------------------------
+    # Columns
+    # ------------------------------------------------------------------
+    def __getitem__(self, col):
+        """Column as float64 in panel order; derived columns are computed on first read"""
+        if col in self.data:
+            return self.data[col].astype(float, copy=False)
+        if col == self.date_col:
+            return self.dates.values[self.date_codes]
+        if col == self.ticker_col:
+            return self.tickers.values[self.ticker_codes]
+        if col not in self.cache:
+            if col not in self.derived:
+                raise KeyError(col)
+            self.cache[col] = np.asarray(self.derived[col](self), dtype=float)
+        return self.cache[col]
+
+    def __setitem__(self, col, values):
+        values = np.asarray(values)
+        if values.shape != (len(self),):
+            raise ValueError(f"Column {col!r} needs {len(self)} values, got shape {values.shape}")
+        self.derived.pop(col, None)
+        # Derived columns may read this one
+        self.cache.clear()
+        self.data[col] = compact_array(values, self.float_dtype)
+
+    def __contains__(self, col):
+        return col in self.data or col in self.derived
+
+    def derive(self, col, func):
+        """Register a derived column func(panel) -> array, computed when first read (replaces a stored one)"""
+        self.data.pop(col, None)
+        self.cache.clear()
+        self.derived[col] = func
+
+    def materialize(self):
+        """Evaluate every derived column and store it"""
+        values = {col: self[col] for col in self.derived}
+        self.derived, self.cache = {}, {}
+        for col, v in values.items():
+            self.data[col] = compact_array(v, self.float_dtype)
+
+    # ------------------------------------------------------------------
+    # Group-wise operations (per ticker, in date order)
+    # ------------------------------------------------------------------
+    def _by_ticker(self, grouped, col):
+        order = self.ticker_order
+        out = np.empty(len(order))
+        out[order] = grouped(self[col][order], self.ticker_codes[order])
+        return out
+
+    def shift(self, col, periods=1):
+        """Per-ticker shift by rows: positive = lag, negative = lead"""
+        return self._by_ticker(lambda values, groups: group_shift(values, groups, periods), col)
+
+    def diff(self, col, periods=1):
+        """Per-ticker difference"""
+        return self[col] - self.shift(col, periods)
+
+    def rolling_mean(self, col, window, min_periods=None):
+        """Per-ticker trailing rolling mean (NaN-aware, like pandas rolling().mean())"""
+        return self._by_ticker(lambda values, groups: group_rolling_mean(
+            values, self.ticker_offsets[groups], window, min_periods), col)
+
+    def positions(self):
+        """Row position within its ticker and ticker code of every row (see rolling_regression.ticker_positions)"""
+        order = self.ticker_order
+        pos = np.empty(len(order), dtype=np.intp)
+        pos[order] = np.arange(len(order)) - self.ticker_offsets[self.ticker_codes[order]]
+        return pos, self.ticker_codes.astype(np.intp), self.tickers
+
+    # ------------------------------------------------------------------
+    # Slicing
+    # ------------------------------------------------------------------
+    def date_rows(self, date):
+        """Row slice of one date (contiguous, tickers in sorted order)"""
+        i = date if isinstance(date, (int, np.integer)) else self.dates.get_loc(pd.Timestamp(date))
+        return slice(self.date_offsets[i], self.date_offsets[i + 1])
+
+    def ticker_rows(self, ticker):
+        """Row positions of one ticker, in date order"""
+        j = ticker if isinstance(ticker, (int, np.integer)) else self.tickers.get_loc(ticker)
+        return self.ticker_order[self.ticker_offsets[j]:self.ticker_offsets[j + 1]]
+
+    def date_slice(self, date, columns):
+        """DataFrame of one date's rows (indexed by ticker)"""
+        rows = self.date_rows(date)
+        return pd.DataFrame({col: self[col][rows] for col in columns},
+                            index=pd.Index(self.tickers[self.ticker_codes[rows]], name=self.ticker_col))
+
+    def ticker_slice(self, ticker, columns):
+        """DataFrame of one ticker's rows (indexed by date)"""
+        rows = self.ticker_rows(ticker)
+        return pd.DataFrame({col: self[col][rows] for col in columns},
+                            index=pd.Index(self.dates[self.date_codes[rows]], name=self.date_col))
+
+    def rows(self, mask):
+        """
+        Panel of the rows where mask is True (dates and tickers without rows are dropped)
+
+        Derived columns are evaluated on the full panel first, so lags and
+        rolling windows still see the rows left out.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        data = {col: (self.data[col] if col in self.data else self[col])[mask] for col in self.columns}
+        date_used, date_codes = np.unique(self.date_codes[mask], return_inverse=True)
+        ticker_used, ticker_codes = np.unique(self.ticker_codes[mask], return_inverse=True)
+        layout = {'date_col': self.date_col, 'ticker_col': self.ticker_col,
+                  'dates': self.dates[date_used], 'tickers': self.tickers[ticker_used],
+                  'date_codes': date_codes, 'ticker_codes': ticker_codes,
+                  'meta': self.meta.iloc[ticker_used], 'attrs': dict(self.attrs), 'float_dtype': self.float_dtype}
+        return Panel.from_parts(layout, data)
+
+    def slots(self):
+        """Wide-layout slots straight from the codes (see panel_slots)"""
+        return (np.asarray(self.dates), self.date_codes.astype(np.intp), self.ticker_codes.astype(np.intp),
+                len(self.tickers), self.tickers)
+
+    def to_frame(self, columns=None, meta=False):
+        """
+        Long float64 DataFrame in panel order (Report_Date and Ticker as columns)
+
+        Parameters:
+        -----------
+        columns : stored and/or derived columns (default: all)
+        meta : also repeat the per-ticker metadata on every row
+        """
+        columns = self.columns if columns is None else list(columns)
+        frame = {
+            self.date_col: self[self.date_col],
+            self.ticker_col: pd.Categorical.from_codes(self.ticker_codes, self.tickers),
+        }
+        for col in columns:
+            frame[col] = self[col]
+        if meta:
+            for col in self.meta.columns:
+                frame[col] = pd.Categorical(self.meta[col].to_numpy()[self.ticker_codes])
+        frame = pd.DataFrame(frame)
+        frame.attrs = dict(self.attrs)
+        return frame
+
+# ============================================================================
+# Wide (dates × tickers) layout
+# ============================================================================
+def panel_slots(df, date_col='Report_Date', ticker_col='Ticker'):
+    """
+    Row (date) and column (ticker) of every panel row in the wide layout
+
+    Rows are the sorted report dates observed in the panel (holiday-shifted
+    reports keep their own date, no empty calendar weeks), columns the sorted
+    tickers. A Panel already holds these as codes. Without a ticker column, or
+    when a (date, ticker) pair repeats, each row of a date gets its own slot
+    instead, so duplicated commodities stay separate rows.
+
+    Returns: dates, date_codes, slots, n_slots, tickers (None for per-date slots)
+    """
+    if isinstance(df, Panel):
+        return df.slots()
+
+    dates = pd.DatetimeIndex(df[date_col]).unique().sort_values()
+    date_codes = dates.get_indexer(df[date_col])
+
+    if ticker_col in df.columns:
+        slots, tickers = pd.factorize(df[ticker_col], sort=True)
+        if not pd.Series(date_codes * len(tickers) + slots).duplicated().any():
+            return np.asarray(dates), date_codes, slots, len(tickers), pd.Index(tickers)
+
+    slots = pd.Series(date_codes).groupby(date_codes).cumcount().to_numpy()
+    return np.asarray(dates), date_codes, slots, slots.max() + 1 if len(slots) else 0, None
+
+def wide_panel(df, columns, date_col='Report_Date', ticker_col='Ticker'):
+    """
+    Aligned (dates × tickers) arrays of panel columns
+
+    Parameters:
+    -----------
+    df : Panel, or long panel with one row per (date, commodity)
+    columns : columns to lay out (the date axis is the observed report dates)
+
+    Returns: dates, tickers, dict of {column: array} (NaN where missing), obs (bool)
+    """
+    dates, date_codes, slots, n_slots, tickers = panel_slots(df, date_col, ticker_col)
+    shape = (len(dates), n_slots)
+
+    arrays = {}
+    for col in columns:
+        arrays[col] = np.full(shape, np.nan)
+        arrays[col][date_codes, slots] = np.asarray(df[col], dtype=float)
+    obs = np.zeros(shape, dtype=bool)
+    obs[date_codes, slots] = True
+    return dates, tickers, arrays, obs
+
+def stack_panel(df, columns, date_col='Report_Date'):
+    """
+    Dense (dates × slots) arrays of panel columns, one slot per ticker (see panel_slots)
+
+    Returns: dates, dict of {column: array} (NaN in unused slots), obs (bool)
+    """
+    dates, tickers, arrays, obs = wide_panel(df, columns, date_col)
+    return dates, arrays, obs
@@ -0,0 +1,65 @@
+"""
+Columnar Panel Cache for "A Tale of Two Premiums" Paper Replication
+One typed Parquet file holding the processed panel of all commodities
+"""
+
+import pandas as pd
+import glob
+import os
+
+PROCESSED_DIR = 'data/processed'
+PANEL_FILE = os.path.join(PROCESSED_DIR, 'panel.parquet')
+
+# String metadata repeated on every row, stored once per distinct value
+CATEGORICAL_COLS = ['Ticker', 'CFTC_Contract_Market_Code', 'Market_and_Exchange_Names']
+
+def parquet_available():
+    """Parquet support is optional (pyarrow); without it every loader reads CSV"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def to_panel_dtypes(df):
+    """Datetime Report_Date and categorical string metadata"""
+    df = df.copy()
+    df['Report_Date'] = pd.to_datetime(df['Report_Date'])
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            # Missing values stay missing (astype(str) would make them the category 'nan')
+            df[col] = df[col].astype('string').astype('category')
+    return df
+
+def write_processed_panel(df, path=PANEL_FILE):
+    """
+    Write the long processed panel (one row per Report_Date × Ticker) as Parquet
+
+    Returns: path written, or None when Parquet support is not installed
+    """
+    if not parquet_available():
+        print("⚠ pyarrow not installed - skipping columnar panel cache")
+        return None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    to_panel_dtypes(df).to_parquet(path, index=False)
+    print(f"✓ Saved columnar panel: {path} ({len(df):,} rows)")
+    return path
+
+def panel_is_current(path=PANEL_FILE):
+    """The panel file exists and no processed CSV is newer than it"""
+    if not os.path.exists(path):
+        return False
+    panel_mtime = os.path.getmtime(path)
+    csv_files = glob.glob(os.path.join(PROCESSED_DIR, '*_processed.csv'))
+    return all(os.path.getmtime(f) <= panel_mtime for f in csv_files)
+
+def read_processed_panel(columns=None, path=PANEL_FILE):
+    """
+    Read the columnar panel (only the requested columns)
+
+    Returns: DataFrame, or None when the file is missing / stale or Parquet is unavailable
+    """
+    if not parquet_available() or not panel_is_current(path):
+        return None
+    return pd.read_parquet(path, columns=columns)
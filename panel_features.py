@@ -0,0 +1,109 @@
+"""
+Panel Feature Builder for "A Tale of Two Premiums" Paper Replication
+Derived per-commodity columns are declared once and computed in a single sorted pass
+"""
+
+import pandas as pd
+import numpy as np
+
+from panel import Panel, group_shift, group_rolling_mean
+
+class SortedPanel:
+    """
+    Long panel with rows grouped by commodity (original order kept within a group)
+
+    Columns are plain NumPy arrays in grouped order; shift / diff / rolling
+    (panel.group_shift / group_rolling_mean, as in panel.Panel) never cross a
+    commodity boundary, so no per-ticker loop is needed.
+    """
+
+    def __init__(self, df, group_col='Ticker'):
+        codes, _ = pd.factorize(df[group_col])
+        self.order = np.argsort(codes, kind='stable')
+        self.groups = codes[self.order]
+        self.df = df
+        self.columns = {}
+
+        # Index of the first row of each row's group
+        starts = np.r_[True, self.groups[1:] != self.groups[:-1]]
+        self.group_start = np.maximum.accumulate(np.where(starts, np.arange(len(starts)), 0))
+
+    def __getitem__(self, col):
+        if col not in self.columns:
+            self.columns[col] = self.df[col].to_numpy(dtype=float)[self.order]
+        return self.columns[col]
+
+    def __setitem__(self, col, values):
+        self.columns[col] = np.asarray(values, dtype=float)
+
+    def shift(self, col, periods=1):
+        """Group-wise shift: positive = lag, negative = lead"""
+        return group_shift(self[col], self.groups, periods)
+
+    def diff(self, col, periods=1):
+        """Group-wise difference"""
+        return self[col] - self.shift(col, periods)
+
+    def rolling_mean(self, col, window, min_periods=None):
+        """Group-wise trailing rolling mean (NaN-aware, like pandas rolling().mean())"""
+        return group_rolling_mean(self[col], self.group_start, window, min_periods)
+
+    def to_frame(self, names):
+        """Derived columns back in the original row order"""
+        out = np.empty((len(self.order), len(names)))
+        for j, name in enumerate(names):
+            out[self.order, j] = self.columns[name]
+        return pd.DataFrame(out, index=self.df.index, columns=names)
+
+# ============================================================================
+# Feature specifications: one line per derived column, evaluated in order
+# (later features may use earlier ones)
+# ============================================================================
+PANEL_FEATURES = {
+    # |Q| - Absolute value of net trading
+    'abs_Q_Comm': lambda p: np.abs(p['Q_Comm']),
+    'abs_Q_NonComm': lambda p: np.abs(p['Q_NonComm']),
+    # Position changes, non-reportables and lagged Q of every trader category
+    # come from trader_kernel.panel_trader_variables
+
+    # Return lags for momentum analysis
+    'Ret_lag1': lambda p: p.shift('Ret', 1),
+    'Ret_lag2': lambda p: p.shift('Ret', 2),
+    'Ret_Lead2': lambda p: p.shift('Ret', -2),
+
+    # Basis: simplified as return autocorrelation proxy; replaced by the annualized log basis
+    # of the front and second contracts where futures_store has contract-level prices
+    # Apply log transformation to basis (handling negative values)
+    'Basis': lambda p: np.log(p.rolling_mean('Ret', 4, min_periods=2) + 1),
+    # S: sign variable for noncommercial net position
+    'S': lambda p: np.where(p['NetLong_NonComm'] > 0, 1.0, -1.0),
+    # S*v: signed idiosyncratic volatility
+    'S_v': lambda p: p['S'] * p['v_t'],
+}
+
+def build_panel_features(df, features=PANEL_FEATURES, group_col='Ticker'):
+    """
+    Compute every feature spec on the long panel in one grouped pass
+    (on a panel.Panel the specs become derived columns, computed when first read)
+
+    Parameters:
+    -----------
+    df : panel.Panel, or long DataFrame with one row per (date, commodity), each commodity's rows in date order
+    features : dict of {new column: function(SortedPanel or Panel) -> array}
+
+    Returns:
+    --------
+    df : the Panel, or a DataFrame with the derived columns added (existing ones are replaced)
+    """
+    if isinstance(df, Panel):
+        for name, func in features.items():
+            df.derive(name, func)
+        return df
+
+    panel = SortedPanel(df, group_col)
+    for name, func in features.items():
+        panel[name] = func(panel)
+
+    names = list(features)
+    derived = panel.to_frame(names)
+    return pd.concat([df.drop(columns=[c for c in names if c in df.columns]), derived], axis=1)
@@ -0,0 +1,202 @@
+"""
+Pooled Panel Regressions for "A Tale of Two Premiums" Paper Replication
+Fixed effects absorbed by alternating demeaning (no dummy columns) and
+multiway-clustered standard errors from per-cluster score sums, so memory
+grows with rows × regressors only
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from itertools import combinations
+from scipy import stats
+import argparse
+import os
+
+# Alternating projections stop when no column moves by more than DEMEAN_TOL × its scale
+DEMEAN_TOL = 1e-10
+DEMEAN_MAX_ITER = 1000
+
+# (name, dependent variable, regressors)
+PANEL_SPECS = [
+    ('R_t1_Q_Comm', 'Ret_Lead', ['Q_Comm']),
+    ('R_t1_HP', 'Ret_Lead', ['HP']),
+    ('R_t1_Q_Comm_HP', 'Ret_Lead', ['Q_Comm', 'HP']),
+    ('R_t1_Q_NonComm_HP', 'Ret_Lead', ['Q_NonComm', 'HP']),
+]
+
+def group_codes(df, columns):
+    """Integer codes (0..G-1) of each grouping column; a list of columns is grouped jointly"""
+    if isinstance(columns, str):
+        columns = [columns]
+    codes = pd.MultiIndex.from_frame(df[list(columns)]).factorize()[0] if len(columns) > 1 \
+        else pd.factorize(df[columns[0]])[0]
+    return codes.astype(np.int64)
+
+def group_means(values, codes, n_groups):
+    """(rows × columns) -> (groups × columns) means via bincount"""
+    counts = np.bincount(codes, minlength=n_groups)
+    sums = np.column_stack([np.bincount(codes, weights=values[:, j], minlength=n_groups)
+                            for j in range(values.shape[1])])
+    return sums / np.maximum(counts, 1)[:, None]
+
+def absorb_effects(values, effects, tol=DEMEAN_TOL, max_iter=DEMEAN_MAX_ITER):
+    """
+    Remove any number of fixed effects from every column (within transformation)
+
+    Alternating projections: subtract the group means of each effect in turn
+    until the columns stop changing (one pass for a single effect or a balanced panel).
+
+    Parameters:
+    -----------
+    values : (rows × columns) array, modified copy is returned
+    effects : list of integer code arrays, one per fixed effect
+
+    Returns: (demeaned array, iterations)
+    """
+    values = np.array(values, dtype=float)
+    if not effects:
+        return values, 0
+    n_groups = [codes.max() + 1 for codes in effects]
+    scale = np.maximum(np.abs(values).max(axis=0), 1e-300)
+
+    for iteration in range(1, max_iter + 1):
+        change = np.zeros(values.shape[1])
+        for codes, n in zip(effects, n_groups):
+            means = group_means(values, codes, n)[codes]
+            values -= means
+            change = np.maximum(change, np.abs(means).max(axis=0))
+        if len(effects) == 1 or (change <= tol * scale).all():
+            return values, iteration
+    print(f"⚠ Fixed effects did not converge in {max_iter} iterations")
+    return values, max_iter
+
+def absorbed_rank(effects):
+    """Parameters absorbed by the fixed effects (G1 + G2 - 1 for two connected effects)"""
+    if not effects:
+        return 0
+    return sum(codes.max() + 1 for codes in effects) - (len(effects) - 1)
+
+def cluster_covariance(X, resid, clusters, XtX_inv, n_params):
+    """
+    Multiway-clustered covariance (Cameron, Gelbach and Miller 2011)
+
+    Sum over non-empty subsets S of the cluster dimensions of
+    (-1)^(|S|+1) × V(intersection of S), each V with the G/(G-1) × (N-1)/(N-K)
+    correction; negative eigenvalues of the sum are set to zero.
+
+    Parameters:
+    -----------
+    X : (rows × regressors) demeaned design, resid : residuals
+    clusters : list of integer code arrays, one per cluster dimension
+    n_params : K of the small-sample correction (regressors + absorbed effects)
+    """
+    n_obs, k = X.shape
+    scores = X * resid[:, None]
+    cov = np.zeros((k, k))
+    for size in range(1, len(clusters) + 1):
+        for subset in combinations(clusters, size):
+            codes = subset[0]
+            for other in subset[1:]:
+                codes = pd.factorize(codes * (other.max() + 1) + other)[0]
+            n_groups = codes.max() + 1
+            sums = np.column_stack([np.bincount(codes, weights=scores[:, j], minlength=n_groups)
+                                    for j in range(k)])
+            correction = n_groups / (n_groups - 1) * (n_obs - 1) / (n_obs - n_params)
+            cov += (-1) ** (size + 1) * correction * XtX_inv @ (sums.T @ sums) @ XtX_inv
+
+    eigval, eigvec = np.linalg.eigh(cov)
+    if (eigval < 0).any():
+        cov = eigvec @ np.diag(np.maximum(eigval, 0)) @ eigvec.T
+    return cov
+
+def panel_regression(df, dependent_var, independent_vars, effects=('Ticker', 'Report_Date'),
+                     cluster=('Report_Date', 'Ticker')):
+    """
+    Pooled OLS with absorbed fixed effects and multiway-clustered standard errors
+
+    Parameters:
+    -----------
+    df : long panel (e.g. load_all_processed_data().to_frame())
+    dependent_var : name of the dependent variable
+    independent_vars : list of regressor names
+    effects : fixed-effect columns (empty = pooled OLS with a constant)
+    cluster : cluster columns (empty = iid standard errors)
+
+    Returns: DataFrame with coefficients, clustered std errors, t-stats, and p-values
+    """
+    columns = [dependent_var] + list(independent_vars)
+    used = df[columns + [c for c in set(effects) | set(cluster) if c not in columns]].dropna()
+    n_obs = len(used)
+
+    values = used[columns].to_numpy(dtype=float)
+    effect_codes = [group_codes(used, col) for col in effects]
+    if effect_codes:
+        values, _ = absorb_effects(values, effect_codes)
+        names = list(independent_vars)
+    else:
+        values = np.column_stack([values[:, 0], np.ones(n_obs), values[:, 1:]])
+        names = ['const'] + list(independent_vars)
+    y, X = values[:, 0], values[:, 1:]
+
+    XtX_inv = np.linalg.pinv(X.T @ X)
+    beta = XtX_inv @ (X.T @ y)
+    resid = y - X @ beta
+    n_params = X.shape[1] + absorbed_rank(effect_codes)
+
+    cluster_codes = [group_codes(used, col) for col in cluster]
+    if cluster_codes:
+        cov = cluster_covariance(X, resid, cluster_codes, XtX_inv, n_params)
+        # Inference with G - 1 degrees of freedom of the smallest cluster dimension
+        df_resid = min(codes.max() + 1 for codes in cluster_codes) - 1
+    else:
+        df_resid = n_obs - n_params
+        cov = XtX_inv * (resid @ resid) / df_resid
+
+    std_error = np.sqrt(np.diag(cov))
+    t_stat = beta / std_error
+    return pd.DataFrame({
+        'Variable': names,
+        'Coefficient': beta,
+        'Std_Error': std_error,
+        't_stat': t_stat,
+        'p_value': 2 * (1 - stats.t.cdf(np.abs(t_stat), df_resid)),
+        'N_obs': n_obs,
+    })
+
+def table_panel_regressions(df, specs=PANEL_SPECS, effects=('Ticker', 'Report_Date'),
+                            cluster=('Report_Date', 'Ticker')):
+    """Pooled regressions of every spec, saved to output/tables/panel_regressions.csv"""
+    print("\n" + "=" * 70)
+    print(f"POOLED PANEL REGRESSIONS (FE: {' + '.join(effects) or 'none'}, "
+          f"clustered by: {' + '.join(cluster) or 'none'})")
+    print("=" * 70)
+
+    results = []
+    for name, dep, indep in specs:
+        res = panel_regression(df, dep, indep, effects, cluster)
+        print(f"\n{name}: {dep} ~ {' + '.join(indep)}")
+        print(res.to_string(index=False))
+        results.append(res.assign(Regression=name))
+
+    table = pd.concat(results, ignore_index=True)
+    table = table[['Regression'] + [c for c in table.columns if c != 'Regression']]
+    os.makedirs('output/tables', exist_ok=True)
+    table.to_csv('output/tables/panel_regressions.csv', index=False)
+    print("\n✓ Panel regressions saved to output/tables/panel_regressions.csv")
+    return table
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pooled panel regressions with fixed effects")
+    parser.add_argument('--effects', nargs='*', default=['Ticker', 'Report_Date'],
+                        help="fixed-effect columns (none = pooled OLS)")
+    parser.add_argument('--cluster', nargs='*', default=['Report_Date', 'Ticker'],
+                        help="cluster columns (none = iid standard errors)")
+    args = parser.parse_args()
+
+    from table_replication import load_all_processed_data
+
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    df = load_all_processed_data().to_frame()
+    table_panel_regressions(df, effects=args.effects, cluster=args.cluster)
+    print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -0,0 +1,320 @@
+"""
+Incremental Pipeline Runner for "A Tale of Two Premiums" Paper Replication
+Runs preprocessing and table replication as fingerprinted stages; unchanged stages are skipped
+"""
+
+import pandas as pd
+import argparse
+import hashlib
+import inspect
+import json
+import glob
+import os
+import sys
+from datetime import datetime
+
+import data_preprocessing as prep
+import table_replication as tables
+from panel_cache import write_processed_panel
+from cftc_stream import compact_legacy_file
+from price_store import load_price_frames
+from table_runner import run_table_jobs
+import instrumentation
+
+CACHE_DIR = 'data/cache'
+MANIFEST_FILE = os.path.join(CACHE_DIR, 'manifest.json')
+
+LEGACY_FILE = 'data/cftc_legacy/legacy_cot_data.csv'
+DISAGG_FILE = 'data/cftc_disagg/disagg_cot_data.csv'
+
+# Helper modules whose code the table generators depend on (besides table_replication.py,
+# which is hashed whole: tables share its helpers and period constants)
+TABLE_MODULES = {
+    'table_I': ['panel.py'],
+    'table_II': ['fama_macbeth.py', 'hac.py', 'panel.py'],
+    'table_III': ['fama_macbeth.py', 'hac.py', 'panel.py'],
+    'table_IV': ['fama_macbeth.py', 'hac.py', 'panel.py', 'trader_kernel.py'],
+    'table_V': ['price_store.py', 'return_tensor.py', 'portfolio_sorts.py', 'hac.py', 'panel.py'],
+    'table_VI': ['fama_macbeth.py', 'hac.py', 'panel.py'],
+    'table_VII': ['fama_macbeth.py', 'hac.py', 'panel.py', 'trader_kernel.py'],
+    'table_VIII': ['price_store.py', 'return_tensor.py', 'portfolio_sorts.py', 'hac.py', 'panel.py'],
+}
+TABLE_STAGES = [(name, func, ['table_replication.py'] + TABLE_MODULES.get(name, []))
+                for name, func in tables.TABLE_JOBS]
+
+# Market inputs of calculate_additional_variables (v_t regression on the S&P 500, VIX)
+MACRO_FILES = ['data/SPX_data.csv', 'data/VIX_data.csv']
+
+# ============================================================================
+# Fingerprints
+# ============================================================================
+def combine_hashes(*parts):
+    """Stable hash of a sequence of strings"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def file_fingerprint(path, manifest):
+    """
+    Content hash of a file (None if missing)
+    Hashes are memoized in the manifest by (mtime, size) so unchanged files are not re-read
+    """
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    memo = manifest.setdefault('files', {}).get(path)
+    if memo and memo['mtime'] == stat.st_mtime and memo['size'] == stat.st_size:
+        return memo['hash']
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    manifest['files'][path] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'hash': h.hexdigest()}
+    return h.hexdigest()
+
+def code_fingerprint(*funcs, modules=()):
+    """Hash of the stage functions' source plus any module files they rely on"""
+    parts = [inspect.getsource(func) for func in funcs]
+    for module_file in modules:
+        with open(module_file, encoding='utf-8') as f:
+            parts.append(f.read())
+    return combine_hashes(*parts)
+
+# ============================================================================
+# Stage cache
+# ============================================================================
+def load_manifest():
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    return {'stages': {}, 'files': {}}
+
+def save_manifest(manifest):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+def cached_stage(name, key, compute, force=False, keep=None):
+    """
+    Return the stage output for `key`, computing and pickling it only when not cached
+    (keep(output) -> False leaves a computed output uncached)
+
+    Returns: (output, recomputed)
+    """
+    stem = name.replace('/', '_')
+    path = os.path.join(CACHE_DIR, f'{stem}-{key[:16]}.pkl')
+    if not force and os.path.exists(path):
+        return pd.read_pickle(path), False
+
+    output = compute()
+    if keep is not None and not keep(output):
+        return output, True
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Keep only the newest output of each stage
+    for old in glob.glob(os.path.join(CACHE_DIR, f'{stem}-*.pkl')):
+        os.remove(old)
+    pd.to_pickle(output, path)
+    return output, True
+
+def side_effect_stage(name, key, run, manifest, force=False):
+    """Run a stage that writes files (tables, processed CSVs) only when its key changed"""
+    if not force and manifest['stages'].get(name) == key:
+        return False
+    run()
+    manifest['stages'][name] = key
+    save_manifest(manifest)
+    return True
+
+# ============================================================================
+# Preprocessing stages
+# ============================================================================
+def run_preprocessing(manifest, force=False):
+    """
+    CFTC processing -> weekly prices -> merge + variables, per ticker
+
+    Returns: dict of {ticker: stage key} for the processed panel, or None without raw CFTC data
+    """
+    print("\n" + "=" * 70)
+    print("PREPROCESSING STAGES")
+    print("=" * 70)
+
+    legacy_files = [compact_legacy_file(), LEGACY_FILE]
+    if not any(os.path.exists(f) for f in legacy_files):
+        print(f"⚠ {LEGACY_FILE} not found - using existing processed data")
+        return None
+
+    # Stage 1: CFTC legacy and disaggregated data (whole files)
+    cftc_key = combine_hashes('cftc', code_fingerprint(prep.load_cftc_data, prep.process_cftc_legacy,
+                                                       prep.process_cftc_disaggregated,
+                                                       modules=['cot_schema.py', 'cftc_stream.py']),
+                              *[file_fingerprint(f, manifest) for f in legacy_files],
+                              file_fingerprint(DISAGG_FILE, manifest))
+    cftc_cache = {}
+
+    def process_cftc():
+        legacy_df, disagg_df = prep.load_cftc_data()
+        return prep.process_cftc_legacy(legacy_df), prep.process_cftc_disaggregated(disagg_df)
+
+    def get_cftc():
+        if 'dfs' not in cftc_cache:
+            cftc_cache['dfs'], ran = cached_stage('cftc', cftc_key, process_cftc, force)
+            print(f"✓ {'cftc':24} {'recomputed' if ran else 'cached'}")
+        return cftc_cache['dfs']
+
+    # Stages 2-3: per ticker weekly prices, then merge + variables
+    commodity_map = prep.create_commodity_map()
+    price_code = code_fingerprint(prep.resample_price_file, modules=['price_store.py'])
+    variables_code = code_fingerprint(prep.merge_cot_and_prices, prep.disaggregated_positions,
+                                      prep.calculate_variables, prep.variables_many, prep.trailing_mean,
+                                      prep.create_commodity_map, modules=['trader_kernel.py'])
+
+    processed = {}
+    processed_keys = {}
+    changed = []
+    for file in sorted(glob.glob('data/prices/*_prices.csv')):
+        ticker = os.path.basename(file).replace('_prices.csv', '')
+        price_key = combine_hashes('weekly_prices', price_code, file_fingerprint(file, manifest))
+        ticker_key = combine_hashes('processed', variables_code, cftc_key, price_key)
+
+        def compute(file=file, ticker=ticker):
+            # Parse all stale price files in one pass (one disk-cache write), then look this one up
+            load_price_frames()
+            weekly = prep.resample_price_file(file)
+            if weekly is None:
+                return None
+            legacy, disagg = get_cftc()
+            merged = prep.merge_cot_and_prices(legacy, {ticker: weekly}, commodity_map, disagg)
+            if ticker not in merged:
+                return None
+            return prep.calculate_variables(merged[ticker]).sort_index()
+
+        df, ran = cached_stage(f'processed/{ticker}', ticker_key, compute, force)
+        if df is None:
+            continue
+        processed[ticker] = df
+        processed_keys[ticker] = ticker_key
+
+        output_file = f'data/processed/{ticker}_processed.csv'
+        def write(df=df, output_file=output_file):
+            os.makedirs('data/processed', exist_ok=True)
+            df.to_csv(output_file)
+        wrote = side_effect_stage(f'write/{ticker}', ticker_key, write, manifest,
+                                  force or not os.path.exists(output_file))
+        if wrote:
+            changed.append(ticker)
+        print(f"✓ {ticker:24} {'recomputed' if ran else 'cached'}{' (written)' if wrote else ''}")
+
+    # Columnar panel: rewritten only when a ticker changed
+    panel_key = combine_hashes('panel', *sorted(processed_keys.items()))
+    def write_panel():
+        frames = [df.rename_axis('Report_Date').reset_index().assign(Ticker=ticker)
+                  for ticker, df in processed.items()]
+        write_processed_panel(pd.concat(frames, ignore_index=True))
+    if processed:
+        side_effect_stage('write/panel', panel_key, write_panel, manifest, force or bool(changed))
+
+    print(f"\n✓ {len(changed)} of {len(processed)} tickers recomputed")
+    return processed_keys or None
+
+# ============================================================================
+# Table stages
+# ============================================================================
+def run_tables(manifest, processed_keys=None, force=False, max_workers=None):
+    """
+    Additional variables once, then every table whose inputs or code changed (in parallel)
+
+    Returns: names of the table stages that failed
+    """
+    print("\n" + "=" * 70)
+    print("TABLE STAGES")
+    print("=" * 70)
+
+    if processed_keys is not None:
+        panel_key = combine_hashes('panel', *sorted(processed_keys.items()))
+    else:
+        files = sorted(glob.glob('data/processed/*_processed.csv'))
+        panel_key = combine_hashes('panel', *[file_fingerprint(f, manifest) for f in files])
+
+    variables_key = combine_hashes(
+        'additional_variables', panel_key,
+        code_fingerprint(modules=['table_replication.py', 'panel.py', 'panel_features.py', 'trader_kernel.py',
+                                  'rolling_regression.py', 'panel_cache.py', 'futures_store.py']),
+        *[file_fingerprint(f, manifest) for f in MACRO_FILES],
+        *[file_fingerprint(f, manifest) for f in sorted(glob.glob('data/contracts/*_contracts.csv'))])
+    prices_key = combine_hashes('daily_prices', *[file_fingerprint(f, manifest)
+                                                  for f in sorted(glob.glob('data/prices/*_prices.csv'))])
+
+    variables = {}
+    def get_variables():
+        if 'df' not in variables:
+            # v_t without the S&P 500 (no SPX file, download failed) is a stand-in: never cached
+            variables['df'], ran = cached_stage(
+                'additional_variables', variables_key,
+                lambda: tables.calculate_additional_variables(tables.load_all_processed_data()), force,
+                keep=lambda df: not df.attrs.get('v_t_fallback'))
+            fallback = variables['df'].attrs.get('v_t_fallback')
+            print(f"✓ {'additional_variables':24} {'recomputed' if ran else 'cached'}"
+                  f"{' (no S&P 500 - not cached)' if fallback else ''}")
+        return variables['df']
+
+    stale = []
+    for name, func, modules in TABLE_STAGES:
+        key = combine_hashes(name, variables_key, prices_key, code_fingerprint(func, modules=modules))
+        if force or manifest['stages'].get(name) != key:
+            stale.append((name, func, key))
+        else:
+            print(f"✓ {name:24} up to date")
+    if not stale:
+        return []
+    
+    df = get_variables()
+    load_price_frames()
+    results, failed = run_table_jobs(df, [(name, func) for name, func, key in stale], max_workers)
+    # Tables built on the v_t stand-in are rebuilt on the next run
+    final = not df.attrs.get('v_t_fallback')
+    for name, func, key in stale:
+        if name not in failed and final:
+            manifest['stages'][name] = key
+        print(f"{'✗' if name in failed else '✓'} {name:24} {'failed' if name in failed else 'recomputed'}")
+    save_manifest(manifest)
+    return failed
+
+def run_pipeline(force=False, tables_only=False, max_workers=None):
+    """
+    Run all stages, recomputing only those whose fingerprint changed
+
+    Returns: names of the table stages that failed
+    """
+    manifest = load_manifest()
+    processed_keys = None if tables_only else run_preprocessing(manifest, force)
+    failed = run_tables(manifest, processed_keys, force, max_workers)
+    save_manifest(manifest)
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental replication pipeline")
+    parser.add_argument('--force', action='store_true', help="ignore the cache and recompute every stage")
+    parser.add_argument('--tables-only', action='store_true', help="skip preprocessing, use existing processed data")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes for the table stages (default: all cores, 1 = sequential)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.start_run(args)
+
+    print("\n" + "=" * 70)
+    print("INCREMENTAL PIPELINE FOR 'A TALE OF TWO PREMIUMS'")
+    print("=" * 70)
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    failed = run_pipeline(force=args.force, tables_only=args.tables_only, max_workers=args.workers)
+
+    print("\n" + "=" * 70)
+    print("PIPELINE COMPLETED" if not failed else f"PIPELINE FAILED: {', '.join(failed)}")
+    print("=" * 70)
+    print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    instrumentation.finish_run('pipeline')
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,229 @@
+"""
+Portfolio Sort Engine for "A Tale of Two Premiums" Paper Replication
+N-way independent or conditional sorts; breakpoints and bucket labels for all
+report dates at once on the wide (dates × tickers) arrays
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+
+from panel import stack_panel
+from return_tensor import panel_window_returns
+from hac import check_se_type, window_series_se
+
+# Minimum number of commodities on a date to sort it (same rule as the paper tables)
+MIN_CROSS_SECTION = 10
+
+# ============================================================================
+# Breakpoints and labels
+# ============================================================================
+def quantile_breakpoints(values, n_buckets):
+    """
+    Bucket breakpoints of every row, NaN ignored
+
+    Same quantiles as pd.qcut (linear interpolation, fractions rounded up when
+    not representable), so the buckets match a per-date qcut exactly.
+
+    Returns: (dates × n_buckets+1) array, NaN for rows without values
+    """
+    quantiles = np.linspace(0, 1, n_buckets + 1)
+    np.putmask(quantiles, n_buckets * quantiles != np.arange(n_buckets + 1), np.nextafter(quantiles, 1))
+    if values.shape[1] == 0:
+        return np.full((len(values), n_buckets + 1), np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanpercentile(values, quantiles * 100, axis=1).T
+
+def assign_buckets(values, breakpoints, ties='drop'):
+    """
+    Bucket of every value, same rule as pd.cut(right=True, include_lowest=True)
+
+    Parameters:
+    -----------
+    values : (dates × slots) array
+    breakpoints : (dates × n_buckets+1) array from quantile_breakpoints
+    ties : 'drop' leaves dates with repeated breakpoints unsorted (pd.qcut raises there);
+           'keep' sorts them anyway, ties going to the lower bucket
+
+    Returns: (dates × slots) labels 0..n_buckets-1, -1 = none
+    """
+    n_buckets = breakpoints.shape[1] - 1
+    ids = (breakpoints[:, None, :] < values[..., None]).sum(axis=-1)
+    ids = np.where(values == breakpoints[:, :1], 1, ids)
+    labels = np.where((ids >= 1) & (ids <= n_buckets), ids - 1, -1)
+    if ties == 'drop':
+        repeated = (np.diff(breakpoints, axis=1) == 0).any(axis=1)
+        labels[repeated] = -1
+    return labels
+
+def sort_labels(df, sorts, how='independent', min_obs=MIN_CROSS_SECTION, min_group_obs=2,
+                ties='drop', missing_low=(), date_col='Report_Date'):
+    """
+    Portfolio labels of an N-way sort for every report date at once
+
+    Parameters:
+    -----------
+    df : long panel with one row per (date, commodity)
+    sorts : list of (column, n_buckets), in sort order
+    how : 'independent' (each column within the date) or 'conditional'
+          (each column within the buckets of the columns before it)
+    min_obs : panel rows a date needs to be sorted
+    min_group_obs : rows a bucket needs to be sorted further (conditional sorts)
+    ties : see assign_buckets
+    missing_low : columns whose missing values go to the lowest bucket (instead of none)
+
+    Returns:
+    --------
+    dates : sorted unique dates
+    labels : (dates × slots) portfolio, row-major over the sorts (0..prod(n_buckets)-1, -1 = none)
+    buckets : list of (dates × slots) bucket labels, one per sort column
+    obs : (dates × slots) bool of used slots (aligned with stack_panel(df, ...), one slot per ticker)
+    sorted_dates : bool per date, True where the first sort succeeded
+    """
+    if how not in ('independent', 'conditional'):
+        raise ValueError(f"how must be 'independent' or 'conditional', got {how!r}")
+    dates, arrays, obs = stack_panel(df, [col for col, n in sorts], date_col)
+    eligible = obs.sum(axis=1) >= min_obs
+
+    buckets = []
+    labels = np.where(obs & eligible[:, None], 0, -1)
+    sorted_dates = eligible.copy()
+    for col, n_buckets in sorts:
+        values = arrays[col]
+        # Sort groups: the whole date, or each portfolio of the columns sorted so far
+        if how == 'independent' or not buckets:
+            groups = [np.where(obs & eligible[:, None], 0, -1)]
+        else:
+            groups = [np.where(labels == g, 0, -1) for g in range(labels.max(initial=-1) + 1)]
+
+        bucket = np.full(values.shape, -1)
+        for group in groups:
+            members = group == 0
+            enough = members.sum(axis=1) >= (min_group_obs if buckets else 1)
+            masked = np.where(members, values, np.nan)
+            group_bucket = assign_buckets(masked, quantile_breakpoints(masked, n_buckets), ties)
+            if col in missing_low:
+                group_bucket = np.where(members & np.isnan(values), 0, group_bucket)
+            if not buckets:
+                sorted_dates &= (group_bucket >= 0).any(axis=1)
+            bucket = np.where(members & enough[:, None], group_bucket, bucket)
+        buckets.append(bucket)
+
+        labels = np.where((labels >= 0) & (bucket >= 0), labels * n_buckets + bucket, -1)
+
+    return dates, labels, buckets, obs, sorted_dates
+
+def portfolio_names(sorts):
+    """Default portfolio names, row-major like sort_labels: e.g. 'HP_Smooth_52w1_Q_Comm2'"""
+    names = ['']
+    for col, n_buckets in sorts:
+        names = [f'{name}_{col}{b + 1}' if name else f'{col}{b + 1}' for name in names for b in range(n_buckets)]
+    return names
+
+# ============================================================================
+# Portfolio returns
+# ============================================================================
+def portfolio_returns(returns, labels, n_portfolios):
+    """
+    Equal-weighted return of each portfolio per date
+
+    Parameters:
+    -----------
+    returns : (..., dates, slots) array, NaN where missing
+    labels : (..., dates, slots) portfolio of each slot (0..n_portfolios-1, -1 = none)
+
+    Returns: (..., dates, n_portfolios) array, NaN for empty portfolios
+    """
+    valid = ~np.isnan(returns)
+    values = np.where(valid, returns, 0.0)
+    shape = np.broadcast_shapes(returns.shape, labels.shape)[:-1] + (n_portfolios,)
+    out = np.full(shape, np.nan)
+    for p in range(n_portfolios):
+        members = (labels == p) & valid
+        n = members.sum(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[..., p] = np.where(n > 0, (values * members).sum(axis=-1) / n, np.nan)
+    return out
+
+def series_stats(series, ddof=1):
+    """
+    NaN-aware mean, std, t-stat (mean / std * sqrt(N)) and N of every column
+
+    Returns: mean, std, t, n arrays
+    """
+    n = (~np.isnan(series)).sum(axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(series, axis=0)
+        std = np.nanstd(series, axis=0, ddof=ddof)
+        t = mean / std * np.sqrt(n)
+    return mean, std, t, n
+
+def portfolio_sort(df, sorts, windows, tensor, how='independent', names=None, spreads=(),
+                   min_returns=0, ddof=1, se='iid', lags=None, date_col='Report_Date', **sort_options):
+    """
+    Sort the panel into portfolios and summarize their returns over event windows
+
+    Parameters:
+    -----------
+    df : long panel with Report_Date, Ticker and the sort columns
+    sorts : list of (column, n_buckets), see sort_labels
+    windows : list of (name, start_day, end_day) holding windows relative to the report date
+    tensor : return tensor (build_return_tensor) covering the windows
+    names : portfolio names (default: portfolio_names(sorts))
+    spreads : list of (name, long portfolio, short portfolio) long-short series
+    min_returns : valid returns a sorted date needs in a window to enter its series
+    ddof : degrees of freedom of the std used for the iid t-stat
+    se : 'iid' or 'newey_west' (HAC t-stats, lags default: window overlap, see hac.py)
+    sort_options : min_obs, min_group_obs, ties, missing_low (see sort_labels)
+
+    Returns:
+    --------
+    result : dict with
+        - summary: DataFrame (Portfolio, Period, Mean_Return, Std_Return, t_stat, N_obs),
+          portfolios first, then spreads
+        - series: dict of {window: DataFrame (dates × portfolios + spreads)}
+        - labels: (dates × slots) portfolio labels, with dates, obs as in sort_labels
+    """
+    check_se_type(se)
+    dates, labels, buckets, obs, sorted_dates = sort_labels(df, sorts, how, date_col=date_col, **sort_options)
+    names = list(names or portfolio_names(sorts))
+    n_portfolios = len(names)
+
+    rets = pd.DataFrame(panel_window_returns(tensor, df['Ticker'], df[date_col], [(s, e) for _, s, e in windows]),
+                        columns=[w[0] for w in windows])
+    rets[date_col] = np.asarray(df[date_col])
+    rets['Ticker'] = np.asarray(df['Ticker'])
+    _, window_arrays, _ = stack_panel(rets, [w[0] for w in windows], date_col)
+
+    series = {}
+    for window, start_day, end_day in windows:
+        returns = window_arrays[window]
+        keep = sorted_dates & ((~np.isnan(returns) & obs).sum(axis=1) >= min_returns)
+        ports = portfolio_returns(returns[keep], labels[keep], n_portfolios)
+        frame = pd.DataFrame(ports, index=dates[keep], columns=names)
+        for spread, long, short in spreads:
+            frame[spread] = frame[names[long]] - frame[names[short]]
+        series[window] = frame
+
+    # Newey-West SEs of every portfolio and spread series of every window in one batch
+    if se == 'newey_west':
+        span = {window: (start_day, end_day) for window, start_day, end_day in windows}
+        columns = {(window, col): frame[col].dropna().to_numpy()
+                   for window, frame in series.items() for col in frame.columns}
+        nw_se = window_series_se(columns, {key: span[key[0]] for key in columns}, lags)
+
+    rows = []
+    for window, frame in series.items():
+        mean, std, t, n = series_stats(frame.to_numpy(), ddof)
+        for j, col in enumerate(frame.columns):
+            t_stat = mean[j] / nw_se[(window, col)] if se == 'newey_west' else t[j]
+            rows.append({'Portfolio': col, 'Period': window, 'Mean_Return': mean[j],
+                         'Std_Return': std[j], 't_stat': t_stat, 'N_obs': n[j]})
+    order = {col: i for i, col in enumerate(names + [s[0] for s in spreads])}
+    summary = pd.DataFrame(rows, columns=['Portfolio', 'Period', 'Mean_Return', 'Std_Return', 't_stat', 'N_obs'])
+    summary = summary.sort_values('Portfolio', key=lambda col: col.map(order), kind='stable').reset_index(drop=True)
+
+    return {'summary': summary, 'series': series, 'labels': labels, 'dates': dates, 'obs': obs,
+            'buckets': buckets}
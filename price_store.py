@@ -0,0 +1,163 @@
+"""
+Daily Price Store for "A Tale of Two Premiums" Paper Replication
+Parses every price file once (cached in process and on disk), aligns all daily
+prices on one calendar with first/last priced-day indices for event windows
+(see return_tensor.build_return_tensor)
+"""
+
+import pandas as pd
+import numpy as np
+import glob
+import os
+
+PRICE_DIR = 'data/prices'
+PRICE_CACHE_FILE = 'data/cache/prices.pkl'
+
+# {path: (stamp, daily, weekly)}; shared by data_preprocessing and table_replication
+_parsed = {}
+
+# ============================================================================
+# Parsing and caching
+# ============================================================================
+def price_file_ticker(path):
+    return os.path.basename(path).replace('_prices.csv', '')
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def read_price_file(path):
+    """
+    Parse one price file into daily Close prices
+
+    yfinance files carry a second header row with the symbol (",CL=F,CL=F,...");
+    it is skipped so Close can be read directly as float64.
+
+    Returns: DataFrame indexed by Date (sorted) with a float 'Close' column,
+             or None if the file has no Date / Close column
+    """
+    with open(path) as f:
+        header = f.readline().strip().split(',')
+        second = f.readline()
+    if 'Date' not in header or 'Close' not in header:
+        return None
+
+    skiprows = [1] if second.startswith(',') else None
+    df = pd.read_csv(path, usecols=['Date', 'Close'], skiprows=skiprows,
+                     dtype={'Date': str, 'Close': 'float64'}, float_precision='round_trip')
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce')
+    df = df.dropna(subset=['Date', 'Close'])
+    return df.sort_values('Date', kind='mergesort').set_index('Date')
+
+def weekly_close(daily):
+    """Last daily Close of each week, weeks ending Tuesday (COT positions are as of Tuesday close)"""
+    return daily.resample('W-TUE').last()
+
+def _load_disk_cache(cache_file):
+    if cache_file and os.path.exists(cache_file):
+        try:
+            return pd.read_pickle(cache_file)
+        except Exception:
+            return {}
+    return {}
+
+def load_price_frames(files=None, cache_file=PRICE_CACHE_FILE):
+    """
+    Daily and weekly prices of every file, parsing only files that are new or changed
+
+    Parsed files are kept in process (a second call costs nothing) and pickled
+    to cache_file, keyed by path and (mtime, size)
+
+    Parameters:
+    -----------
+    files : list of price file paths (default: all of PRICE_DIR)
+
+    Returns:
+    --------
+    frames : dict of {ticker: (daily, weekly)}
+    """
+    files = sorted(glob.glob(os.path.join(PRICE_DIR, '*_prices.csv'))) if files is None else files
+
+    stale = [f for f in files if f not in _parsed or _parsed[f][0] != _file_stamp(f)]
+    if stale:
+        disk = _load_disk_cache(cache_file)
+        parsed_any = False
+        for path in stale:
+            stamp = _file_stamp(path)
+            if path in disk and disk[path][0] == stamp:
+                _parsed[path] = disk[path]
+                continue
+            try:
+                daily = read_price_file(path)
+            except Exception as e:
+                print(f"  ⚠ Could not load {price_file_ticker(path)}: {str(e)[:50]}")
+                continue
+            weekly = weekly_close(daily) if daily is not None else None
+            _parsed[path] = (stamp, daily, weekly)
+            parsed_any = True
+
+        if parsed_any and cache_file:
+            disk.update({f: _parsed[f] for f in stale if f in _parsed})
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f'{cache_file}.tmp'
+            pd.to_pickle(disk, tmp_file)
+            os.replace(tmp_file, cache_file)
+
+    return {price_file_ticker(f): _parsed[f][1:] for f in files
+            if f in _parsed and _parsed[f][1] is not None}
+
+def load_daily_prices(files=None):
+    """dict of {ticker: daily DataFrame indexed by Date with a 'Close' column}"""
+    return {ticker: daily for ticker, (daily, weekly) in load_price_frames(files).items()}
+
+def load_weekly_prices(files=None):
+    """dict of {ticker: weekly (W-TUE) DataFrame with a 'Close' column}"""
+    return {ticker: weekly for ticker, (daily, weekly) in load_price_frames(files).items()}
+
+# ============================================================================
+# Price matrix and window returns
+# ============================================================================
+
+def build_price_matrix(daily_prices):
+    """
+    Align every commodity's daily Close on a common calendar
+
+    Parameters:
+    -----------
+    daily_prices : dict of {ticker: DataFrame indexed by Date with a 'Close' column}
+
+    Returns:
+    --------
+    store : dict with
+        - calendar: sorted datetime64[ns] array of all trading days
+        - tickers: list of tickers (column order)
+        - prices: (days × tickers) array of Close, NaN where a ticker has no price
+        - next_valid: (days+1 × tickers) index of the first priced day at or after each day
+        - prev_valid: (days+1 × tickers) index of the last priced day before each day (row 0 = none)
+    """
+    tickers = sorted(daily_prices)
+    dates = [pd.DatetimeIndex(daily_prices[t].index).values.astype('datetime64[ns]') for t in tickers]
+    calendar = np.unique(np.concatenate(dates)) if dates else np.array([], dtype='datetime64[ns]')
+
+    n_days = len(calendar)
+    prices = np.full((n_days, len(tickers)), np.nan)
+    for j, ticker in enumerate(tickers):
+        close = daily_prices[ticker]['Close'].to_numpy(dtype=float)
+        prices[np.searchsorted(calendar, dates[j]), j] = close
+
+    # Sentinels: n_days = "no price at or after", -1 = "no price at or before"
+    idx = np.arange(n_days)[:, None]
+    valid = ~np.isnan(prices)
+    next_valid = np.where(valid, idx, n_days)
+    next_valid = np.minimum.accumulate(next_valid[::-1], axis=0)[::-1]
+    next_valid = np.vstack([next_valid, np.full((1, len(tickers)), n_days)])
+    prev_valid = np.maximum.accumulate(np.where(valid, idx, -1), axis=0)
+    prev_valid = np.vstack([np.full((1, len(tickers)), -1), prev_valid])
+
+    return {
+        'calendar': calendar,
+        'tickers': tickers,
+        'prices': prices,
+        'next_valid': next_valid,
+        'prev_valid': prev_valid,
+    }
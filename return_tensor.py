@@ -0,0 +1,158 @@
+"""
+Event-Window Return Tensor for "A Tale of Two Premiums" Paper Replication
+(report date × ticker × event day) cumulative log prices, so that the return over
+any [start, end] day window around a report date is one subtraction
+"""
+
+import pandas as pd
+import numpy as np
+import os
+
+# Event days covered by default: Table V / VIII windows (-10 .. 56) and a 0-60 day profile
+FIRST_EVENT_DAY = -10
+LAST_EVENT_DAY = 60
+
+TENSOR_ARRAYS = ['cum_last', 'cum_first', 'n_priced']
+
+def build_return_tensor(store, report_dates, first_day=FIRST_EVENT_DAY, last_day=LAST_EVENT_DAY,
+                        dtype=np.float32, directory=None):
+    """
+    Cumulative log prices around every report date, for every ticker and event day
+
+    For event day h (calendar days after the report date), with one extra leading
+    day first_day - 1 so windows starting at first_day can be checked:
+    - cum_last: log price of the last priced day <= report_date + h
+    - cum_first: log price of the first priced day >= report_date + h
+    - n_priced: number of priced days <= report_date + h (prefix count)
+    Log prices are relative to the price at the report date, which keeps them
+    small enough for float32 storage.
+
+    Parameters:
+    -----------
+    store : price store from build_price_matrix
+    report_dates : array-like of report dates (duplicates are fine)
+    first_day, last_day : event-day range (inclusive)
+    dtype : float dtype of the log-price arrays (float32 to save memory, float64 for exact tables)
+    directory : optional directory; arrays are written there as .npy and returned memory-mapped
+
+    Returns:
+    --------
+    tensor : dict with dates, tickers, first_day, last_day and the
+             (dates × tickers × event days) arrays cum_last, cum_first, n_priced
+    """
+    calendar = store['calendar']
+    tickers = store['tickers']
+    dates = np.unique(pd.DatetimeIndex(report_dates).values.astype('datetime64[ns]'))
+
+    days = np.arange(first_day - 1, last_day + 1)
+    targets = dates[:, None] + days.astype('timedelta64[D]')[None, :]
+    at_or_before = np.searchsorted(calendar, targets, side='right')
+    at_or_after = np.searchsorted(calendar, targets, side='left')
+
+    # Trailing NaN row: the no-price sentinels (-1 and n_days) both land on it
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_prices = np.vstack([np.log(store['prices']), np.full((1, len(tickers)), np.nan)])
+    priced = np.vstack([np.zeros((1, len(tickers)), dtype=np.int32),
+                        np.cumsum(~np.isnan(store['prices']), axis=0, dtype=np.int32)])
+
+    cols = np.arange(len(tickers))
+    last_log = log_prices[store['prev_valid'][at_or_before], cols]
+    first_log = log_prices[store['next_valid'][at_or_after], cols]
+    n_priced = priced[at_or_before]
+
+    # Anchor: last price at or before the report date, else the first one after it
+    day0 = -(first_day - 1)
+    anchor = np.where(np.isnan(last_log[:, day0]), first_log[:, day0], last_log[:, day0])
+    anchor = np.where(np.isnan(anchor), 0.0, anchor)[:, None, :]
+
+    arrays = {
+        'cum_last': (last_log - anchor).astype(dtype),
+        'cum_first': (first_log - anchor).astype(dtype),
+        'n_priced': n_priced,
+    }
+    # (dates × event days × tickers) -> (dates × tickers × event days)
+    arrays = {name: np.ascontiguousarray(np.moveaxis(values, 2, 1)) for name, values in arrays.items()}
+
+    tensor = {'dates': dates, 'tickers': list(tickers), 'first_day': first_day, 'last_day': last_day}
+    if directory is None:
+        tensor.update(arrays)
+        return tensor
+
+    os.makedirs(directory, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), values)
+    np.savez(os.path.join(directory, 'meta.npz'), dates=dates, tickers=np.array(tickers),
+             days=np.array([first_day, last_day]))
+    return load_return_tensor(directory)
+
+def load_return_tensor(directory):
+    """Open a tensor written by build_return_tensor(directory=...) read-only, memory-mapped"""
+    with np.load(os.path.join(directory, 'meta.npz')) as meta:
+        tensor = {'dates': meta['dates'], 'tickers': list(meta['tickers']),
+                  'first_day': int(meta['days'][0]), 'last_day': int(meta['days'][1])}
+    for name in TENSOR_ARRAYS:
+        tensor[name] = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+    return tensor
+
+def _day_index(tensor, day):
+    if not tensor['first_day'] <= day <= tensor['last_day']:
+        raise ValueError(f"event day {day} outside the tensor's range "
+                         f"[{tensor['first_day']}, {tensor['last_day']}]")
+    return day - tensor['first_day'] + 1
+
+def tensor_window(tensor, start_day, end_day):
+    """
+    Returns over [report_date + start_day, report_date + end_day] for every (date, ticker)
+
+    First and last price inside the window (prefix sums of build_return_tensor),
+    at least 2 prices, (last - first) / first; NaN otherwise.
+
+    Returns: (dates × tickers) float64 array
+    """
+    k0 = _day_index(tensor, start_day)
+    k1 = _day_index(tensor, end_day)
+    n_prices = tensor['n_priced'][:, :, k1] - tensor['n_priced'][:, :, k0 - 1]
+    log_return = tensor['cum_last'][:, :, k1].astype(float) - tensor['cum_first'][:, :, k0]
+    return np.where(n_prices >= 2, np.expm1(log_return), np.nan)
+
+def event_profile(tensor, start_day=0, end_days=None):
+    """
+    Cumulative returns from start_day through each end day (default: every day to last_day)
+
+    Returns: (dates × tickers × end days) float64 array
+    """
+    if end_days is None:
+        end_days = range(start_day, tensor['last_day'] + 1)
+    k0 = _day_index(tensor, start_day)
+    k1 = np.array([_day_index(tensor, day) for day in end_days], dtype=int)
+    n_prices = tensor['n_priced'][:, :, k1] - tensor['n_priced'][:, :, k0 - 1, None]
+    log_return = tensor['cum_last'][:, :, k1].astype(float) - tensor['cum_first'][:, :, k0, None]
+    return np.where(n_prices >= 2, np.expm1(log_return), np.nan)
+
+def panel_window_returns(tensor, tickers, report_dates, periods):
+    """
+    Window returns for panel rows, looked up in a build_return_tensor tensor
+
+    Parameters:
+    -----------
+    tickers : array-like of tickers, one per row
+    report_dates : array-like of report dates, one per row
+    periods : list of (start_day, end_day) offsets relative to the report date
+
+    Returns:
+    --------
+    returns : (rows × periods) array, NaN for rows outside the tensor
+    """
+    row_dates = pd.DatetimeIndex(report_dates).values.astype('datetime64[ns]')
+    ticker_index = {t: j for j, t in enumerate(tensor['tickers'])}
+    col = np.array([ticker_index.get(t, -1) for t in tickers], dtype=int)
+
+    dates = tensor['dates']
+    row = np.searchsorted(dates, row_dates)
+    found = (col >= 0) & (row < len(dates))
+    found[found] &= dates[row[found]] == row_dates[found]
+
+    returns = np.full((len(col), len(periods)), np.nan)
+    for p, (start_day, end_day) in enumerate(periods):
+        returns[found, p] = tensor_window(tensor, start_day, end_day)[row[found], col[found]]
+    return returns
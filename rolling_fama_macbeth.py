@@ -0,0 +1,193 @@
+"""
+Rolling Fama-MacBeth for "A Tale of Two Premiums" Paper Replication
+Time-varying premia: per-date cross-sectional coefficients are solved once and
+cached; rolling and expanding means, standard errors and t-stats follow in O(T)
+from cumulative sums. A weekly update only solves the newly appended dates.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from scipy import stats
+import argparse
+import hashlib
+import os
+
+from fama_macbeth import cross_sectional_coefficients
+
+COEFF_CACHE_DIR = 'data/cache/fm_coefficients'
+
+# Trailing windows in years (None = expanding)
+ROLLING_WINDOWS = {'3y': 3, '5y': 5, 'expanding': None}
+MIN_MONTHS = 52
+
+# Cached dates re-solved on update: the last weeks' leads (Ret_Lead, Ret_Lead2)
+# only become available once later weeks are appended
+UPDATE_OVERLAP = 4
+
+# Hedger (Q_Comm) and hedging-pressure (HP) premia of Tables III and VI
+PREMIA_SPECS = [
+    ('R_t1_Q_Comm_Full', 'Ret_Lead', ['Q_Comm', 'Basis', 'S_v', 'Ret']),
+    ('R_t1_Q_NonComm_Full', 'Ret_Lead', ['Q_NonComm', 'Basis', 'S_v', 'Ret']),
+    ('R_t1_HP', 'Ret_Lead', ['HP', 'Basis', 'S_v', 'Ret']),
+    ('R_t1_HP_Smooth', 'Ret_Lead', ['HP_Smooth_52w', 'Basis', 'S_v', 'Ret']),
+]
+
+# ============================================================================
+# Coefficient cache
+# ============================================================================
+def coefficient_cache_file(name):
+    return os.path.join(COEFF_CACHE_DIR, f'{name}.pkl')
+
+def input_fingerprint(df, dependent_var, independent_vars, date_col, before):
+    """Hash of the specification's input rows dated before `before` (the cached, reused part)"""
+    cols = [c for c in [date_col, 'Ticker', dependent_var, *independent_vars] if c in df.columns]
+    rows = df.loc[df[date_col] < before, cols]
+    return hashlib.sha256(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes()).hexdigest()
+
+def update_coefficients(df, name, dependent_var, independent_vars, date_col='Report_Date',
+                        overlap=UPDATE_OVERLAP, full=False):
+    """
+    Per-date coefficients of one specification, solving only dates not in the cache
+
+    The last `overlap` cached dates are solved again, since appending weeks
+    fills in their leads; everything before them is reused only if its input
+    rows are unchanged (fingerprint stored with the cache), else all dates are solved.
+
+    Returns: (coefficients DataFrame, number of dates solved)
+    """
+    path = coefficient_cache_file(name)
+    columns = ['const'] + list(independent_vars)
+    cached = None if full or not os.path.exists(path) else pd.read_pickle(path)
+    if not isinstance(cached, dict) or list(cached['coefficients'].columns) != columns:
+        cached = None
+    elif len(cached['coefficients']) <= overlap:
+        cached = None
+    else:
+        refresh_from = cached['coefficients'].index[-overlap]
+        if input_fingerprint(df, dependent_var, independent_vars, date_col, refresh_from) != cached['fingerprint']:
+            print(f"  ⚠ {name}: input data changed, solving all dates")
+            cached = None
+
+    if cached is None:
+        coeffs = cross_sectional_coefficients(df, dependent_var, independent_vars, date_col)
+        solved = len(coeffs)
+    else:
+        new = cross_sectional_coefficients(df[df[date_col] >= refresh_from], dependent_var,
+                                           independent_vars, date_col)
+        old = cached['coefficients']
+        coeffs = pd.concat([old[old.index < refresh_from], new.reindex(columns=columns)])
+        solved = len(new)
+
+    # Fingerprint of the rows the next update will reuse
+    fingerprint = (input_fingerprint(df, dependent_var, independent_vars, date_col, coeffs.index[-overlap])
+                   if len(coeffs) > overlap else None)
+    os.makedirs(COEFF_CACHE_DIR, exist_ok=True)
+    pd.to_pickle({'coefficients': coeffs, 'fingerprint': fingerprint}, path)
+    return coeffs, solved
+
+# ============================================================================
+# Rolling statistics
+# ============================================================================
+def window_starts(dates, years=None):
+    """First row of each date's trailing window of `years` years (0 for expanding)"""
+    if years is None:
+        return np.zeros(len(dates), dtype=int)
+    dates = pd.DatetimeIndex(dates)
+    return np.searchsorted(dates.values, (dates - pd.DateOffset(years=years)).values, side='right')
+
+def rolling_fama_macbeth(coeffs_df, years=None, min_months=MIN_MONTHS):
+    """
+    Fama-MacBeth statistics over the trailing window ending at every date
+
+    Sums of the coefficients and their squares come from one cumulative sum,
+    so every window costs O(1). Values are centered on each column's first
+    observation (a prefix of the history), which keeps the sums well conditioned
+    and makes the result for a date independent of later dates.
+
+    Parameters:
+    -----------
+    coeffs_df : per-date coefficients (cross_sectional_coefficients output)
+    years : trailing window length in years (None = expanding)
+    min_months : minimum dates in a window
+
+    Returns:
+    --------
+    results : long DataFrame (Date, Variable, Coefficient, Std_Error, t_stat, N_months, p_value),
+              same statistics as summarize_fama_macbeth on each window
+    """
+    values = coeffs_df.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    first = valid.argmax(axis=0)
+    center = np.where(valid.any(axis=0), values[first, np.arange(values.shape[1])], 0.0)
+    x = np.where(valid, values - center, 0.0)
+
+    zero = np.zeros((1, values.shape[1]))
+    count = np.vstack([zero, np.cumsum(valid, axis=0)])
+    s1 = np.vstack([zero, np.cumsum(x, axis=0)])
+    s2 = np.vstack([zero, np.cumsum(x * x, axis=0)])
+
+    end = np.arange(1, len(values) + 1)
+    start = window_starts(coeffs_df.index, years)
+    n_months = (end - start)[:, None]
+    n = count[end] - count[start]
+    sum1 = s1[end] - s1[start]
+    sum2 = s2[end] - s2[start]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = center + sum1 / n
+        var = np.maximum(sum2 - sum1 * sum1 / n, 0.0) / (n - 1)
+        std_error = np.sqrt(var) / np.sqrt(n_months)
+        t_stat = mean / std_error
+    p_value = 2 * (1 - stats.t.cdf(np.abs(t_stat), n_months - 1))
+
+    shape = values.shape
+    results = pd.DataFrame({
+        'Date': np.repeat(coeffs_df.index.to_numpy(), shape[1]),
+        'Variable': np.tile(coeffs_df.columns.to_numpy(), shape[0]),
+        'Coefficient': mean.ravel(),
+        'Std_Error': std_error.ravel(),
+        't_stat': t_stat.ravel(),
+        'N_months': np.broadcast_to(n_months, shape).ravel(),
+        'p_value': p_value.ravel(),
+    })
+    return results[results['N_months'] >= min_months].reset_index(drop=True)
+
+def run_rolling_premia(df, specs=PREMIA_SPECS, windows=ROLLING_WINDOWS, min_months=MIN_MONTHS, full=False):
+    """
+    Rolling and expanding premia of every specification, using the coefficient cache
+
+    Returns: long DataFrame (Spec, Window, Date, Variable, ...), also saved to
+             output/tables/rolling_fama_macbeth.csv
+    """
+    print("\n" + "=" * 70)
+    print("ROLLING FAMA-MACBETH PREMIA")
+    print("=" * 70)
+
+    frames = []
+    for name, dep, indep in specs:
+        coeffs, solved = update_coefficients(df, name, dep, indep, full=full)
+        print(f"✓ {name:24} {solved} of {len(coeffs)} dates solved")
+        for window, years in windows.items():
+            frames.append(rolling_fama_macbeth(coeffs, years, min_months).assign(Spec=name, Window=window))
+
+    results = pd.concat(frames, ignore_index=True)
+    results = results[['Spec', 'Window', 'Date', 'Variable', 'Coefficient', 'Std_Error', 't_stat',
+                       'N_months', 'p_value']]
+    os.makedirs('output/tables', exist_ok=True)
+    results.to_csv('output/tables/rolling_fama_macbeth.csv', index=False)
+    print("\n✓ Rolling premia saved to output/tables/rolling_fama_macbeth.csv")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling and expanding Fama-MacBeth premia")
+    parser.add_argument('--full', action='store_true', help="ignore the coefficient cache and solve every date")
+    parser.add_argument('--min-months', type=int, default=MIN_MONTHS, help="minimum dates per window")
+    args = parser.parse_args()
+
+    from table_replication import load_all_processed_data, calculate_additional_variables
+
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    df = calculate_additional_variables(load_all_processed_data()).to_frame()
+    run_rolling_premia(df, min_months=args.min_months, full=args.full)
+    print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -0,0 +1,99 @@
+"""
+Rolling Regression Kernel for "A Tale of Two Premiums" Paper Replication
+Rolling univariate OLS (y = alpha + beta * x) from running sums, O(N) per series
+"""
+
+import pandas as pd
+import numpy as np
+
+from panel import Panel
+
+def _window_sum(values, window):
+    """Trailing sum over the last `window` rows (axis 0) via cumulative sums"""
+    csum = np.cumsum(values, axis=0)
+    out = csum.copy()
+    if len(values) > window:
+        out[window:] -= csum[:-window]
+    return out
+
+def rolling_univariate_regression(x, y, window=52, min_periods=26, ddof=1):
+    """
+    Rolling regression of y on x over the trailing `window` rows
+
+    Rows where x or y is NaN are skipped inside the window (NaN-aware window),
+    and a window needs at least `min_periods` valid pairs.
+
+    Parameters:
+    -----------
+    x, y : arrays of shape (time × series), or 1-D for a single series
+    window : number of rows in the trailing window (e.g. 52 weeks, 252 days)
+    min_periods : minimum valid (x, y) pairs in the window
+    ddof : degrees of freedom of the residual std (1 = np.std(residuals, ddof=1))
+
+    Returns:
+    --------
+    alpha, beta, resid_std : arrays with the same shape as y
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    squeeze = y.ndim == 1
+    if squeeze:
+        x, y = x[:, None], y[:, None]
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+
+    # Regression is shift-invariant; centring each series first keeps the
+    # running sums small and avoids cancellation on long histories
+    with np.errstate(invalid='ignore', divide='ignore'):
+        counts = valid.sum(axis=0)
+        x_shift = np.where(counts > 0, np.where(valid, x, 0).sum(axis=0) / counts, 0)
+        y_shift = np.where(counts > 0, np.where(valid, y, 0).sum(axis=0) / counts, 0)
+    xc = np.where(valid, x - x_shift, 0.0)
+    yc = np.where(valid, y - y_shift, 0.0)
+
+    n = _window_sum(valid.astype(float), window)
+    sx = _window_sum(xc, window)
+    sy = _window_sum(yc, window)
+    sxx = _window_sum(xc * xc, window)
+    sxy = _window_sum(xc * yc, window)
+    syy = _window_sum(yc * yc, window)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = sx / n
+        mean_y = sy / n
+        cov_xx = sxx - sx * mean_x
+        cov_xy = sxy - sx * mean_y
+        cov_yy = syy - sy * mean_y
+
+        beta = cov_xy / cov_xx
+        alpha = (mean_y + y_shift) - beta * (mean_x + x_shift)
+        ssr = np.maximum(cov_yy - beta * cov_xy, 0.0)
+        resid_std = np.sqrt(ssr / (n - ddof))
+
+    enough = n >= min_periods
+    alpha = np.where(enough, alpha, np.nan)
+    beta = np.where(enough, beta, np.nan)
+    resid_std = np.where(enough, resid_std, np.nan)
+
+    if squeeze:
+        return alpha[:, 0], beta[:, 0], resid_std[:, 0]
+    return alpha, beta, resid_std
+
+def ticker_positions(df, group_col='Ticker'):
+    """
+    Row position within each group and group code for every row of a long panel
+
+    `wide[pos, code]` lays each commodity's rows (in their existing order)
+    out as one column of a dense (position × commodity) array.
+    """
+    if isinstance(df, Panel):
+        return df.positions()
+    codes, groups = pd.factorize(df[group_col])
+    pos = df.groupby(codes).cumcount().to_numpy()
+    return pos, codes, groups
+
+def to_position_array(df, col, pos, codes, n_groups):
+    """Scatter one column of a long panel into a dense (position × group) array"""
+    wide = np.full((pos.max() + 1 if len(pos) else 0, n_groups), np.nan)
+    wide[pos, codes] = np.asarray(df[col], dtype=float)
+    return wide
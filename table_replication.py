@@ -5,29 +5,53 @@ Generates all tables according to the paper's methodology
 
 import pandas as pd
 import numpy as np
+import argparse
 import glob
+import sys
 import os
 from datetime import datetime
-import statsmodels.api as sm
-from scipy import stats
+from functools import partial
+from fama_macbeth import cross_sectional_coefficients_many, summarize_many
+from rolling_regression import rolling_univariate_regression, ticker_positions, to_position_array
+from panel_features import build_panel_features
+from price_store import build_price_matrix, load_price_frames, load_daily_prices as load_price_store_daily
+from return_tensor import build_return_tensor
+from table_runner import run_table_jobs
+from hac import SE_TYPES
+from portfolio_sorts import portfolio_sort
+from panel_cache import PANEL_FILE, read_processed_panel, write_processed_panel, to_panel_dtypes
+from panel import Panel, wide_panel
+from trader_kernel import DCOT_CATEGORIES, trader_columns, panel_trader_variables
+from futures_store import load_weekly_roll_series
+from instrumentation import instrumented, stage
+import instrumentation
 import warnings
 warnings.filterwarnings('ignore')
 
 # Create output directory
 os.makedirs('output/tables', exist_ok=True)
 
+@instrumented
 def load_all_processed_data():
-    """Load all processed commodity data into a single DataFrame"""
+    """Load all processed commodity data into one Panel (see panel.Panel)"""
     print("=" * 70)
     print("LOADING PROCESSED DATA")
     print("=" * 70)
     
+    # Columnar panel written by data_preprocessing.py (CSV only when it is missing)
+    combined = read_processed_panel()
+    if combined is not None:
+        print(f"✓ Loaded columnar panel {PANEL_FILE}")
+        panel = Panel(combined)
+        print(f"\n✓ Total: {len(panel):,} observations across {len(panel.tickers)} commodities")
+        return panel
+    
     all_data = []
     files = glob.glob('data/processed/*_processed.csv')
     
     for file in files:
         ticker = os.path.basename(file).replace('_processed.csv', '')
-        df = pd.read_csv(file)
+        df = pd.read_csv(file, dtype={'CFTC_Contract_Market_Code': str})
         
         # Handle different column name formats
         if 'Unnamed: 0' in df.columns:
@@ -43,161 +67,158 @@ def load_all_processed_data():
         all_data.append(df)
         print(f"✓ Loaded {ticker:5} - {len(df)} observations")
     
-    combined = pd.concat(all_data, ignore_index=True)
+    combined = to_panel_dtypes(pd.concat(all_data, ignore_index=True))
     print(f"\n✓ Total: {len(combined):,} observations across {len(files)} commodities")
     
-    return combined
+    # Cache the parsed panel so the next run skips CSV parsing
+    write_processed_panel(combined)
+    
+    return Panel(combined)
+
+# Daily macro series saved by data_acquisition.download_macro_data (yfinance layout)
+SPX_FILE = 'data/SPX_data.csv'
+VIX_FILE = 'data/VIX_data.csv'
 
+def read_macro_close(path):
+    """Daily Close of a saved macro file; the yfinance 'Ticker' / 'Date' header rows are skipped"""
+    df = pd.read_csv(path, index_col=0)
+    dates = pd.to_datetime(df.index, format='%Y-%m-%d', errors='coerce')
+    close = pd.to_numeric(df['Close'], errors='coerce')
+    close.index = dates
+    return close[dates.notna()].dropna().sort_index()
+
+def load_macro_close(path, ticker, download=True):
+    """
+    Daily Close of a macro series: the saved file, else (download=True) a yfinance
+    download that is saved to `path`, so later runs and the pipeline key read the same series
+
+    Returns: Series indexed by date, or None
+    """
+    if os.path.exists(path):
+        try:
+            return read_macro_close(path)
+        except Exception as e:
+            print(f"⚠ Could not read {path}: {str(e)[:50]}")
+            return None
+    if not download:
+        return None
+    try:
+        import yfinance as yf
+        print(f"\nDownloading {ticker} ({path} not found)...")
+        data = yf.download(ticker, start='1994-01-01', end='2017-12-31', progress=False)
+        if data.empty:
+            print(f"⚠ {ticker} data empty")
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data.to_csv(path)
+        return read_macro_close(path)
+    except Exception as e:
+        print(f"⚠ Could not download {ticker} data: {str(e)[:50]}")
+        return None
+
+@instrumented
 def calculate_additional_variables(df):
-    """Calculate additional variables needed for analysis"""
+    """Calculate additional variables needed for analysis (on the Panel; a DataFrame is converted)"""
     print("\n" + "=" * 70)
     print("CALCULATING ADDITIONAL VARIABLES")
     print("=" * 70)
     
-    # |Q| - Absolute value of net trading
-    df['abs_Q_Comm'] = df['Q_Comm'].abs()
-    df['abs_Q_NonComm'] = df['Q_NonComm'].abs()
-    print("✓ Calculated |Q| variables")
-    
-    # Calculate position changes for Table II
-    for ticker in df['Ticker'].unique():
-        mask = df['Ticker'] == ticker
-        # Delta positions (changes)
-        df.loc[mask, 'Delta_NetLong_Comm'] = df.loc[mask, 'NetLong_Comm'].diff()
-        df.loc[mask, 'Delta_NetLong_NonComm'] = df.loc[mask, 'NetLong_NonComm'].diff()
-        # Calculate non-reportable positions
-        df.loc[mask, 'NonReport_Long'] = df.loc[mask, 'Open_Interest_All'] - df.loc[mask, 'Comm_Positions_Long_All'] - df.loc[mask, 'NonComm_Positions_Long_All']
-        df.loc[mask, 'NonReport_Short'] = df.loc[mask, 'Open_Interest_All'] - df.loc[mask, 'Comm_Positions_Short_All'] - df.loc[mask, 'NonComm_Positions_Short_All']
-        df.loc[mask, 'NetLong_NonReport'] = df.loc[mask, 'NonReport_Long'] - df.loc[mask, 'NonReport_Short']
-        df.loc[mask, 'Delta_NetLong_NonReport'] = df.loc[mask, 'NetLong_NonReport'].diff()
-        # Lag Q for Table II
-        df.loc[mask, 'Q_Comm_lag1'] = df.loc[mask, 'Q_Comm'].shift(1)
-        df.loc[mask, 'Q_NonComm_lag1'] = df.loc[mask, 'Q_NonComm'].shift(1)
-    print("✓ Calculated position changes")
-    
-    # Return lags for momentum analysis
-    for ticker in df['Ticker'].unique():
-        mask = df['Ticker'] == ticker
-        df.loc[mask, 'Ret_lag1'] = df.loc[mask, 'Ret'].shift(1)
-        df.loc[mask, 'Ret_lag2'] = df.loc[mask, 'Ret'].shift(2)
-        df.loc[mask, 'Ret_Lead2'] = df.loc[mask, 'Ret'].shift(-2)
-    print("✓ Calculated lagged returns")
-    
-    # Helper function for linear regression
-    def simple_linear_regression(X, y):
-        """Simple linear regression: y = alpha + beta * X + residuals"""
-        X_mean = np.mean(X)
-        y_mean = np.mean(y)
-        beta = np.sum((X - X_mean) * (y - y_mean)) / np.sum((X - X_mean)**2)
-        alpha = y_mean - beta * X_mean
-        y_pred = alpha + beta * X
-        residuals = y - y_pred
-        return alpha, beta, residuals
+    if not isinstance(df, Panel):
+        df = Panel(df)
     
     # Load S&P 500 returns first (needed for v_t calculation)
     spx_ret_series = None
-    try:
-        import yfinance as yf
-        print("\nDownloading S&P 500 data for v_t calculation...")
-        spx = yf.download('^GSPC', start='2000-01-01', end='2018-12-31', progress=False)
-        if not spx.empty:
-            spx_weekly = spx['Close'].resample('W-TUE').last()
-            spx_ret = spx_weekly.pct_change()
-            spx_ret_series = spx_ret
-            print("✓ S&P 500 returns downloaded")
-        else:
-            print("⚠ S&P 500 data empty")
-    except Exception as e:
-        print(f"⚠ Could not download SPX data: {str(e)[:50]}")
+    with stage('spx_returns'):
+        spx = load_macro_close(SPX_FILE, '^GSPC')
+    if spx is not None:
+        spx_weekly = spx.resample('W-TUE').last()
+        spx_ret_series = spx_weekly.pct_change()
+        print(f"✓ S&P 500 returns ({SPX_FILE})")
     
     # Calculate v_t: annualized std of residuals from regression on S&P 500
     # Paper definition: "annualized standard deviation of the residuals from a 
     # regression of commodity futures returns on S&P500 returns (52-week rolling window)"
     print("\nCalculating v_t (idiosyncratic volatility)...")
     
-    for ticker in df['Ticker'].unique():
-        mask = df['Ticker'] == ticker
-        ticker_data = df.loc[mask].copy()
-        
+    with stage('v_t_regression', rows_in=len(df)):
         if spx_ret_series is not None:
             # Merge S&P 500 returns with commodity returns
-            ticker_data = ticker_data.set_index('Report_Date')
-            ticker_data['SPX_Ret'] = spx_ret_series
-            ticker_data = ticker_data.reset_index()
-            
-            # Filter rows with valid returns
-            valid_mask = ticker_data['Ret'].notna() & ticker_data['SPX_Ret'].notna()
-            
-            # Calculate rolling regression residuals
-            v_t_values = []
-            
-            for i in range(len(ticker_data)):
-                if not valid_mask.iloc[i]:
-                    v_t_values.append(np.nan)
-                elif i < 25:  # Need at least 26 weeks
-                    v_t_values.append(np.nan)
-                else:
-                    # Get 52-week window (or available data)
-                    window_start = max(0, i - 51)
-                    window_data = ticker_data.iloc[window_start:i+1]
-                    window_data = window_data[window_data['Ret'].notna() & window_data['SPX_Ret'].notna()]
-                    
-                    if len(window_data) >= 26:  # Minimum 26 weeks
-                        # Run regression: Ret_commodity = alpha + beta * Ret_SPX + residual
-                        X = window_data['SPX_Ret'].values
-                        y = window_data['Ret'].values
-                        
-                        alpha, beta, residuals = simple_linear_regression(X, y)
-                        
-                        # Annualized standard deviation of residuals
-                        # Weekly std * sqrt(52) to annualize
-                        v_t = np.std(residuals, ddof=1) * np.sqrt(52)
-                        v_t_values.append(v_t)
-                    else:
-                        v_t_values.append(np.nan)
-            
-            ticker_data['v_t'] = v_t_values
-            
-            # Merge back to main dataframe by index
-            df.loc[mask, 'v_t'] = ticker_data['v_t'].values
-            df.loc[mask, 'SPX_Ret'] = ticker_data['SPX_Ret'].values
+            df['SPX_Ret'] = spx_ret_series.reindex(df['Report_Date']).values
+        
+            # Lay every commodity's rows out as one column of a (week × ticker) array
+            pos, codes, tickers = ticker_positions(df)
+            ret = to_position_array(df, 'Ret', pos, codes, len(tickers))
+            spx = to_position_array(df, 'SPX_Ret', pos, codes, len(tickers))
+        
+            # Rolling regression: Ret_commodity = alpha + beta * Ret_SPX + residual
+            # 52-week window, minimum 26 valid weeks, all tickers at once
+            alpha, beta, resid_std = rolling_univariate_regression(spx, ret, window=52, min_periods=26)
+        
+            # Annualized standard deviation of residuals
+            # Weekly std * sqrt(52) to annualize
+            v_t = resid_std * np.sqrt(52)
+            v_t[np.isnan(ret) | np.isnan(spx)] = np.nan
+            df['v_t'] = v_t[pos, codes]
         else:
             # Fallback: use simple historical volatility if S&P 500 not available
-            print(f"  ⚠ {ticker}: Using simple volatility (S&P 500 not available)")
-            df.loc[mask, 'v_t'] = df.loc[mask, 'Ret'].rolling(52, min_periods=26).std() * np.sqrt(52)
+            print("  ⚠ Using simple volatility (S&P 500 not available)")
+            pos, codes, tickers = ticker_positions(df)
+            ret = pd.DataFrame(to_position_array(df, 'Ret', pos, codes, len(tickers)))
+            df['v_t'] = ret.rolling(52, min_periods=26).std().to_numpy()[pos, codes] * np.sqrt(52)
     
     print("✓ Calculated v_t (idiosyncratic volatility)")
     
-    # Calculate Basis and S*v_t for Table III
-    for ticker in df['Ticker'].unique():
-        mask = df['Ticker'] == ticker
-        # Basis: simplified as return autocorrelation proxy (since we don't have multiple contract maturities)
-        basis_raw = df.loc[mask, 'Ret'].rolling(4, min_periods=2).mean()
-        # Apply log transformation to basis (handling negative values)
-        df.loc[mask, 'Basis'] = np.log(basis_raw + 1)
-        # S: sign variable for noncommercial net position
-        df.loc[mask, 'S'] = np.where(df.loc[mask, 'NetLong_NonComm'] > 0, 1, -1)
-        # S*v: signed idiosyncratic volatility
-        df.loc[mask, 'S_v'] = df.loc[mask, 'S'] * df.loc[mask, 'v_t']
+    # Position changes, non-reportables (OI minus reported) and lagged Q of every
+    # trader category in one kernel pass; variables already in the panel are kept
+    with stage('trader_kernel', rows_in=len(df)):
+        trader = panel_trader_variables(df, lags=(1,))
+        for col in trader.columns:
+            if col not in df:
+                df[col] = trader[col].to_numpy()
+    print("✓ Calculated position changes")
+    
+    # |Q|, lagged returns, Basis and S*v_t for Tables I-III
+    # (declared once in panel_features.PANEL_FEATURES, derived columns computed when first read)
+    with stage('panel_features', rows_in=len(df)):
+        df = build_panel_features(df)
+    print("✓ Calculated |Q| variables")
+    print("✓ Calculated lagged returns")
     print("✓ Calculated Basis and S*v_t")
     
+    # True basis and front/second-month returns where contract-level prices exist
+    # (data/contracts/, see futures_store); other commodities keep the return proxy
+    with stage('futures_roll'):
+        roll = load_weekly_roll_series()
+    if roll is not None:
+        roll['Report_Date'] = roll['Report_Date'].astype(df['Report_Date'].dtype)
+        keys = pd.DataFrame({'Report_Date': df['Report_Date'], 'Ticker': df['Ticker']})
+        merged = keys.merge(roll, on=['Report_Date', 'Ticker'], how='left')
+        df['Front_Ret'] = merged['Front_Ret'].to_numpy()
+        df['Second_Ret'] = merged['Second_Ret'].to_numpy()
+        has_contracts = np.isin(df['Ticker'], roll['Ticker'].unique())
+        df['Basis'] = np.where(has_contracts, merged['Basis'].to_numpy(), df['Basis'])
+        print(f"✓ Basis from contract prices for {len(np.unique(df['Ticker'][has_contracts]))} commodities")
+    else:
+        print("  ⚠ No contract files: Basis uses the return proxy")
+    
     # Load VIX
-    if os.path.exists('data/VIX_data.csv'):
-        try:
-            vix = pd.read_csv('data/VIX_data.csv', index_col=0, parse_dates=True)
-            vix_weekly = vix['Close'].resample('W-TUE').last()
-            
-            # Merge with commodity data
-            df['VIX'] = df['Report_Date'].map(vix_weekly.to_dict())
-            print("✓ Added VIX data")
-        except Exception as e:
-            print(f"⚠ Could not load VIX data: {str(e)[:50]}")
+    vix = load_macro_close(VIX_FILE, '^VIX', download=False)
+    if vix is not None:
+        vix_weekly = vix.resample('W-TUE').last()
+        
+        # Merge with commodity data
+        df['VIX'] = pd.Series(df['Report_Date']).map(vix_weekly.to_dict()).to_numpy()
+        print("✓ Added VIX data")
+    
+    # The pipeline does not cache variables computed without the S&P 500 (see pipeline.run_tables)
+    df.attrs['v_t_fallback'] = spx_ret_series is None
     
     return df
 
 # ============================================================================
 # TABLE I: Summary Statistics
 # ============================================================================
+@instrumented
 def table_I_summary_statistics(df):
     """Generate Table I: Summary Statistics
     Panel A: Excess Return (Mean, Std), HP (Mean, Std, Prob(HP>0))
@@ -207,36 +228,25 @@ def table_I_summary_statistics(df):
     print("TABLE I: SUMMARY STATISTICS")
     print("=" * 70)
     
-    results = []
+    # One (week × ticker) array per variable; every statistic is a column-wise reduction
+    dates, tickers, wide, obs = wide_panel(
+        df, ['Ret', 'HP', 'abs_Q_Comm', 'abs_Q_NonComm', 'PT_Comm', 'PT_NonComm'])
+    n_rows = obs.sum(axis=0)
     
-    for ticker in sorted(df['Ticker'].unique()):
-        ticker_data = df[df['Ticker'] == ticker].copy()
-        
+    results = {
+        'Ticker': list(tickers),
         # Panel A: Excess Returns and HP (5 columns as specified)
-        ret_mean = ticker_data['Ret'].mean() * 52  # Annualize: weekly return * 52 weeks
-        ret_std = ticker_data['Ret'].std() * np.sqrt(52)  # Annualized std
-        hp_mean = ticker_data['HP'].mean()
-        hp_std = ticker_data['HP'].std()
-        prob_hp_pos = (ticker_data['HP'] > 0).mean()
-        
+        'Excess_Ret_Mean': np.nanmean(wide['Ret'], axis=0) * 52,  # Annualize: weekly return * 52 weeks
+        'Excess_Ret_Std': np.nanstd(wide['Ret'], axis=0, ddof=1) * np.sqrt(52),  # Annualized std
+        'HP_Mean': np.nanmean(wide['HP'], axis=0),
+        'HP_Std': np.nanstd(wide['HP'], axis=0, ddof=1),
+        'Prob_HP_Pos': (wide['HP'] > 0).sum(axis=0) / n_rows,
         # Panel B: |Q| and PT (4 columns as specified)
-        abs_q_comm = ticker_data['abs_Q_Comm'].mean()
-        abs_q_noncomm = ticker_data['abs_Q_NonComm'].mean()
-        pt_comm = ticker_data['PT_Comm'].mean()
-        pt_noncomm = ticker_data['PT_NonComm'].mean()
-        
-        results.append({
-            'Ticker': ticker,
-            'Excess_Ret_Mean': ret_mean,
-            'Excess_Ret_Std': ret_std,
-            'HP_Mean': hp_mean,
-            'HP_Std': hp_std,
-            'Prob_HP_Pos': prob_hp_pos,
-            '|Q_Comm|_Mean': abs_q_comm,
-            '|Q_NonComm|_Mean': abs_q_noncomm,
-            'PT_Comm_Mean': pt_comm,
-            'PT_NonComm_Mean': pt_noncomm
-        })
+        '|Q_Comm|_Mean': np.nanmean(wide['abs_Q_Comm'], axis=0),
+        '|Q_NonComm|_Mean': np.nanmean(wide['abs_Q_NonComm'], axis=0),
+        'PT_Comm_Mean': np.nanmean(wide['PT_Comm'], axis=0),
+        'PT_NonComm_Mean': np.nanmean(wide['PT_NonComm'], axis=0),
+    }
     
     table = pd.DataFrame(results)
     
@@ -271,58 +281,38 @@ def table_I_summary_statistics(df):
 # ============================================================================
 # Fama-MacBeth Regression Function
 # ============================================================================
-def fama_macbeth_regression(df, dependent_var, independent_vars, date_col='Report_Date'):
+def fama_macbeth_regression(df, dependent_var, independent_vars, date_col='Report_Date', se='iid', lags=None):
     """
     Perform Fama-MacBeth cross-sectional regression
+    All cross-sections are solved in one batched solve (see fama_macbeth.py)
+    
+    se : 'iid' (std / sqrt(T)) or 'newey_west' (HAC, `lags` lags; default rule of thumb)
     
     Returns: DataFrame with coefficients, t-stats, and p-values
     """
-    # Prepare data
-    df_clean = df[[date_col, 'Ticker', dependent_var] + independent_vars].dropna()
-    
-    # Get unique dates
-    dates = sorted(df_clean[date_col].unique())
-    
-    coeffs_list = []
-    
-    for date in dates:
-        # Cross-sectional slice
-        slice_df = df_clean[df_clean[date_col] == date]
-        
-        # Need at least 10 commodities
-        if len(slice_df) < 10:
-            continue
-        
-        y = slice_df[dependent_var]
-        X = slice_df[independent_vars]
-        X = sm.add_constant(X)
-        
-        try:
-            model = sm.OLS(y, X).fit()
-            coeffs_list.append(model.params)
-        except:
-            continue
-    
-    # Convert to DataFrame
-    coeffs_df = pd.DataFrame(coeffs_list)
+    return fama_macbeth_regressions(df, {'reg': (dependent_var, independent_vars)}, date_col, se, lags)['reg']
+
+@instrumented(name='fama_macbeth')
+def fama_macbeth_regressions(df, specs, date_col='Report_Date', se='iid', lags=None):
+    """
+    Perform several Fama-MacBeth regressions on the same panel
+    The panel is laid out as (dates × tickers) arrays once for all of them, and
+    Newey-West standard errors of all their coefficient series are computed in one batch
     
-    # Calculate means and t-statistics
-    results = pd.DataFrame({
-        'Variable': coeffs_df.columns,
-        'Coefficient': coeffs_df.mean(),
-        'Std_Error': coeffs_df.std() / np.sqrt(len(coeffs_df)),
-        't_stat': coeffs_df.mean() / (coeffs_df.std() / np.sqrt(len(coeffs_df))),
-        'N_months': len(coeffs_df)
-    })
+    specs : dict of {name: (dependent_var, independent_vars)}
     
-    results['p_value'] = 2 * (1 - stats.t.cdf(np.abs(results['t_stat']), len(coeffs_df) - 1))
+    Returns: dict of {name: DataFrame with coefficients, t-stats, and p-values}
+    """
+    shared = cross_sectional_coefficients_many(df, [(dep, tuple(indep)) for dep, indep in specs.values()], date_col)
+    coeffs = {name: shared[(dep, tuple(indep))] for name, (dep, indep) in specs.items()}
     
-    return results
+    return summarize_many(coeffs, se, lags)
 
 # ============================================================================
 # TABLE II: Weekly Position Changes and Returns
 # ============================================================================
-def table_II_position_changes_returns(df):
+@instrumented
+def table_II_position_changes_returns(df, se='iid', lags=None):
     """Generate Table II: Weekly Position Changes and Returns
     Cross-sectional regressions with position changes as dependent variable
     - Regression 1-2: Commercial traders
@@ -333,41 +323,51 @@ def table_II_position_changes_returns(df):
     print("TABLE II: WEEKLY POSITION CHANGES AND RETURNS")
     print("=" * 70)
     
+    # All six regressions in one batch (one Newey-West call for every coefficient series)
+    fm = fama_macbeth_regressions(df, {
+        'Reg1_Comm_Ret': ('Q_Comm', ['Ret']),
+        'Reg2_Comm_Lag': ('Q_Comm', ['Ret_lag1', 'Q_Comm_lag1']),
+        'Reg3_NonComm_Ret': ('Q_NonComm', ['Ret']),
+        'Reg4_NonComm_Lag': ('Q_NonComm', ['Ret_lag1', 'Q_NonComm_lag1']),
+        'Reg5_NonReport_Ret': ('Delta_NetLong_NonReport', ['Ret']),
+        'Reg6_NonReport_Lag': ('Delta_NetLong_NonReport', ['Ret_lag1']),
+    }, se=se, lags=lags)
+    
     results = {}
     
     # Regression 1: Q_Comm on Ret (contemporaneous)
     print("\nRegression 1: Q_Commercial ~ Ret_t")
-    res1 = fama_macbeth_regression(df, 'Q_Comm', ['Ret'])
+    res1 = fm['Reg1_Comm_Ret']
     print(res1.to_string(index=False))
     results['Reg1_Comm_Ret'] = res1
     
     # Regression 2: Q_Comm on Ret_lag1 + Q_lag1
     print("\nRegression 2: Q_Commercial ~ Ret_{t-1} + Q_{t-1}")
-    res2 = fama_macbeth_regression(df, 'Q_Comm', ['Ret_lag1', 'Q_Comm_lag1'])
+    res2 = fm['Reg2_Comm_Lag']
     print(res2.to_string(index=False))
     results['Reg2_Comm_Lag'] = res2
     
     # Regression 3: Q_NonComm on Ret (contemporaneous)
     print("\nRegression 3: Q_NonCommercial ~ Ret_t")
-    res3 = fama_macbeth_regression(df, 'Q_NonComm', ['Ret'])
+    res3 = fm['Reg3_NonComm_Ret']
     print(res3.to_string(index=False))
     results['Reg3_NonComm_Ret'] = res3
     
     # Regression 4: Q_NonComm on Ret_lag1 + Q_lag1
     print("\nRegression 4: Q_NonCommercial ~ Ret_{t-1} + Q_{t-1}")
-    res4 = fama_macbeth_regression(df, 'Q_NonComm', ['Ret_lag1', 'Q_NonComm_lag1'])
+    res4 = fm['Reg4_NonComm_Lag']
     print(res4.to_string(index=False))
     results['Reg4_NonComm_Lag'] = res4
     
     # Regression 5: Delta_NonReport on Ret (contemporaneous)
     print("\nRegression 5: Delta_NonReportable ~ Ret_t")
-    res5 = fama_macbeth_regression(df, 'Delta_NetLong_NonReport', ['Ret'])
+    res5 = fm['Reg5_NonReport_Ret']
     print(res5.to_string(index=False))
     results['Reg5_NonReport_Ret'] = res5
     
     # Regression 6: Delta_NonReport on Ret_lag1 (simplified, no Q for non-reportable)
     print("\nRegression 6: Delta_NonReportable ~ Ret_{t-1}")
-    res6 = fama_macbeth_regression(df, 'Delta_NetLong_NonReport', ['Ret_lag1'])
+    res6 = fm['Reg6_NonReport_Lag']
     print(res6.to_string(index=False))
     results['Reg6_NonReport_Lag'] = res6
     
@@ -383,7 +383,8 @@ def table_II_position_changes_returns(df):
 # ============================================================================
 # TABLE III: Return Predictability
 # ============================================================================
-def table_III_return_predictability(df):
+@instrumented
+def table_III_return_predictability(df, se='iid', lags=None):
     """Generate Table III: Return Predictability (Main Result)
     Equation (5): R_{t+j} = b0 + b1*Q_t + b2*Basis_t + b3*S*v_t + b4*R_t + error
     For j=1,2 and for each trader type (Commercial, NonCommercial)
@@ -392,6 +393,16 @@ def table_III_return_predictability(df):
     print("TABLE III: RETURN PREDICTABILITY")
     print("=" * 70)
     
+    # All six regressions in one batch (one Newey-West call for every coefficient series)
+    fm = fama_macbeth_regressions(df, {
+        'R_t1_Q_Comm': ('Ret_Lead', ['Q_Comm']),
+        'R_t1_Q_Comm_Full': ('Ret_Lead', ['Q_Comm', 'Basis', 'S_v', 'Ret']),
+        'R_t1_Q_NonComm': ('Ret_Lead', ['Q_NonComm']),
+        'R_t1_Q_NonComm_Full': ('Ret_Lead', ['Q_NonComm', 'Basis', 'S_v', 'Ret']),
+        'R_t2_Q_Comm_Full': ('Ret_Lead2', ['Q_Comm', 'Basis', 'S_v', 'Ret']),
+        'R_t2_Q_NonComm_Full': ('Ret_Lead2', ['Q_NonComm', 'Basis', 'S_v', 'Ret']),
+    }, se=se, lags=lags)
+    
     results = {}
     
     # For j=1 (one week ahead)
@@ -399,25 +410,25 @@ def table_III_return_predictability(df):
     
     # Model 1: Commercial Q only
     print("\nModel 1a: R_{t+1} ~ Q_Comm")
-    res1a = fama_macbeth_regression(df, 'Ret_Lead', ['Q_Comm'])
+    res1a = fm['R_t1_Q_Comm']
     print(res1a.to_string(index=False))
     results['R_t1_Q_Comm'] = res1a
     
     # Model 2: Commercial Q with controls (Equation 5, with Basis)
     print("\nModel 1b: R_{t+1} ~ Q_Comm + Basis + S*v + Ret")
-    res1b = fama_macbeth_regression(df, 'Ret_Lead', ['Q_Comm', 'Basis', 'S_v', 'Ret'])
+    res1b = fm['R_t1_Q_Comm_Full']
     print(res1b.to_string(index=False))
     results['R_t1_Q_Comm_Full'] = res1b
     
     # Model 3: NonCommercial Q only
     print("\nModel 2a: R_{t+1} ~ Q_NonComm")
-    res2a = fama_macbeth_regression(df, 'Ret_Lead', ['Q_NonComm'])
+    res2a = fm['R_t1_Q_NonComm']
     print(res2a.to_string(index=False))
     results['R_t1_Q_NonComm'] = res2a
     
     # Model 4: NonCommercial Q with controls (Equation 5, with Basis)
     print("\nModel 2b: R_{t+1} ~ Q_NonComm + Basis + S*v + Ret")
-    res2b = fama_macbeth_regression(df, 'Ret_Lead', ['Q_NonComm', 'Basis', 'S_v', 'Ret'])
+    res2b = fm['R_t1_Q_NonComm_Full']
     print(res2b.to_string(index=False))
     results['R_t1_Q_NonComm_Full'] = res2b
     
@@ -426,13 +437,13 @@ def table_III_return_predictability(df):
     
     # Model 5: Commercial Q with controls for R_{t+2} (with Basis)
     print("\nModel 3: R_{t+2} ~ Q_Comm + Basis + S*v + Ret")
-    res3 = fama_macbeth_regression(df, 'Ret_Lead2', ['Q_Comm', 'Basis', 'S_v', 'Ret'])
+    res3 = fm['R_t2_Q_Comm_Full']
     print(res3.to_string(index=False))
     results['R_t2_Q_Comm_Full'] = res3
     
     # Model 6: NonCommercial Q with controls for R_{t+2} (with Basis)
     print("\nModel 4: R_{t+2} ~ Q_NonComm + Basis + S*v + Ret")
-    res4 = fama_macbeth_regression(df, 'Ret_Lead2', ['Q_NonComm', 'Basis', 'S_v', 'Ret'])
+    res4 = fm['R_t2_Q_NonComm_Full']
     print(res4.to_string(index=False))
     results['R_t2_Q_NonComm_Full'] = res4
     
@@ -446,55 +457,98 @@ def table_III_return_predictability(df):
     return results
 
 # ============================================================================
-# Helper function to load daily prices
+# TABLE IV: DCOT Data Analysis
 # ============================================================================
-def load_daily_prices():
-    """Load all daily price data for calculating daily returns"""
-    print("\nLoading daily price data...")
-    all_daily_data = {}
-    
-    files = glob.glob('data/prices/*_prices.csv')
-    for file in files:
-        ticker = os.path.basename(file).replace('_prices.csv', '')
-        try:
-            df_price = pd.read_csv(file)
-            # Skip header rows with ticker symbols
-            df_price = df_price[df_price['Date'].notna() & (df_price['Date'] != '')]
-            df_price['Date'] = pd.to_datetime(df_price['Date'])
-            df_price = df_price.sort_values('Date')
-            df_price['Close'] = pd.to_numeric(df_price['Close'], errors='coerce')
-            df_price = df_price[df_price['Close'].notna()]
-            all_daily_data[ticker] = df_price[['Date', 'Close']].set_index('Date')
-        except Exception as e:
-            print(f"  ⚠ Could not load {ticker}: {str(e)[:50]}")
-    
-    print(f"✓ Loaded daily prices for {len(all_daily_data)} commodities")
-    return all_daily_data
+def dcot_categories(df, categories=DCOT_CATEGORIES):
+    """Disaggregated trader categories with positions in the panel"""
+    return [c for c in categories
+            if trader_columns(c)['Q'] in df.columns and pd.notna(df[trader_columns(c)['Q']]).any()]
+
+def print_and_save(fm, labels, path):
+    """Print each regression under its label and save all of them as sheets of one workbook"""
+    for name, label in labels.items():
+        print(f"\n{label}")
+        print(fm[name].to_string(index=False))
+    with pd.ExcelWriter(path) as writer:
+        for name in labels:
+            fm[name].to_excel(writer, sheet_name=name, index=False)
+    return {name: fm[name] for name in labels}
 
-def calculate_cumulative_returns(daily_prices, ticker, start_date, end_date):
-    """Calculate cumulative return from start_date to end_date for a ticker"""
-    if ticker not in daily_prices:
-        return np.nan
+@instrumented
+def table_IV_dcot_analysis(df, se='iid', lags=None):
+    """Generate Table IV: Weekly Position Changes and Returns by DCOT trader category
+    Table II regressions for producers/merchants, swap dealers and managed money:
+    1) Q_c = b0 + b1*R_t
+    2) Q_c = b0 + b1*R_{t-1} + b2*Q_c,{t-1}
+    """
+    print("\n" + "=" * 70)
+    print("TABLE IV: POSITION CHANGES BY DCOT TRADER CATEGORY")
+    print("=" * 70)
+    
+    categories = dcot_categories(df)
+    if not categories:
+        print("⚠ No disaggregated (DCOT) positions in the panel - rerun data_preprocessing.py with DCOT data")
+        return None
     
-    price_data = daily_prices[ticker]
+    q_cols = [trader_columns(c)['Q'] for c in categories]
     
-    # Get prices within date range
-    mask = (price_data.index >= start_date) & (price_data.index <= end_date)
-    prices = price_data.loc[mask, 'Close']
+    # Every category in one batch (one Newey-West call for every coefficient series)
+    specs, labels = {}, {}
+    for category, q in zip(categories, q_cols):
+        specs[f'{category}_Ret'] = (q, ['Ret'])
+        specs[f'{category}_Lag'] = (q, ['Ret_lag1', f'{q}_lag1'])
+        labels[f'{category}_Ret'] = f"{q} ~ Ret_t"
+        labels[f'{category}_Lag'] = f"{q} ~ Ret_{{t-1}} + {q}_{{t-1}}"
+    fm = fama_macbeth_regressions(df, specs, se=se, lags=lags)
     
-    if len(prices) < 2:
-        return np.nan
+    results = print_and_save(fm, labels, 'output/tables/table_IV_dcot_position_changes.xlsx')
+    print("\n✓ Table IV saved to output/tables/table_IV_dcot_position_changes.xlsx")
     
-    # Cumulative return: (end_price - start_price) / start_price
-    cum_ret = (prices.iloc[-1] - prices.iloc[0]) / prices.iloc[0]
-    return cum_ret
+    return results
+
+# ============================================================================
+# Helper function to load daily prices
+# ============================================================================
+@instrumented
+def load_daily_prices():
+    """Load all daily price data for calculating daily returns (parsed once, see price_store.py)"""
+    print("\nLoading daily price data...")
+    all_daily_data = load_price_store_daily()
+    print(f"✓ Loaded daily prices for {len(all_daily_data)} commodities")
+    return all_daily_data
 
 # ============================================================================
 # TABLE V: Portfolio Sorts
 # ============================================================================
-def table_V_portfolio_sorts(df):
+# Event windows as (name, start_day, end_day) relative to the report date
+TABLE_V_PERIODS = [
+    ('-10to0', -10, 0),
+    ('1to4', 1, 4),
+    ('5to10', 5, 10),
+    ('11to20', 11, 20),
+    ('21to40', 21, 40),
+    ('1to40', 1, 40)
+]
+
+# Table VIII adds week ranges (in days), with the unit for each window
+TABLE_VIII_PERIODS = [
+    ('-10to0', -10, 0, 'days'),
+    ('1to4', 1, 4, 'days'),
+    ('5to10', 5, 10, 'days'),
+    ('11to20', 11, 20, 'days'),
+    ('21to40', 21, 40, 'days'),
+    ('1to40', 1, 40, 'days'),
+    ('week1', 1, 7, 'days'),      # Week 1 = 1-7 days
+    ('week2to4', 8, 28, 'days'),  # Week 2-4 = 8-28 days
+    ('week5to8', 29, 56, 'days'), # Week 5-8 = 29-56 days
+    ('week1to8', 1, 56, 'days')   # Week 1-8 = 1-56 days
+]
+
+@instrumented
+def table_V_portfolio_sorts(df, se='iid', lags=None):
     """Generate Table V: Portfolio Sorts based on Q_Comm
     Calculate returns over day ranges: [-10,0], [1,4], [5,10], [11,20], [21,40], [1,40]
+    se='newey_west': HAC t-stats for the overlapping windows (lags default: window overlap in weeks)
     """
     print("\n" + "=" * 70)
     print("TABLE V: PORTFOLIO SORTS (DAILY RETURNS)")
@@ -504,94 +558,33 @@ def table_V_portfolio_sorts(df):
     daily_prices = load_daily_prices()
     
     # Define periods as (start_day, end_day) relative to report date
-    periods = [
-        ('-10to0', -10, 0),
-        ('1to4', 1, 4),
-        ('5to10', 5, 10),
-        ('11to20', 11, 20),
-        ('21to40', 21, 40),
-        ('1to40', 1, 40)
-    ]
-    
-    # Get unique dates
-    dates = sorted(df['Report_Date'].unique())
-    
-    # Store results for each period
-    results_dict = {period[0]: [] for period in periods}
-    
-    for date in dates:
-        # Get current cross-section
-        current = df[df['Report_Date'] == date].copy()
-        
-        if len(current) < 10:
-            continue
-        
-        # Sort into quintiles based on Q_Comm
-        try:
-            current['Quintile'] = pd.qcut(current['Q_Comm'], q=5, labels=[1, 2, 3, 4, 5], duplicates='drop')
-        except:
-            continue
-        
-        # For each period, calculate returns
-        for period_name, start_day, end_day in periods:
-            # Calculate date range
-            start_date = date + pd.Timedelta(days=start_day)
-            end_date = date + pd.Timedelta(days=end_day)
-            
-            # Calculate returns for each ticker
-            returns_list = []
-            for _, row in current.iterrows():
-                ticker = row['Ticker']
-                quintile = row['Quintile']
-                
-                # Calculate cumulative return over the period
-                cum_ret = calculate_cumulative_returns(daily_prices, ticker, start_date, end_date)
-                
-                if not np.isnan(cum_ret):
-                    returns_list.append({'Quintile': quintile, 'Return': cum_ret})
-            
-            if len(returns_list) < 5:
-                continue
-            
-            # Calculate portfolio returns by quintile
-            returns_df = pd.DataFrame(returns_list)
-            portfolio_rets = returns_df.groupby('Quintile')['Return'].mean()
-            
-            results_dict[period_name].append(portfolio_rets)
-    
-    # Aggregate results
+    periods = TABLE_V_PERIODS
+    
+    # All event-window returns sliced from one (report date × ticker × event day) tensor
+    with stage('return_tensor', rows_in=len(df)):
+        returns_tensor = build_return_tensor(build_price_matrix(daily_prices), df['Report_Date'], dtype=np.float64)
+    
+    # Quintiles of Q_Comm on every date at once (pd.qcut rule: dates with repeated breakpoints are skipped);
+    # a date enters a period's averages only with at least 5 valid returns
+    with stage('portfolio_sort', rows_in=len(df)):
+        sort = portfolio_sort(df, [('Q_Comm', 5)], periods, returns_tensor,
+                              names=['Q1', 'Q2', 'Q3', 'Q4', 'Q5'], spreads=[('LS', 4, 0)],
+                              min_returns=5, ties='drop', se=se, lags=lags)
+    stats = sort['summary'].set_index(['Period', 'Portfolio'])
+    
+    # Aggregate results (NO annualization)
     table_data = []
     for period_name, start_day, end_day in periods:
-        if len(results_dict[period_name]) == 0:
+        n_obs = len(sort['series'][period_name])
+        if n_obs == 0:
             continue
         
-        # Convert to DataFrame
-        all_rets = pd.DataFrame(results_dict[period_name])
-        
-        # Calculate means and t-stats (NO annualization)
-        mean_rets = all_rets.mean()
-        t_stats = (all_rets.mean() / all_rets.std()) * np.sqrt(len(all_rets))
-        
-        # Long-Short (Q5 - Q1)
-        if 5 in all_rets.columns and 1 in all_rets.columns:
-            ls_rets = all_rets[5] - all_rets[1]
-            ls_mean = ls_rets.mean()
-            ls_tstat = (ls_rets.mean() / ls_rets.std()) * np.sqrt(len(ls_rets))
-        else:
-            ls_mean = np.nan
-            ls_tstat = np.nan
-        
-        row = {
-            'Period': period_name,
-            'Q1_Return': mean_rets.get(1, np.nan),
-            'Q2_Return': mean_rets.get(2, np.nan),
-            'Q3_Return': mean_rets.get(3, np.nan),
-            'Q4_Return': mean_rets.get(4, np.nan),
-            'Q5_Return': mean_rets.get(5, np.nan),
-            'LS_Return': ls_mean,
-            'LS_tstat': ls_tstat,
-            'N_obs': len(all_rets)
-        }
+        row = {'Period': period_name}
+        for q in range(1, 6):
+            row[f'Q{q}_Return'] = stats.loc[(period_name, f'Q{q}'), 'Mean_Return']
+        row['LS_Return'] = stats.loc[(period_name, 'LS'), 'Mean_Return']
+        row['LS_tstat'] = stats.loc[(period_name, 'LS'), 't_stat']
+        row['N_obs'] = n_obs
         table_data.append(row)
     
     table = pd.DataFrame(table_data)
@@ -602,21 +595,11 @@ def table_V_portfolio_sorts(df):
     
     return table
 
-# ============================================================================
-# TABLE IV: DCOT Data Analysis
-# ============================================================================
-def table_IV_dcot_analysis(df):
-    """Generate Table IV: DCOT Data Analysis - Empty function as specified"""
-    print("\n" + "=" * 70)
-    print("TABLE IV: DCOT DATA ANALYSIS (NOT IMPLEMENTED)")
-    print("=" * 70)
-    print("⚠ DCOT data analysis skipped as specified in prompt")
-    return None
-
 # ============================================================================
 # TABLE VI: Smoothed Hedging Pressure
 # ============================================================================
-def table_VI_smoothed_hp(df):
+@instrumented
+def table_VI_smoothed_hp(df, se='iid', lags=None):
     """Generate Table VI: Smoothed Hedging Pressure Analysis
     Three regressions for j=1,2:
     1) R_{t+j} = b0 + b1*HP + controls
@@ -627,6 +610,16 @@ def table_VI_smoothed_hp(df):
     print("TABLE VI: SMOOTHED HEDGING PRESSURE")
     print("=" * 70)
     
+    # All six regressions in one batch (one Newey-West call for every coefficient series)
+    fm = fama_macbeth_regressions(df, {
+        'R_t1_HP': ('Ret_Lead', ['HP', 'Basis', 'S_v', 'Ret']),
+        'R_t1_HP_Smooth': ('Ret_Lead', ['HP_Smooth_52w', 'Basis', 'S_v', 'Ret']),
+        'R_t1_HP_Smooth_Q': ('Ret_Lead', ['HP_Smooth_52w', 'Q_Comm', 'Basis', 'S_v', 'Ret']),
+        'R_t2_HP': ('Ret_Lead2', ['HP', 'Basis', 'S_v', 'Ret']),
+        'R_t2_HP_Smooth': ('Ret_Lead2', ['HP_Smooth_52w', 'Basis', 'S_v', 'Ret']),
+        'R_t2_HP_Smooth_Q': ('Ret_Lead2', ['HP_Smooth_52w', 'Q_Comm', 'Basis', 'S_v', 'Ret']),
+    }, se=se, lags=lags)
+    
     results = {}
     
     # For j=1 (one week ahead)
@@ -634,19 +627,19 @@ def table_VI_smoothed_hp(df):
     
     # Regression 1: HP (not smoothed, with Basis)
     print("\nRegression 1a: R_{t+1} ~ HP + Basis + S*v + Ret")
-    res1a = fama_macbeth_regression(df, 'Ret_Lead', ['HP', 'Basis', 'S_v', 'Ret'])
+    res1a = fm['R_t1_HP']
     print(res1a.to_string(index=False))
     results['R_t1_HP'] = res1a
     
     # Regression 2: HP_Smooth (with Basis)
     print("\nRegression 2a: R_{t+1} ~ HP_Smooth + Basis + S*v + Ret")
-    res2a = fama_macbeth_regression(df, 'Ret_Lead', ['HP_Smooth_52w', 'Basis', 'S_v', 'Ret'])
+    res2a = fm['R_t1_HP_Smooth']
     print(res2a.to_string(index=False))
     results['R_t1_HP_Smooth'] = res2a
     
     # Regression 3: HP_Smooth + Q (with Basis)
     print("\nRegression 3a: R_{t+1} ~ HP_Smooth + Q_Comm + Basis + S*v + Ret")
-    res3a = fama_macbeth_regression(df, 'Ret_Lead', ['HP_Smooth_52w', 'Q_Comm', 'Basis', 'S_v', 'Ret'])
+    res3a = fm['R_t1_HP_Smooth_Q']
     print(res3a.to_string(index=False))
     results['R_t1_HP_Smooth_Q'] = res3a
     
@@ -655,19 +648,19 @@ def table_VI_smoothed_hp(df):
     
     # Regression 1: HP (not smoothed, with Basis)
     print("\nRegression 1b: R_{t+2} ~ HP + Basis + S*v + Ret")
-    res1b = fama_macbeth_regression(df, 'Ret_Lead2', ['HP', 'Basis', 'S_v', 'Ret'])
+    res1b = fm['R_t2_HP']
     print(res1b.to_string(index=False))
     results['R_t2_HP'] = res1b
     
     # Regression 2: HP_Smooth (with Basis)
     print("\nRegression 2b: R_{t+2} ~ HP_Smooth + Basis + S*v + Ret")
-    res2b = fama_macbeth_regression(df, 'Ret_Lead2', ['HP_Smooth_52w', 'Basis', 'S_v', 'Ret'])
+    res2b = fm['R_t2_HP_Smooth']
     print(res2b.to_string(index=False))
     results['R_t2_HP_Smooth'] = res2b
     
     # Regression 3: HP_Smooth + Q (with Basis)
     print("\nRegression 3b: R_{t+2} ~ HP_Smooth + Q_Comm + Basis + S*v + Ret")
-    res3b = fama_macbeth_regression(df, 'Ret_Lead2', ['HP_Smooth_52w', 'Q_Comm', 'Basis', 'S_v', 'Ret'])
+    res3b = fm['R_t2_HP_Smooth_Q']
     print(res3b.to_string(index=False))
     results['R_t2_HP_Smooth_Q'] = res3b
     
@@ -683,21 +676,55 @@ def table_VI_smoothed_hp(df):
 # ============================================================================
 # TABLE VII: Hedging Pressure (DCOT)
 # ============================================================================
-def table_VII_hp_dcot(df):
-    """Generate Table VII: Hedging Pressure with DCOT - Empty function as specified"""
+@instrumented
+def table_VII_hp_dcot(df, se='iid', lags=None):
+    """Generate Table VII: Hedging Pressure by DCOT trader category
+    On the weeks with DCOT data, for commercials (reference) and each DCOT category c:
+    1) R_{t+1} = b0 + b1*HP_c
+    2) R_{t+j} = b0 + b1*HP_c + b2*Q_c + b3*Basis + b4*S*v + b5*R_t,  j=1,2
+    and R_{t+1} on the HP of all DCOT categories jointly
+    """
     print("\n" + "=" * 70)
-    print("TABLE VII: HEDGING PRESSURE (DCOT) (NOT IMPLEMENTED)")
+    print("TABLE VII: HEDGING PRESSURE BY DCOT TRADER CATEGORY")
     print("=" * 70)
-    print("⚠ DCOT analysis skipped as specified in prompt")
-    return None
+    
+    categories = dcot_categories(df)
+    if not categories:
+        print("⚠ No disaggregated (DCOT) positions in the panel - rerun data_preprocessing.py with DCOT data")
+        return None
+    
+    # Same weeks for every category, so the commercial HP premium is comparable
+    hp_cols = [trader_columns(c)['HP'] for c in categories]
+    df = df.rows(np.column_stack([pd.notna(df[col]) for col in hp_cols]).any(axis=1))
+    
+    specs, labels = {}, {}
+    for category in ['Comm'] + categories:
+        names = trader_columns(category)
+        hp, full = names['HP'], [names['HP'], names['Q'], 'Basis', 'S_v', 'Ret']
+        specs[f'R_t1_{hp}'] = ('Ret_Lead', [hp])
+        specs[f'R_t1_{hp}_Full'] = ('Ret_Lead', full)
+        specs[f'R_t2_{hp}_Full'] = ('Ret_Lead2', full)
+        labels[f'R_t1_{hp}'] = f"R_{{t+1}} ~ {hp}"
+        labels[f'R_t1_{hp}_Full'] = f"R_{{t+1}} ~ {hp} + {names['Q']} + Basis + S*v + Ret"
+        labels[f'R_t2_{hp}_Full'] = f"R_{{t+2}} ~ {hp} + {names['Q']} + Basis + S*v + Ret"
+    specs['R_t1_HP_DCOT'] = ('Ret_Lead', hp_cols)
+    labels['R_t1_HP_DCOT'] = f"R_{{t+1}} ~ {' + '.join(hp_cols)}"
+    fm = fama_macbeth_regressions(df, specs, se=se, lags=lags)
+    
+    results = print_and_save(fm, labels, 'output/tables/table_VII_hp_dcot.xlsx')
+    print("\n✓ Table VII saved to output/tables/table_VII_hp_dcot.xlsx")
+    
+    return results
 
 # ============================================================================
 # TABLE VIII: Double-Sorted Portfolios
 # ============================================================================
-def table_VIII_double_sorts(df):
+@instrumented
+def table_VIII_double_sorts(df, se='iid', lags=None):
     """Generate Table VIII: Double-Sorted Portfolios
     Sort by HP_Smooth first (High/Low), then by Q_Comm within each HP group
     Calculate returns over multiple periods (days and weeks)
+    se='newey_west': HAC t-stats for the overlapping windows (lags default: window overlap in weeks)
     """
     print("\n" + "=" * 70)
     print("TABLE VIII: DOUBLE-SORTED PORTFOLIOS (DAILY RETURNS)")
@@ -707,97 +734,23 @@ def table_VIII_double_sorts(df):
     daily_prices = load_daily_prices()
     
     # Define periods: day ranges and week ranges
-    periods = [
-        ('-10to0', -10, 0, 'days'),
-        ('1to4', 1, 4, 'days'),
-        ('5to10', 5, 10, 'days'),
-        ('11to20', 11, 20, 'days'),
-        ('21to40', 21, 40, 'days'),
-        ('1to40', 1, 40, 'days'),
-        ('week1', 1, 7, 'days'),      # Week 1 = 1-7 days
-        ('week2to4', 8, 28, 'days'),  # Week 2-4 = 8-28 days
-        ('week5to8', 29, 56, 'days'), # Week 5-8 = 29-56 days
-        ('week1to8', 1, 56, 'days')   # Week 1-8 = 1-56 days
-    ]
-    
-    # Get unique dates
-    dates = sorted(df['Report_Date'].unique())
-    
-    # Store results for each portfolio and period
-    portfolio_returns = {
-        'LowHP_LowQ': {period[0]: [] for period in periods},
-        'LowHP_HighQ': {period[0]: [] for period in periods},
-        'HighHP_LowQ': {period[0]: [] for period in periods},
-        'HighHP_HighQ': {period[0]: [] for period in periods}
-    }
+    periods = [(name, start_day, end_day) for name, start_day, end_day, unit in TABLE_VIII_PERIODS]
     
-    for date in dates:
-        # Get current cross-section
-        current = df[df['Report_Date'] == date].copy()
-        
-        if len(current) < 10:
-            continue
-        
-        # First sort: HP_Smooth into 2 groups
-        hp_median = current['HP_Smooth_52w'].median()
-        current['HP_Group'] = np.where(current['HP_Smooth_52w'] > hp_median, 'High', 'Low')
-        
-        # Second sort: Q_Comm within each HP group
-        for hp_group in ['Low', 'High']:
-            group_data = current[current['HP_Group'] == hp_group].copy()
-            if len(group_data) < 2:
-                continue
-            q_median = group_data['Q_Comm'].median()
-            current.loc[(current['HP_Group'] == hp_group) & (current['Q_Comm'] <= q_median), 'Portfolio'] = f'{hp_group}HP_LowQ'
-            current.loc[(current['HP_Group'] == hp_group) & (current['Q_Comm'] > q_median), 'Portfolio'] = f'{hp_group}HP_HighQ'
-        
-        # For each period, calculate returns
-        for period_name, start_day, end_day, unit in periods:
-            # Calculate date range
-            start_date = date + pd.Timedelta(days=start_day)
-            end_date = date + pd.Timedelta(days=end_day)
-            
-            # Calculate returns for each portfolio
-            for portfolio_name in portfolio_returns.keys():
-                portfolio_tickers = current[current['Portfolio'] == portfolio_name]
-                
-                if len(portfolio_tickers) == 0:
-                    continue
-                
-                # Calculate returns for each ticker in the portfolio
-                portfolio_period_returns = []
-                for _, row in portfolio_tickers.iterrows():
-                    ticker = row['Ticker']
-                    cum_ret = calculate_cumulative_returns(daily_prices, ticker, start_date, end_date)
-                    if not np.isnan(cum_ret):
-                        portfolio_period_returns.append(cum_ret)
-                
-                # Average return for this portfolio in this period
-                if len(portfolio_period_returns) > 0:
-                    portfolio_returns[portfolio_name][period_name].append(np.mean(portfolio_period_returns))
-    
-    # Calculate statistics for each portfolio and period
-    all_results = []
-    for portfolio_name in portfolio_returns.keys():
-        for period_name, start_day, end_day, unit in periods:
-            returns = portfolio_returns[portfolio_name][period_name]
-            
-            if len(returns) > 0:
-                returns_array = np.array(returns)
-                mean_ret = returns_array.mean()  # NO annualization
-                std_ret = returns_array.std()
-                t_stat = (returns_array.mean() / returns_array.std()) * np.sqrt(len(returns_array))
-                
-                all_results.append({
-                    'Portfolio': portfolio_name,
-                    'Period': period_name,
-                    'Mean_Return': mean_ret,
-                    'Std_Return': std_ret,
-                    't_stat': t_stat,
-                    'N_obs': len(returns)
-                })
-    
-    table = pd.DataFrame(all_results)
+    # All event-window returns sliced from one (report date × ticker × event day) tensor
+    with stage('return_tensor', rows_in=len(df)):
+        returns_tensor = build_return_tensor(build_price_matrix(daily_prices), df['Report_Date'], dtype=np.float64)
+    
+    # Median split on HP_Smooth (commodities without HP_Smooth count as Low HP), then a
+    # median split on Q_Comm within each HP group; ties at the median go to the lower half
+    with stage('portfolio_sort', rows_in=len(df)):
+        sort = portfolio_sort(df, [('HP_Smooth_52w', 2), ('Q_Comm', 2)], periods, returns_tensor, how='conditional',
+                              names=['LowHP_LowQ', 'LowHP_HighQ', 'HighHP_LowQ', 'HighHP_HighQ'],
+                              spreads=[('LowHP_HighQ-LowQ', 1, 0), ('HighHP_HighQ-LowQ', 3, 2)],
+                              ties='keep', missing_low=['HP_Smooth_52w'], ddof=0, se=se, lags=lags)
+    summary = sort['summary']
+    
+    # Statistics for each portfolio and period (NO annualization)
+    table = summary[~summary['Portfolio'].str.contains('-') & (summary['N_obs'] > 0)].reset_index(drop=True)
     
     # Pivot table for better readability
     pivot_mean = table.pivot(index='Period', columns='Portfolio', values='Mean_Return')
@@ -814,35 +767,64 @@ def table_VIII_double_sorts(df):
     print("\nt-statistics:")
     print(pivot_tstat.to_string())
     
-    # Calculate Long-Short strategies
+    # Long-Short strategies within each HP group (aligned by report date)
     print("\n=== Long-Short Strategies (HighQ - LowQ) ===")
-    for period_name, start_day, end_day, unit in periods:
-        # Low HP: HighQ - LowQ
-        if len(portfolio_returns['LowHP_HighQ'][period_name]) > 0 and len(portfolio_returns['LowHP_LowQ'][period_name]) > 0:
-            min_len = min(len(portfolio_returns['LowHP_HighQ'][period_name]), len(portfolio_returns['LowHP_LowQ'][period_name]))
-            ls_low_hp = np.array(portfolio_returns['LowHP_HighQ'][period_name][:min_len]) - np.array(portfolio_returns['LowHP_LowQ'][period_name][:min_len])
-            ls_mean = ls_low_hp.mean()
-            ls_tstat = (ls_low_hp.mean() / ls_low_hp.std()) * np.sqrt(len(ls_low_hp))
-            print(f"{period_name:12} Low HP:  {ls_mean:7.4f} (t={ls_tstat:5.2f})", end="")
-        else:
-            print(f"{period_name:12} Low HP:  N/A", end="")
-        
-        # High HP: HighQ - LowQ
-        if len(portfolio_returns['HighHP_HighQ'][period_name]) > 0 and len(portfolio_returns['HighHP_LowQ'][period_name]) > 0:
-            min_len = min(len(portfolio_returns['HighHP_HighQ'][period_name]), len(portfolio_returns['HighHP_LowQ'][period_name]))
-            ls_high_hp = np.array(portfolio_returns['HighHP_HighQ'][period_name][:min_len]) - np.array(portfolio_returns['HighHP_LowQ'][period_name][:min_len])
-            ls_mean = ls_high_hp.mean()
-            ls_tstat = (ls_high_hp.mean() / ls_high_hp.std()) * np.sqrt(len(ls_high_hp))
-            print(f"    High HP: {ls_mean:7.4f} (t={ls_tstat:5.2f})")
-        else:
-            print(f"    High HP: N/A")
+    spreads = summary.set_index(['Period', 'Portfolio'])
+    for period_name, start_day, end_day in periods:
+        for hp_group, label, end in [('Low', f"{period_name:12} Low HP: ", ""), ('High', "    High HP:", "\n")]:
+            ls = spreads.loc[(period_name, f'{hp_group}HP_HighQ-LowQ')]
+            if ls['N_obs'] == 0:
+                print(f"{label} N/A", end=end)
+                continue
+            print(f"{label} {ls['Mean_Return']:7.4f} (t={ls['t_stat']:5.2f})", end=end)
     
     return table
 
+# ============================================================================
+# Table registry
+# ============================================================================
+# Every generator only reads the prepared panel, so they can run in any order
+# or in parallel (table_runner.py); this is also the output order
+TABLE_JOBS = [
+    ('table_I', table_I_summary_statistics),
+    ('table_II', table_II_position_changes_returns),
+    ('table_III', table_III_return_predictability),
+    ('table_IV', table_IV_dcot_analysis),
+    ('table_V', table_V_portfolio_sorts),
+    ('table_VI', table_VI_smoothed_hp),
+    ('table_VII', table_VII_hp_dcot),
+    ('table_VIII', table_VIII_double_sorts),
+]
+
+TABLE_TITLES = {
+    'table_I': 'Table I: Summary Statistics',
+    'table_II': 'Table II: Weekly Position Changes and Returns',
+    'table_III': 'Table III: Return Predictability',
+    'table_IV': 'Table IV: DCOT Position Changes',
+    'table_V': 'Table V: Portfolio Sorts',
+    'table_VI': 'Table VI: Smoothed Hedging Pressure',
+    'table_VII': 'Table VII: Hedging Pressure DCOT',
+    'table_VIII': 'Table VIII: Double-Sorted Portfolios',
+}
+
+# Tables that take the se / lags options
+SE_TABLES = ['table_II', 'table_III', 'table_IV', 'table_V', 'table_VI', 'table_VII', 'table_VIII']
+
 # ============================================================================
 # Main Execution
 # ============================================================================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replicate the paper's tables")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes for the table generators (default: all cores, 1 = sequential)")
+    parser.add_argument('--se', choices=SE_TYPES, default='iid',
+                        help="standard errors for Tables II-VIII (default: iid)")
+    parser.add_argument('--lags', type=int, default=None,
+                        help="Newey-West lags (default: rule of thumb for FM, window overlap for sorts)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.start_run(args)
+    
     print("\n" + "=" * 70)
     print("TABLE REPLICATION FOR 'A TALE OF TWO PREMIUMS'")
     print("=" * 70)
@@ -854,27 +836,26 @@ if __name__ == "__main__":
     # Calculate additional variables
     df = calculate_additional_variables(df)
     
-    # Generate tables
-    table_I = table_I_summary_statistics(df)
-    table_II = table_II_position_changes_returns(df)
-    table_III = table_III_return_predictability(df)
-    table_IV = table_IV_dcot_analysis(df)
-    table_V = table_V_portfolio_sorts(df)
-    table_VI = table_VI_smoothed_hp(df)
-    table_VII = table_VII_hp_dcot(df)
-    table_VIII = table_VIII_double_sorts(df)
+    # Parse the price files before forking, so Tables V and VIII share them
+    load_price_frames()
+    
+    # Generate tables (in parallel over a memory-mapped copy of the panel)
+    jobs = [(name, partial(func, se=args.se, lags=args.lags) if name in SE_TABLES else func)
+            for name, func in TABLE_JOBS]
+    tables, failed = run_table_jobs(df, jobs, max_workers=args.workers)
     
     print("\n" + "=" * 70)
-    print("TABLE REPLICATION COMPLETED")
+    print("TABLE REPLICATION COMPLETED" if not failed else f"TABLE REPLICATION FAILED ({len(failed)} of {len(jobs)} tables)")
     print("=" * 70)
     print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("\nAll tables saved to output/tables/")
-    print("\nTables generated:")
-    print("  ✓ Table I: Summary Statistics")
-    print("  ✓ Table II: Weekly Position Changes and Returns")
-    print("  ✓ Table III: Return Predictability")
-    print("  ⚠ Table IV: DCOT Data Analysis (skipped)")
-    print("  ✓ Table V: Portfolio Sorts")
-    print("  ✓ Table VI: Smoothed Hedging Pressure")
-    print("  ⚠ Table VII: Hedging Pressure DCOT (skipped)")
-    print("  ✓ Table VIII: Double-Sorted Portfolios")
+    print("\nTables saved to output/tables/")
+    for name, title in TABLE_TITLES.items():
+        if name in failed:
+            print(f"  ✗ {title} (failed)")
+        elif tables.get(name) is None:
+            print(f"  ⚠ {title} (no DCOT data)" if name in ('table_IV', 'table_VII') else f"  ⚠ {title} (no output)")
+        else:
+            print(f"  ✓ {title}")
+    instrumentation.finish_run('table_replication')
+    if failed:
+        sys.exit(1)
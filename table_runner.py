@@ -0,0 +1,180 @@
+"""
+Parallel Table Runner for "A Tale of Two Premiums" Paper Replication
+Runs independent table generators in a process pool; workers share one
+read-only, memory-mapped copy of the prepared panel instead of a pickled copy each
+"""
+
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import traceback
+import tempfile
+import shutil
+import time
+import io
+import os
+
+import instrumentation
+from panel import Panel
+
+# ============================================================================
+# Shared panel
+# ============================================================================
+def share_panel(df, directory):
+    """
+    Write the panel's columns to .npy files that workers memory-map read-only
+
+    Columns of the same numeric dtype are stored as one (columns × rows) array;
+    datetimes as int64, categoricals as codes (categories kept in the spec);
+    any other column (object strings) is small and travels in the spec itself.
+    A panel.Panel shares its column arrays; its codes and levels travel in the spec.
+
+    Returns: spec (dict) for attach_panel
+    """
+    if isinstance(df, Panel):
+        layout, columns = df.parts()
+        spec = share_panel(pd.DataFrame(columns, copy=False), directory)
+        spec['panel'] = layout
+        return spec
+
+    groups = {}
+    columns = []
+    for name in df.columns:
+        col = df[name]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            values = col.cat.codes.to_numpy()
+            extra = (col.cat.categories, col.cat.ordered)
+            kind = 'category'
+        elif col.dtype.kind == 'M' and isinstance(col.dtype, np.dtype):
+            values = col.to_numpy().view('int64')
+            extra = col.dtype.str
+            kind = 'datetime'
+        elif col.dtype.kind in 'biuf' and isinstance(col.dtype, np.dtype):
+            values = col.to_numpy()
+            extra = None
+            kind = 'numeric'
+        else:
+            columns.append({'name': name, 'kind': 'object', 'values': col.array})
+            continue
+
+        key = values.dtype.str
+        groups.setdefault(key, []).append(values)
+        columns.append({'name': name, 'kind': kind, 'array': key, 'row': len(groups[key]) - 1, 'extra': extra})
+
+    arrays = {}
+    for i, (key, stacked) in enumerate(groups.items()):
+        path = os.path.join(directory, f'panel_{i}.npy')
+        np.save(path, np.vstack(stacked))
+        arrays[key] = path
+
+    return {'index': df.index, 'columns': columns, 'arrays': arrays}
+
+def attach_panel(spec):
+    """Rebuild the panel from share_panel's files; numeric columns are views on the memory map"""
+    arrays = {key: np.load(path, mmap_mode='r') for key, path in spec['arrays'].items()}
+
+    data = {}
+    for column in spec['columns']:
+        if column['kind'] == 'object':
+            data[column['name']] = column['values']
+            continue
+        values = arrays[column['array']][column['row']]
+        if column['kind'] == 'category':
+            categories, ordered = column['extra']
+            values = pd.Categorical.from_codes(values, categories, ordered=ordered)
+        elif column['kind'] == 'datetime':
+            values = values.view(column['extra'])
+        data[column['name']] = values
+
+    if 'panel' in spec:
+        return Panel.from_parts(spec['panel'], data)
+    return pd.DataFrame(data, index=spec['index'], copy=False)
+
+# ============================================================================
+# Workers
+# ============================================================================
+_panel = None
+
+def _init_worker(spec, instrument=None):
+    global _panel
+    _panel = attach_panel(spec)
+    if instrument is not None:
+        instrumentation.enable(**instrument)
+
+def _call(func, df):
+    start = time.perf_counter()
+    result, error = None, None
+    try:
+        result = func(df)
+    except Exception:
+        error = traceback.format_exc()
+    return result, error, time.perf_counter() - start
+
+def _run_job(func):
+    """
+    Run one table generator on the worker's shared panel, capturing its console
+    output and (if instrumented) the measurements of this job only
+    """
+    log = io.StringIO()
+    instrumentation.reset()
+    with contextlib.redirect_stdout(log):
+        result, error, elapsed = _call(func, _panel)
+    return result, log.getvalue(), error, elapsed, instrumentation.collect()
+
+def run_table_jobs(df, jobs, max_workers=None):
+    """
+    Run table generators that only read `df`, in parallel
+
+    Each job writes its own output files, so the files do not depend on the
+    schedule; console output is replayed in job order.
+
+    Parameters:
+    -----------
+    df : prepared Panel (calculate_additional_variables output) or DataFrame
+    jobs : list of (name, table function)
+    max_workers : processes (default: all cores); 1 runs the jobs in this process
+
+    Returns:
+    --------
+    results : dict of {name: table function output} for the jobs that succeeded
+    failed : names of the jobs that raised (their tracebacks are printed)
+    """
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    results, failed = {}, []
+
+    if max_workers <= 1:
+        for name, func in jobs:
+            result, error, elapsed = _call(func, df)
+            _report(name, '', error, elapsed)
+            if error is None:
+                results[name] = result
+            else:
+                failed.append(name)
+        return results, failed
+
+    directory = tempfile.mkdtemp(prefix='panel-')
+    try:
+        spec = share_panel(df, directory)
+        instrument = instrumentation.worker_settings()
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(spec, instrument)) as pool:
+            futures = [(name, pool.submit(_run_job, func)) for name, func in jobs]
+            for name, future in futures:
+                result, log, error, elapsed, stats = future.result()
+                instrumentation.merge(stats)
+                _report(name, log, error, elapsed)
+                if error is None:
+                    results[name] = result
+                else:
+                    failed.append(name)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return results, failed
+
+def _report(name, log, error, elapsed):
+    print(log, end='')
+    if error is not None:
+        print(f"\n✗ {name} failed:\n{error}")
+    else:
+        print(f"\n✓ {name} finished in {elapsed:.1f}s")
@@ -0,0 +1,160 @@
+"""
+Trader-Category Kernel for "A Tale of Two Premiums" Paper Replication
+Hedging pressure, net long, net trading and propensity to trade of every
+trader category from one (time × ticker × category) position tensor, in a
+single NumPy pass; non-reportables are open interest minus the reported categories
+"""
+
+import pandas as pd
+import numpy as np
+from rolling_regression import ticker_positions
+
+# Trader categories: {name: (long column, short column, open interest column)}
+# Legacy report: commercials (hedgers) and non-commercials (speculators);
+# Disaggregated report (from 2006): producer/merchant, swap dealers, managed money
+TRADER_CATEGORIES = {
+    'Comm': ('Comm_Positions_Long_All', 'Comm_Positions_Short_All', 'Open_Interest_All'),
+    'NonComm': ('NonComm_Positions_Long_All', 'NonComm_Positions_Short_All', 'Open_Interest_All'),
+    'Prod_Merc': ('Prod_Merc_Positions_Long_All', 'Prod_Merc_Positions_Short_All', 'Disagg_Open_Interest_All'),
+    'Swap': ('Swap_Positions_Long_All', 'Swap_Positions_Short_All', 'Disagg_Open_Interest_All'),
+    'M_Money': ('M_Money_Positions_Long_All', 'M_Money_Positions_Short_All', 'Disagg_Open_Interest_All'),
+}
+DCOT_CATEGORIES = ['Prod_Merc', 'Swap', 'M_Money']
+
+# Non-reportable traders hold the open interest the reported categories of their report do not
+NONREPORT_CATEGORY = 'NonReport'
+NONREPORT_FROM = ['Comm', 'NonComm']
+
+# Kernel outputs: HP = (Short - Long) / OI, NetLong = Long - Short,
+# Delta_NetLong = NetLong_t - NetLong_{t-1}, Q = Delta_NetLong / OI_{t-1} * 100,
+# PT = (|ΔLong| + |ΔShort|) / (Long + Short); lags are added as '{Q}_lag{k}'
+KERNEL_OUTPUTS = ['HP', 'NetLong', 'Delta_NetLong', 'Q', 'PT']
+
+def trader_columns(category):
+    """Names of the variables of one trader category (commercial hedging pressure is plain 'HP')"""
+    return {
+        'Long': TRADER_CATEGORIES[category][0] if category in TRADER_CATEGORIES else f'{category}_Long',
+        'Short': TRADER_CATEGORIES[category][1] if category in TRADER_CATEGORIES else f'{category}_Short',
+        'HP': 'HP' if category == 'Comm' else f'HP_{category}',
+        'NetLong': f'NetLong_{category}',
+        'Delta_NetLong': f'Delta_NetLong_{category}',
+        'Q': f'Q_{category}',
+        'PT': f'PT_{category}',
+    }
+
+def _lag(values, periods=1):
+    """Shift along the time axis (axis 0), NaN-filled"""
+    out = np.full(values.shape, np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+def trader_kernel(long, short, oi, lags=()):
+    """
+    Every KERNEL_OUTPUTS variable for every series at once
+
+    Parameters:
+    -----------
+    long, short, oi : arrays of shape (time × ...) (e.g. time × ticker × category),
+        each series' rows consecutive in date order along axis 0
+    lags : lags of Q to add (e.g. (1,) for Q_{t-1})
+
+    Returns: dict of {output: array of the same shape} (NetLong keeps integer input dtypes)
+    """
+    net = long - short
+    net_lag = _lag(net)
+    out = {
+        'HP': (short - long) / oi,
+        'NetLong': net,
+        'Delta_NetLong': net - net_lag,
+        'Q': (net - net_lag) / _lag(oi) * 100,
+        'PT': (np.abs(long - _lag(long)) + np.abs(short - _lag(short))) / (long + short),
+    }
+    for k in lags:
+        out[f'Q_lag{k}'] = _lag(out['Q'], k)
+    return out
+
+def add_nonreport(long, short, oi, categories):
+    """
+    Append the non-reportable category (last axis) as open interest minus the NONREPORT_FROM categories
+
+    Returns: (long, short, oi, categories), unchanged if a reported category is missing
+    """
+    if not all(c in categories for c in NONREPORT_FROM):
+        return long, short, oi, categories
+    idx = [categories.index(c) for c in NONREPORT_FROM]
+    nr_long, nr_short = oi[..., idx[0]], oi[..., idx[0]]
+    for i in idx:
+        nr_long = nr_long - long[..., i]
+        nr_short = nr_short - short[..., i]
+    stack = lambda a, extra: np.concatenate([a, extra[..., None]], axis=-1)
+    return (stack(long, nr_long), stack(short, nr_short), stack(oi, oi[..., idx[0]]),
+            categories + [NONREPORT_CATEGORY])
+
+def position_tensor(frames, categories=TRADER_CATEGORIES):
+    """
+    Stack per-ticker position columns into (time × ticker × category) arrays
+
+    Parameters:
+    -----------
+    frames : list of per-ticker DataFrames, rows in date order
+    categories : {name: (long column, short column, open interest column)}
+
+    Returns:
+    --------
+    long, short, oi : float arrays (max rows × tickers × categories), NaN-padded
+    present : names of the categories found in at least one frame (the category axis)
+    available : (tickers × categories) bool, True where the frame has the category's columns
+    """
+    present = [c for c, cols in categories.items() if any(all(col in f.columns for col in cols) for f in frames)]
+    n_rows = max((len(f) for f in frames), default=0)
+    shape = (n_rows, len(frames), len(present))
+    long, short, oi = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+    available = np.zeros((len(frames), len(present)), dtype=bool)
+    for i, frame in enumerate(frames):
+        for j, category in enumerate(present):
+            cols = categories[category]
+            if all(col in frame.columns for col in cols):
+                available[i, j] = True
+                for target, col in zip((long, short, oi), cols):
+                    target[:len(frame), i, j] = frame[col].to_numpy(dtype=float)
+    return long, short, oi, present, available
+
+def panel_trader_variables(df, outputs=KERNEL_OUTPUTS, lags=(), nonreport=True, categories=TRADER_CATEGORIES,
+                           group_col='Ticker'):
+    """
+    Kernel outputs of every trader category on a long panel, in one pass
+
+    Parameters:
+    -----------
+    df : long panel (DataFrame or panel.Panel), each commodity's rows in date order
+    outputs : KERNEL_OUTPUTS to return
+    lags : lags of Q to return ('Q_{category}_lag{k}')
+    nonreport : also derive the non-reportables (with 'NonReport_Long' / 'NonReport_Short')
+
+    Returns: DataFrame on df's index
+    """
+    pos, codes, groups = ticker_positions(df, group_col)
+    present = [c for c, cols in categories.items() if all(col in df.columns for col in cols)]
+    shape = (pos.max() + 1 if len(pos) else 0, len(groups), len(present))
+    arrays = []
+    for k in range(3):
+        values = np.full(shape, np.nan)
+        values[pos, codes] = np.column_stack([np.asarray(df[categories[c][k]], dtype=float) for c in present])
+        arrays.append(values)
+    long, short, oi = arrays
+    if nonreport:
+        long, short, oi, present = add_nonreport(long, short, oi, present)
+    variables = trader_kernel(long, short, oi, lags)
+
+    columns = {}
+    for j, category in enumerate(present):
+        names = trader_columns(category)
+        if category == NONREPORT_CATEGORY:
+            columns[names['Long']] = long[pos, codes, j]
+            columns[names['Short']] = short[pos, codes, j]
+        for output in outputs:
+            columns[names[output]] = variables[output][pos, codes, j]
+        for k in lags:
+            columns[f"{names['Q']}_lag{k}"] = variables[f'Q_lag{k}'][pos, codes, j]
+    return pd.DataFrame(columns, index=df.index)
@@ -7,8 +7,11 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
+import argparse
 import glob
 import os
+from instrumentation import instrumented
+import instrumentation
 
 # Set style
 sns.set_style("whitegrid")
@@ -18,6 +21,7 @@ plt.rcParams['font.size'] = 10
 # Create output directory
 os.makedirs('output/figures', exist_ok=True)
 
+@instrumented
 def plot_summary_statistics():
     """Plot summary statistics from Table I"""
     print("Creating summary statistics plots...")
@@ -76,6 +80,7 @@ def plot_summary_statistics():
     print("✓ Saved fig1_summary_statistics.png")
     plt.close()
 
+@instrumented
 def plot_return_predictability():
     """Plot return predictability results from Table III"""
     print("Creating return predictability plots...")
@@ -123,6 +128,7 @@ def plot_return_predictability():
     print("✓ Saved fig2_return_predictability.png")
     plt.close()
 
+@instrumented
 def plot_portfolio_sorts():
     """Plot portfolio sorts from Table V"""
     print("Creating portfolio sorts plots...")
@@ -167,6 +173,7 @@ def plot_portfolio_sorts():
     print("✓ Saved fig3_portfolio_sorts.png")
     plt.close()
 
+@instrumented
 def plot_profit_attribution():
     """Plot profit attribution from Table XI"""
     print("Creating profit attribution plots...")
@@ -202,6 +209,7 @@ def plot_profit_attribution():
     print("✓ Saved fig4_profit_attribution.png")
     plt.close()
 
+@instrumented
 def plot_double_sorts():
     """Plot double sorts from Table VIII"""
     print("Creating double sorts heatmap...")
@@ -240,6 +248,7 @@ def plot_double_sorts():
     print("✓ Saved fig5_double_sorts.png")
     plt.close()
 
+@instrumented
 def create_all_visualizations():
     """Create all visualizations"""
     print("\n" + "=" * 70)
@@ -269,4 +278,9 @@ def create_all_visualizations():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plot the replicated tables")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.start_run(args)
     create_all_visualizations()
+    instrumentation.finish_run('visualizations')